@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+
+from typing import List, Optional
+from InterfaceCtrl import AsyncInterfaceCtrl
+from InterfaceParam import Device, ConstParameter
+from InterfaceSchedule import PollScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncInterfaceCard:
+    """
+    InterfaceCard の asyncio 版
+    デバイスのアクセスはタスクとして並行に実行し、ブロッキングなファイルI/Oは executor で実行する
+    """
+    def __init__(self, ctrl:AsyncInterfaceCtrl, card_directory:str, default_period_ms:int=1000, executor=None):
+        """
+        :param ctrl: AsyncInterfaceCtrl のインスタンス（同期コントローラは AsyncCtrlAdapter で包む）
+        :param card_directory: カードのルートディレクトリ名
+        :param default_period_ms: period_ms 未指定のパラメータのポーリング周期
+        :param executor: ブロッキング処理を実行する executor（None の場合はイベントループの既定）
+        """
+        self.card_directory = card_directory
+        self.ctrl = ctrl
+        self.executor = executor
+        self.devices: List[Device] = []
+        self.scheduler = PollScheduler(default_period_ms)
+        # コントローラのリセット・再接続で ConstParameter を読み直す（AsyncCtrlAdapter は元のコントローラに登録する）
+        add_reset_hook = getattr(ctrl, "add_reset_hook", None)
+        if add_reset_hook is not None:
+            add_reset_hook(self.invalidate_constants)
+
+    def invalidate_constants(self, reason:str=None) -> None:
+        """ConstParameter の確定を解除する（次の周期で読み直す）"""
+        for device in self.devices:
+            for param in device.parameters:
+                if isinstance(param, ConstParameter):
+                    param.frozen = False
+
+    async def start(self) -> None:
+        """コントローラの初期化（InterfaceCard.__init__ の open/refresh/close に相当）"""
+        await self.ctrl.open()
+        await self.ctrl.refresh()
+        await self.ctrl.close()
+
+    async def _run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def add_device(self, device:Device) -> None:
+        """deviceを動的に追加するメソッド"""
+        logger.info("--- Card add_device Start: %s ---", device.directory_name)
+        self.devices.append(device)
+
+        target_dir = os.path.join(self.card_directory, device.directory_name)
+        await self._run_blocking(lambda: os.makedirs(target_dir, exist_ok=True))
+
+        await self.ctrl.open()
+        for param in device.parameters:
+            await self._run_blocking(param.prepare_file, target_dir)
+            await param.handle_access_async(self.ctrl, self.executor, force=True)
+            self.scheduler.add((device, param), param.period_ms)
+        await self.ctrl.close()
+
+        logger.info("--- Card add_device End: %s ---", device.directory_name)
+
+    async def _access_devices(self, work:list) -> None:
+        """デバイス毎にタスクを作成し、並行にアクセスする"""
+        tasks = [
+            asyncio.create_task(device.access_async(self.ctrl, params, self.executor))
+            for device, params in work
+        ]
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def update_status(self) -> None:
+        """保持している全てのデバイスのアクセスを実行する"""
+        logger.debug("--- Card Status update Start: %s ---", self.card_directory)
+        await self.ctrl.open()
+        await self.ctrl.refresh()
+        await self._access_devices([(device, None) for device in self.devices])
+        await self.ctrl.close()
+        logger.debug("--- Card status update End ---")
+
+    async def poll_due(self) -> int:
+        """
+        期限に達したパラメータのみアクセスする
+        :return: アクセスしたパラメータ数
+        """
+        due_items = self.scheduler.pop_due()
+        if not due_items:
+            return 0
+
+        grouped = {}
+        for device, param in due_items:
+            grouped.setdefault(device, []).append(param)
+
+        await self.ctrl.open()
+        await self.ctrl.refresh()
+        await self._access_devices(list(grouped.items()))
+        await self.ctrl.close()
+        return len(due_items)
+
+    async def run(self, stop:Optional[asyncio.Event]=None) -> None:
+        """
+        スケジューラに従って期限に達したパラメータを順次ポーリングする
+        :param stop: セットされるとループを終了する（None の場合はキャンセルされるまで継続）
+        """
+        while stop is None or not stop.is_set():
+            await self.poll_due()
+            next_due = self.scheduler.next_due()
+            if next_due is None:
+                timeout = self.scheduler.default_period_ms / 1000.0
+            else:
+                timeout = max(0.0, next_due - self.scheduler.clock())
+
+            if stop is None:
+                await asyncio.sleep(timeout)
+            else:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
@@ -1,6 +1,89 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+
 from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+
+
+class CtrlSnapshot:
+    """
+    refresh 1回分の読み出し結果
+    キーはゲッター名（引数がある場合は (ゲッター名, 引数...) のタプル）
+    refresh でまとめて取得した値を put しておくと、ゲッターはハードウェアにアクセスせずに値を返す
+    """
+    def __init__(self, values:Optional[Dict[Any, Any]]=None, ttl_s:Optional[float]=None, clock:Callable[[], float]=time.monotonic):
+        """
+        :param ttl_s: 値の有効期間（秒、None の場合は次の refresh まで有効）
+        """
+        self.values = dict(values) if values else {}
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.taken_at = clock()
+        self.hits = 0
+        self.misses = 0
+
+    def expired(self) -> bool:
+        return self.ttl_s is not None and self.clock() - self.taken_at > self.ttl_s
+
+    def get(self, key, default=None) -> Any:
+        if self.ttl_s is not None and self.expired():
+            # 期限切れの値は破棄し、以降の読み出しから新しい期間とする
+            self.values.clear()
+            self.taken_at = self.clock()
+        value = self.values.get(key, _MISS)
+        if value is _MISS:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        self.values[key] = value
+
+
+def snapshot_getter(func:Callable) -> Callable:
+    """
+    コントローラのゲッターをスナップショット経由にするデコレータ
+    スナップショットに値があればそれを返し、無ければ実際に読み出して格納する
+    （同一サイクル内の同じ呼び出しは1回のハードウェアアクセスにまとめられる）
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def getter(self, *args):
+        snapshot = self.snapshot
+        if snapshot is None:
+            return func(self, *args)
+        key = (name, *args) if args else name
+        value = snapshot.get(key, _MISS)
+        if value is _MISS:
+            value = func(self, *args)
+            snapshot.put(key, value)
+        return value
+    return getter
+
 
 class InterfaceCtrl(ABC):
+    # 複数スレッドから同時に呼び出してよいコントローラは True にする
+    thread_safe = False
+    # True の場合 open したセッションをサイクル間で維持する（False は従来どおりサイクル毎に open/close）
+    persistent_session = False
+    # セッション維持時に keepalive / is_healthy を呼ぶ間隔（秒、None の場合は呼ばない）
+    keepalive_interval_s = None
+    # snapshot_getter のゲッターが参照する現在のスナップショット（None の場合は常に実際に読み出す）
+    snapshot = None
+    # スナップショットの有効期間（秒、None の場合は次の refresh まで）
+    snapshot_ttl_s = None
+    # リセット・再接続時に呼ばれる関数（add_reset_hook で登録）
+    reset_hooks = ()
+
     def __init__(self):
         print("Call InterfaceCtrl::__init__\n")
     
@@ -15,4 +98,259 @@ class InterfaceCtrl(ABC):
     @abstractmethod
     def close(self) -> None:
         pass
-    
+
+    def read_many(self, keys:Iterable[str]) -> Dict[str, Any]:
+        """
+        複数の読み出しキーを1回のハードウェアアクセスでまとめて取得する（任意実装）
+        取得できなかったキーは戻り値に含めない（各パラメータの input_func で個別に読み出す）
+        既定では何も取得せず、全て個別読み出しとなる
+        """
+        return {}
+
+    def new_snapshot(self, values:Optional[Dict[Any, Any]]=None) -> CtrlSnapshot:
+        """
+        新しいスナップショットに切り替える（refresh の中で呼ぶ）
+        :param values: refresh でまとめて取得した値（ゲッターのキー -> 値）
+        """
+        self.snapshot = CtrlSnapshot(values, self.snapshot_ttl_s)
+        return self.snapshot
+
+    def event_fileno(self) -> Optional[int]:
+        """
+        値の変化を通知する fd（eventfd・パイプ・UIO 等、任意実装）
+        InterfaceCard は待機中にこの fd を select で待ち、読み込み可能になると read_events を呼ぶ
+        対応しない場合は None（従来どおり周期ポーリングのみ）
+        """
+        return None
+
+    def read_events(self) -> Iterable[str]:
+        """
+        event_fileno が読み込み可能になった時に呼ばれる（任意実装）
+        fd の通知を読み捨て、通知のあったイベントグループ名を返す
+        """
+        return ()
+
+    def add_reset_hook(self, hook:Callable[[str], None]) -> None:
+        """リセット・再接続時に理由を引数として呼ばれる関数を登録する"""
+        self.reset_hooks = self.reset_hooks + (hook,)
+
+    def notify_reset(self, reason:str="reset") -> None:
+        """
+        ハードウェアのリセット・再接続を通知する（FPGA の再コンフィグ等を検知した場合に呼ぶ）
+        InterfaceCard は ConstParameter の値を読み直す
+        """
+        logger.info("コントローラのリセットを通知します: %s", reason)
+        for hook in self.reset_hooks:
+            hook(reason)
+
+    def keepalive(self) -> None:
+        """セッション維持中、一定時間アクセスが無い場合に呼ばれる（任意実装）"""
+        pass
+
+    def is_healthy(self) -> bool:
+        """
+        セッションが使用可能かを返す（任意実装）
+        False を返すか例外を送出した場合、セッションを閉じて再接続する
+        """
+        return True
+
+
+class CtrlSession:
+    """
+    InterfaceCard が使うコントローラのセッション管理
+    persistent が False の場合は begin/end がそのまま open/close になる（従来の動作）
+    True の場合はセッションを開いたまま維持し、待機中に keepalive と健全性確認を行い、
+    異常時は閉じて指数バックオフで再接続する
+    """
+    def __init__(
+            self,
+            ctrl:InterfaceCtrl,
+            persistent:Optional[bool]=None,
+            keepalive_s:Optional[float]=None,
+            backoff_s:float=0.5,
+            max_backoff_s:float=30.0,
+            clock:Callable[[], float]=time.monotonic
+    ):
+        """
+        :param persistent: None の場合はコントローラの persistent_session に従う
+        :param keepalive_s: None の場合はコントローラの keepalive_interval_s に従う
+        :param backoff_s: 再接続に失敗した場合の待ち時間（連続失敗毎に倍、max_backoff_s まで）
+        """
+        self.ctrl = ctrl
+        self.persistent = (ctrl.persistent_session is True) if persistent is None else persistent
+        if keepalive_s is None:
+            keepalive_s = ctrl.keepalive_interval_s
+        self.keepalive_s = keepalive_s if isinstance(keepalive_s, (int, float)) and keepalive_s > 0 else None
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.clock = clock
+        self.is_open = False
+        self.failures = 0
+        self.reconnects = 0
+        # 一度でも接続したか（以降の接続は再接続としてコントローラに通知する）
+        self._connected = False
+        self._retry_at = 0.0
+        self._last_used = clock()
+        self._last_check = self._last_used
+
+    def begin(self) -> bool:
+        """
+        サイクルの開始（open）
+        :return: セッションが使用可能であれば True（再接続の待ち時間中は False）
+        """
+        if not self.persistent:
+            self.ctrl.open()
+            return True
+        if self.is_open:
+            return True
+        return self._connect()
+
+    def end(self) -> None:
+        """サイクルの終了（close、セッション維持時は閉じない）"""
+        if not self.persistent:
+            self.ctrl.close()
+            return
+        self._last_used = self.clock()
+
+    def _connect(self) -> bool:
+        now = self.clock()
+        if now < self._retry_at:
+            return False
+        try:
+            self.ctrl.open()
+        except Exception as e:
+            self.failures += 1
+            delay = min(self.max_backoff_s, self.backoff_s * (2 ** (self.failures - 1)))
+            self._retry_at = now + delay
+            logger.warning("コントローラの接続に失敗しました (%d 回目、%.1f 秒後に再試行): %s", self.failures, delay, e)
+            return False
+        if self.failures:
+            self.reconnects += 1
+            logger.warning("コントローラに再接続しました (%d 回失敗後)", self.failures)
+        self.failures = 0
+        self.is_open = True
+        self._last_used = self._last_check = now
+        if self._connected:
+            notify_reset = getattr(self.ctrl, "notify_reset", None)
+            if notify_reset is not None:
+                notify_reset("reconnect")
+        self._connected = True
+        return True
+
+    def fail(self, error:Optional[BaseException]=None) -> None:
+        """セッション中の異常を通知する（セッションを閉じ、次の begin で再接続する）"""
+        if not self.persistent or not self.is_open:
+            return
+        logger.warning("コントローラのセッションを閉じて再接続します: %s", error)
+        self._drop()
+
+    def _drop(self) -> None:
+        self.is_open = False
+        try:
+            self.ctrl.close()
+        except Exception as e:
+            logger.debug("close に失敗しました: %s", e)
+
+    def next_idle(self) -> Optional[float]:
+        """次に idle を呼ぶべきまでの秒数（不要な場合は None）"""
+        if not self.persistent:
+            return None
+        if not self.is_open:
+            return max(0.0, self._retry_at - self.clock())
+        if self.keepalive_s is None:
+            return None
+        return max(0.0, self._last_check + self.keepalive_s - self.clock())
+
+    def idle(self) -> None:
+        """
+        待機中に呼ぶ
+        keepalive_s 毎に健全性を確認し（アクセスが無ければ keepalive も送る）、異常であれば再接続する
+        """
+        if not self.persistent:
+            return
+        if not self.is_open:
+            self._connect()
+            return
+        if self.keepalive_s is None:
+            return
+        now = self.clock()
+        if now - self._last_check < self.keepalive_s:
+            return
+        self._last_check = now
+        try:
+            if now - self._last_used >= self.keepalive_s:
+                self.ctrl.keepalive()
+                self._last_used = now
+            healthy = self.ctrl.is_healthy() is not False
+        except Exception as e:
+            logger.warning("keepalive に失敗しました: %s", e)
+            healthy = False
+        if not healthy:
+            self.fail("健全性確認に失敗しました")
+            self._connect()
+
+    def close(self) -> None:
+        """維持しているセッションを閉じる"""
+        if self.persistent and self.is_open:
+            self._drop()
+
+
+class SerializedCtrl:
+    """
+    スレッドセーフでないコントローラへの呼び出しをロックで直列化するラッパー
+    メソッド以外の属性はそのまま返す
+    """
+    def __init__(self, ctrl:InterfaceCtrl, lock=None):
+        self._ctrl = ctrl
+        self._lock = lock if lock is not None else threading.RLock()
+
+    def __getattr__(self, name:str) -> Any:
+        attr = getattr(self._ctrl, name)
+        if not callable(attr):
+            return attr
+        lock = self._lock
+
+        @functools.wraps(attr)
+        def locked(*args, **kwargs):
+            with lock:
+                return attr(*args, **kwargs)
+        return locked
+
+
+class AsyncInterfaceCtrl(ABC):
+    """asyncio 用のコントローラ基底クラス"""
+    @abstractmethod
+    async def open(self) -> None:
+        pass
+
+    @abstractmethod
+    async def refresh(self) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+
+class AsyncCtrlAdapter(AsyncInterfaceCtrl):
+    """
+    既存の同期コントローラを AsyncInterfaceCtrl として扱うためのラッパー
+    open/refresh/close はスレッドで実行し、それ以外の属性は元のコントローラに委譲する
+    （mlb_func の同期ハンドラはそのまま利用できる）
+    """
+    def __init__(self, ctrl:InterfaceCtrl):
+        self.ctrl = ctrl
+        # ハンドラはスレッドから呼ばれるため、スレッドセーフでなければ直列化する
+        self._sync = ctrl if ctrl.thread_safe is True else SerializedCtrl(ctrl)
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self._sync.open)
+
+    async def refresh(self) -> None:
+        await asyncio.to_thread(self._sync.refresh)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._sync.close)
+
+    def __getattr__(self, name:str) -> Any:
+        return getattr(self._sync, name)
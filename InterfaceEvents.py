@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAXSIZE = 1000
+
+
+class ChangeEvent:
+    """パラメータの値の変化（name は "device/file"）"""
+    __slots__ = ("name", "old_value", "new_value", "timestamp")
+
+    def __init__(self, name:str, old_value:Any, new_value:Any, timestamp:float):
+        self.name = name
+        self.old_value = old_value
+        self.new_value = new_value
+        self.timestamp = timestamp
+
+    @property
+    def device(self) -> str:
+        return self.name.partition("/")[0]
+
+    @property
+    def filename(self) -> str:
+        return self.name.partition("/")[2]
+
+    def __repr__(self):
+        return f"ChangeEvent({self.name!r}, {self.old_value!r} -> {self.new_value!r}, {self.timestamp})"
+
+
+class Subscription:
+    """
+    購読1件分のキュー
+    キューは maxsize 件で上限とし、溢れた場合は最も古いイベントを捨てる（dropped に件数を数える）
+    callback を指定した場合は専用スレッドで呼び出す（sync=True の場合はポーリング処理の中で直接呼ぶ）
+    """
+    def __init__(self, pattern:str, callback:Optional[Callable[[ChangeEvent], None]]=None, maxsize:int=DEFAULT_MAXSIZE, sync:bool=False):
+        self.pattern = pattern
+        self.callback = callback
+        self.sync = sync
+        self.dropped = 0
+        self.closed = False
+        self._queue = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._thread = None
+        if callback is not None and not sync:
+            self._thread = threading.Thread(target=self._run, name=f"subscriber:{pattern}", daemon=True)
+            self._thread.start()
+
+    def matches(self, name:str) -> bool:
+        return fnmatchcase(name, self.pattern)
+
+    def _put(self, event:ChangeEvent) -> None:
+        if self.sync:
+            try:
+                self.callback(event)
+            except Exception:
+                logger.exception("購読者の処理でエラーが発生しました: %s", self.pattern)
+            return
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout:Optional[float]=None) -> Optional[ChangeEvent]:
+        """イベントを1件取り出す（timeout 秒以内に届かない、または close された場合は None）"""
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait_for(lambda: self._queue or self.closed, timeout)
+            return self._queue.popleft() if self._queue else None
+
+    def get_all(self) -> List[ChangeEvent]:
+        """溜まっているイベントを全て取り出す（待たない）"""
+        with self._cond:
+            events = list(self._queue)
+            self._queue.clear()
+            return events
+
+    def _run(self) -> None:
+        while True:
+            event = self.get()
+            if event is None:
+                if self.closed:
+                    return
+                continue
+            try:
+                self.callback(event)
+            except Exception:
+                logger.exception("購読者の処理でエラーが発生しました: %s", self.pattern)
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+
+
+class ChangeBus:
+    """
+    パラメータの値の変化を購読者に配信する
+    購読は "device/file" に対する glob パターン（"ethport*/linkgood"、"fpga/*" など）で指定する
+    """
+    def __init__(self, clock:Callable[[], float]=time.time):
+        self.clock = clock
+        self._subscriptions: List[Subscription] = []
+        # name -> 一致する購読のリスト（購読の追加・削除で破棄する）
+        self._matches: Dict[str, List[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._attached = set()
+
+    def attach(self, name:str, param) -> None:
+        """パラメータの更新（update_hooks）を name で配信する"""
+        if name in self._attached:
+            return
+        self._attached.add(name)
+
+        def publish(param, old_value, new_value):
+            self.publish(name, old_value, new_value)
+        param.update_hooks.append(publish)
+
+    def subscribe(self, pattern:str, callback:Optional[Callable[[ChangeEvent], None]]=None, maxsize:int=DEFAULT_MAXSIZE, sync:bool=False) -> Subscription:
+        subscription = Subscription(pattern, callback, maxsize, sync)
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+            self._matches = {}
+        return subscription
+
+    def unsubscribe(self, subscription:Subscription) -> None:
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+            self._matches = {}
+        subscription.close()
+
+    def publish(self, name:str, old_value:Any, new_value:Any) -> None:
+        matches = self._matches.get(name)
+        if matches is None:
+            subscriptions = self._subscriptions
+            matches = [s for s in subscriptions if s.matches(name)]
+            with self._lock:
+                if subscriptions is self._subscriptions:
+                    self._matches[name] = matches
+        if not matches:
+            return
+        event = ChangeEvent(name, old_value, new_value, self.clock())
+        for subscription in matches:
+            subscription._put(event)
+
+    def close(self) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions
+            self._subscriptions = []
+            self._matches = {}
+        for subscription in subscriptions:
+            subscription.close()
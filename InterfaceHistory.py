@@ -0,0 +1,277 @@
+import time
+
+from array import array
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 既定の間引き段（バケット幅[秒], 保持数）: 1秒 x 5分、1分 x 1日、1時間 x 93日
+DEFAULT_TIERS = ((1.0, 300), (60.0, 1440), (3600.0, 24 * 93))
+DEFAULT_RAW_CAPACITY = 1024
+
+
+def _parse_int(base:int) -> Callable[[Any], float]:
+    def parse(value):
+        return float(int(str(value).strip(), base))
+    return parse
+
+
+def compile_parser(spec) -> Callable[[Any], float]:
+    """
+    値を数値に変換する関数の指定を関数に変換する（config.json の "history.parsers" 用）
+    関数はそのまま、"float" / "int"、{"base": 16} は指定した基数の整数として変換する
+    """
+    if callable(spec):
+        return spec
+    if spec == "float":
+        return float
+    if spec == "int":
+        return _parse_int(10)
+    if isinstance(spec, dict) and set(spec) == {"base"} and spec["base"] in (2, 8, 10, 16):
+        return _parse_int(spec["base"])
+    raise ValueError(f"未対応の変換の指定です: {spec!r}")
+
+
+def parser_for(param, default:Callable[[Any], float]=float) -> Callable[[Any], float]:
+    """
+    パラメータの値を数値に変換する関数を返す
+    バリデータが基数 (base) を持つ場合（{"hex": ...}、validate_percent 等）はその基数の整数として変換する
+    （統計等のラッパーで包まれている場合は __wrapped__ をたどって元のバリデータの基数を見る）
+    """
+    func = param.validator_func
+    base = getattr(func, "base", None)
+    while base is None and getattr(func, "__wrapped__", None) is not None:
+        func = func.__wrapped__
+        base = getattr(func, "base", None)
+    if isinstance(base, int) and base != 10:
+        return _parse_int(base)
+    return default
+
+
+def _zeros(typecode:str, capacity:int) -> array:
+    return array(typecode, bytes(array(typecode).itemsize * capacity))
+
+
+class _Ring:
+    """固定長リングバッファの添字管理（古い順の論理位置 -> 物理位置）"""
+    def __init__(self, capacity:int):
+        if capacity <= 0:
+            raise ValueError(f"capacity は1以上で指定してください: {capacity}")
+        self.capacity = capacity
+        self.count = 0
+        # 次に書き込む物理位置
+        self.head = 0
+
+    def _advance(self) -> int:
+        index = self.head
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return index
+
+    def _physical(self, i:int) -> int:
+        return (self.head - self.count + i) % self.capacity
+
+    def _bisect(self, times:array, t:float) -> int:
+        """times[論理位置] >= t となる最初の論理位置"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[self._physical(mid)] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _span(self, times:array, start:Optional[float], end:Optional[float]):
+        first = 0 if start is None else self._bisect(times, start)
+        last = self.count if end is None else self._bisect(times, end)
+        return (self._physical(i) for i in range(first, last))
+
+
+class RawSeries(_Ring):
+    """(時刻, 値) のリングバッファ（時刻は double、値は float32）"""
+    TYPECODES = ("d", "f")
+
+    def __init__(self, capacity:int):
+        super().__init__(capacity)
+        self.times = _zeros("d", capacity)
+        self.values = _zeros("f", capacity)
+
+    @classmethod
+    def bytes_for(cls, capacity:int) -> int:
+        return capacity * sum(array(t).itemsize for t in cls.TYPECODES)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bytes_for(self.capacity)
+
+    def append(self, t:float, value:float) -> None:
+        index = self._advance()
+        self.times[index] = t
+        self.values[index] = value
+
+    def query(self, start:Optional[float]=None, end:Optional[float]=None) -> List[Tuple[float, float]]:
+        """start <= 時刻 < end の (時刻, 値) を古い順に返す"""
+        return [(self.times[i], self.values[i]) for i in self._span(self.times, start, end)]
+
+
+class TierSeries(_Ring):
+    """
+    バケット幅毎に min/max/平均/件数 へ間引いたリングバッファ
+    集計中のバケットは確定するまで配列に書き込まない
+    """
+    # 開始時刻, min, max, 合計, 件数
+    TYPECODES = ("d", "f", "f", "d", "I")
+
+    def __init__(self, interval_s:float, capacity:int):
+        super().__init__(capacity)
+        self.interval_s = interval_s
+        self.times = _zeros("d", capacity)
+        self.mins = _zeros("f", capacity)
+        self.maxs = _zeros("f", capacity)
+        self.sums = _zeros("d", capacity)
+        self.counts = _zeros("I", capacity)
+        self._bucket = None
+        self._min = self._max = self._sum = 0.0
+        self._count = 0
+
+    @classmethod
+    def bytes_for(cls, capacity:int) -> int:
+        return capacity * sum(array(t).itemsize for t in cls.TYPECODES)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bytes_for(self.capacity)
+
+    def _flush(self) -> None:
+        index = self._advance()
+        self.times[index] = self._bucket
+        self.mins[index] = self._min
+        self.maxs[index] = self._max
+        self.sums[index] = self._sum
+        self.counts[index] = self._count
+
+    def add(self, t:float, value:float) -> None:
+        bucket = t - (t % self.interval_s)
+        if bucket != self._bucket:
+            if self._count:
+                self._flush()
+            self._bucket = bucket
+            self._min = self._max = self._sum = value
+            self._count = 1
+            return
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+        self._sum += value
+        self._count += 1
+
+    def query(self, start:Optional[float]=None, end:Optional[float]=None) -> List[Tuple[float, float, float, float, int]]:
+        """start <= バケット開始時刻 < end の (開始時刻, min, max, 平均, 件数) を古い順に返す（集計中のバケットを含む）"""
+        result = [
+            (self.times[i], self.mins[i], self.maxs[i], self.sums[i] / self.counts[i], self.counts[i])
+            for i in self._span(self.times, start, end)
+        ]
+        if self._count and (start is None or self._bucket >= start) and (end is None or self._bucket < end):
+            result.append((self._bucket, self._min, self._max, self._sum / self._count, self._count))
+        return result
+
+
+class ParameterHistory:
+    """1パラメータ分の履歴（生の値と間引き段）"""
+    def __init__(self, raw_capacity:int=DEFAULT_RAW_CAPACITY, tiers:Sequence[Tuple[float, int]]=DEFAULT_TIERS):
+        self.raw = RawSeries(raw_capacity)
+        self.tiers = [TierSeries(interval_s, capacity) for interval_s, capacity in tiers]
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.nbytes + sum(tier.nbytes for tier in self.tiers)
+
+    def record(self, t:float, value:float) -> None:
+        self.raw.append(t, value)
+        for tier in self.tiers:
+            tier.add(t, value)
+
+    def query(self, start:Optional[float]=None, end:Optional[float]=None, resolution:Optional[float]=None) -> list:
+        """
+        :param resolution: None の場合は生の値 [(時刻, 値)]
+                           秒を指定した場合はバケット幅がそれ以上で最も細かい段 [(開始時刻, min, max, 平均, 件数)]
+        """
+        if resolution is None:
+            return self.raw.query(start, end)
+        for tier in self.tiers:
+            if tier.interval_s >= resolution:
+                return tier.query(start, end)
+        if not self.tiers:
+            raise ValueError("間引き段がありません")
+        return self.tiers[-1].query(start, end)
+
+
+class HistoryStore:
+    """
+    数値パラメータの履歴を保持する
+    値の更新時（update_hooks）に記録するため、平均は記録された値の単純平均となる
+    数値に変換できない値は記録しない
+    """
+    def __init__(
+            self,
+            raw_capacity:int=DEFAULT_RAW_CAPACITY,
+            tiers:Sequence[Tuple[float, int]]=DEFAULT_TIERS,
+            parse:Callable[[Any], float]=float,
+            clock:Callable[[], float]=time.time
+    ):
+        """
+        :param raw_capacity: 生の値の保持数
+        :param tiers: 間引き段の (バケット幅[秒], 保持数)
+        :param parse: 値を数値に変換する関数（パラメータ毎には attach で指定する、バリデータが基数を持つ場合はそちらを優先する）
+        """
+        self.raw_capacity = raw_capacity
+        self.tiers = tuple(tiers)
+        self.parse = parse
+        self.clock = clock
+        self.series: Dict[str, ParameterHistory] = {}
+        self._attached = set()
+        # 数値に変換できず記録しなかった回数
+        self.rejected = 0
+
+    def bytes_per_parameter(self) -> int:
+        """1パラメータあたりのメモリ使用量（固定、全体の上限はパラメータ数倍）"""
+        return RawSeries.bytes_for(self.raw_capacity) + sum(
+            TierSeries.bytes_for(capacity) for _, capacity in self.tiers
+        )
+
+    def attach(self, name:str, param, parse:Optional[Callable[[Any], float]]=None) -> None:
+        """
+        パラメータの更新を name で記録する
+        履歴の領域は最初に数値として記録できた時点で確保する（数値でないパラメータには確保しない）
+        """
+        if name in self._attached:
+            return
+        self._attached.add(name)
+        parse = parse if parse is not None else parser_for(param, self.parse)
+        clock = self.clock
+
+        def record(param, old_value, new_value):
+            try:
+                value = parse(new_value)
+            except (TypeError, ValueError):
+                self.rejected += 1
+                return
+            history = self.series.get(name)
+            if history is None:
+                history = self.series[name] = ParameterHistory(self.raw_capacity, self.tiers)
+            history.record(clock(), value)
+        param.update_hooks.append(record)
+        # 登録時点の値も記録する
+        if param._value is not None:
+            record(param, None, param._value)
+
+    def query(self, name:str, start:Optional[float]=None, end:Optional[float]=None, resolution:Optional[float]=None) -> list:
+        """name のパラメータの履歴を返す（ParameterHistory.query を参照）"""
+        history = self.series.get(name)
+        if history is None:
+            if name in self._attached:
+                return []
+            raise KeyError(name)
+        return history.query(start, end, resolution)
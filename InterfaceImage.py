@@ -0,0 +1,228 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# ステータスイメージのレイアウト
+#
+#   ヘッダ (32 byte)
+#     magic(4s) version(H) reserved(H) count(I) slot_size(I) table_offset(I) data_offset(I) seq(Q)
+#   オフセットテーブル (capacity * 72 byte、使用中は先頭の count 件)
+#     name(64s, "device/file" を UTF-8 で NUL 詰め) slot_offset(I) reserved(I)
+#   スロット (capacity * slot_size byte)
+#     length(H) value(slot_size - 2 byte)
+#
+# seq は書き込み中は奇数、書き込み完了で偶数になる（seqlock）
+# 読み出し側は seq が偶数かつ前後で一致した場合のみ値を採用する
+# 名前の追加は空きのエントリ・スロットに書いてから count を増やす（既存のスロットの位置は変わらない）
+MAGIC = b"MLBI"
+# InterfaceCard が既定で作成するイメージファイル名（card_directory 直下）
+STATUS_IMAGE_NAME = ".status.img"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIIII")
+_SEQ = struct.Struct("<Q")
+_SEQ_OFFSET = _HEADER.size
+HEADER_SIZE = _HEADER.size + _SEQ.size
+_ENTRY = struct.Struct("<64sII")
+_LENGTH = struct.Struct("<H")
+NAME_SIZE = 64
+
+
+def truncate_utf8(data:bytes, size:int) -> bytes:
+    """UTF-8 のバイト列を size バイト以内に切り詰める（文字の途中では切らない）"""
+    if len(data) <= size:
+        return data
+    end = size
+    # 継続バイト (10xxxxxx) の途中であれば文字の先頭まで戻る
+    while end > 0 and (data[end] & 0xC0) == 0x80:
+        end -= 1
+    return data[:end]
+
+
+def _encode_name(name:str) -> bytes:
+    encoded = name.encode("utf-8")
+    if len(encoded) > NAME_SIZE:
+        raise ValueError(f"名前が長すぎます: {name}")
+    return encoded
+
+
+class StatusImageWriter:
+    """
+    パラメータの値を固定レイアウトで mmap ファイルに書き込むクラス
+    スロットの位置は生成時に固定され、capacity までは append で名前を追加できる（読み出し側は開き直し不要）
+    """
+    def __init__(self, path:str, names:Iterable[str], slot_size:int=64, capacity:int=None):
+        """
+        :param path: イメージファイルのパス
+        :param names: "device/file" 形式の名前のリスト（この順にスロットを割り当てる）
+        :param slot_size: 1スロットのバイト数（先頭2バイトは長さ）
+        :param capacity: スロット数（省略時は names の件数、append で追加できる上限）
+        """
+        self.path = path
+        self.names: List[str] = list(names)
+        self.slot_size = slot_size
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self._lock = threading.Lock()
+
+        count = len(self.names)
+        self.capacity = max(capacity or 0, count)
+        self.table_offset = table_offset = HEADER_SIZE
+        data_offset = table_offset + self.capacity * _ENTRY.size
+        self.data_offset = data_offset
+        size = data_offset + self.capacity * slot_size
+
+        # 読み出し側が初期化途中のファイルを開かないよう、一時ファイルで作成して置き換える
+        buf = bytearray(size)
+        _HEADER.pack_into(buf, 0, MAGIC, VERSION, 0, count, slot_size, table_offset, data_offset)
+        for i, name in enumerate(self.names):
+            _ENTRY.pack_into(buf, table_offset + i * _ENTRY.size, _encode_name(name), data_offset + i * slot_size, 0)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buf)
+        os.replace(tmp_path, path)
+
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+
+    def append(self, names:Iterable[str]) -> bool:
+        """
+        名前を空きのスロットに追加する（既にある名前は無視する）
+        :return: capacity を超える場合は何もせず False（作り直しが必要）
+        """
+        with self._lock:
+            new = [name for name in dict.fromkeys(names) if name not in self.index]
+            if not new:
+                return True
+            if len(self.names) + len(new) > self.capacity:
+                return False
+            encoded = [_encode_name(name) for name in new]
+            seq = _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+            _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 1)
+            for name, raw in zip(new, encoded):
+                i = len(self.names)
+                _ENTRY.pack_into(self._mm, self.table_offset + i * _ENTRY.size, raw, self.data_offset + i * self.slot_size, 0)
+                self.names.append(name)
+                self.index[name] = i
+            _HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, len(self.names), self.slot_size, self.table_offset, self.data_offset)
+            _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 2)
+            return True
+
+    def _encode(self, value) -> bytes:
+        data = (str(value) if value is not None else "").encode("utf-8")
+        capacity = self.slot_size - _LENGTH.size
+        if len(data) > capacity:
+            logger.warning("ステータスイメージ: 値がスロットに収まらないため切り詰めます (%d > %d)", len(data), capacity)
+            data = truncate_utf8(data, capacity)
+        return data
+
+    def set(self, name:str, value) -> None:
+        """1件の値を書き込む"""
+        self.set_many({name: value})
+
+    def set_many(self, values:Dict[str, object]) -> None:
+        """複数の値をまとめて書き込む（読み出し側からは1回の更新に見える）"""
+        encoded = [(self.index[name], self._encode(value)) for name, value in values.items() if name in self.index]
+        if not encoded:
+            return
+        with self._lock:
+            seq = _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+            _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 1)
+            for i, data in encoded:
+                offset = self.data_offset + i * self.slot_size
+                _LENGTH.pack_into(self._mm, offset, len(data))
+                start = offset + _LENGTH.size
+                self._mm[start:start + len(data)] = data
+            _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 2)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+
+class StatusImageReader:
+    """
+    StatusImageWriter が書き込んだイメージを読み出すクラス
+    ファイルは1回だけ開き、以降はメモリの参照のみで値を取得する
+    """
+    def __init__(self, path:str, retries:int=100):
+        self.path = path
+        self.retries = retries
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._inode = os.fstat(f.fileno()).st_ino
+        self._view = memoryview(self._mm)
+
+        magic, version, _, _, slot_size, _, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"ステータスイメージの形式が不正です: {path}")
+        self.slot_size = slot_size
+        self.offsets: Dict[str, int] = {}
+        self._load_entries()
+
+    def _load_entries(self) -> None:
+        """書き込み側が append した名前を読み込む（既に読んだエントリは変わらない）"""
+        count, _, table_offset = _HEADER.unpack_from(self._mm, 0)[3:6]
+        for i in range(len(self.offsets), count):
+            raw_name, slot_offset, _ = _ENTRY.unpack_from(self._mm, table_offset + i * _ENTRY.size)
+            self.offsets[raw_name.rstrip(b"\0").decode("utf-8")] = slot_offset
+
+    @property
+    def names(self) -> List[str]:
+        self._load_entries()
+        return list(self.offsets)
+
+    def is_stale(self) -> bool:
+        """レイアウト変更等でイメージが作り直された場合は True（開き直しが必要）"""
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    def seq(self) -> int:
+        return _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+
+    def view(self, name:str) -> memoryview:
+        """
+        値のバイト列をコピーせずに返す
+        書き込み中の値を参照する可能性があるため、一貫性が必要な場合は get/get_all を使う
+        """
+        offset = self.offsets.get(name)
+        if offset is None:
+            self._load_entries()
+            offset = self.offsets[name]
+        length = _LENGTH.unpack_from(self._mm, offset)[0]
+        start = offset + _LENGTH.size
+        return self._view[start:start + length]
+
+    def _consistent(self, read):
+        for _ in range(self.retries):
+            before = self.seq()
+            if before & 1:
+                continue
+            result = read()
+            if self.seq() == before:
+                return result
+        raise RuntimeError("ステータスイメージの読み出しが書き込みと競合し続けました")
+
+    def get(self, name:str) -> str:
+        """1件の値を取得する"""
+        return self._consistent(lambda: bytes(self.view(name))).decode("utf-8", errors="ignore")
+
+    def get_all(self) -> Dict[str, str]:
+        """全ての値を一貫した状態で取得する"""
+        self._load_entries()
+        raw = self._consistent(lambda: {name: bytes(self.view(name)) for name in self.offsets})
+        return {name: data.decode("utf-8", errors="ignore") for name, data in raw.items()}
+
+    def close(self) -> None:
+        self._view.release()
+        self._mm.close()
@@ -0,0 +1,233 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+from collections import deque
+from typing import Dict, List, Optional, TextIO
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    直近のログレコードを一定件数だけ保持するハンドラ
+    レコードは整形せずに保持し、dump() で要求された時点で整形する
+    dump_level 以上のレコードを受け取ると、前回の自動出力以降の履歴を target に出力する
+    （同じレコードを繰り返し出力しない。自動出力は dump_interval_s 秒に1回まで）
+    出力するのは dump_level 未満のレコードのみ（dump_level 以上は target が既に出力している）
+    """
+    def __init__(self, capacity:int=1000, dump_level:int=logging.ERROR, target:Optional[logging.Handler]=None, dump_interval_s:float=10.0):
+        super().__init__()
+        self.buffer = deque(maxlen=capacity)
+        self.dump_level = dump_level
+        self.target = target
+        self.dump_interval_s = dump_interval_s
+        # 前回の自動出力以降に記録した件数と、前回の自動出力の時刻
+        self._since_dump = 0
+        self._last_dump = None
+
+    def emit(self, record:logging.LogRecord) -> None:
+        self.buffer.append(record)
+        self._since_dump += 1
+        if self.target is not None and record.levelno >= self.dump_level:
+            self._auto_dump(record)
+
+    def _auto_dump(self, trigger:logging.LogRecord) -> None:
+        now = time.monotonic()
+        if self._last_dump is not None and now - self._last_dump < self.dump_interval_s:
+            # 繰り返し発生するエラーで履歴を出力し続けないよう間引く（未出力の分は次回に含める）
+            return
+        count = min(self._since_dump, len(self.buffer))
+        records = list(self.buffer)[len(self.buffer) - count:]
+        self._since_dump = 0
+        self._last_dump = now
+        # 間引かれた間の dump_level 以上のレコード（trigger を含む）は出力済みのため繰り返さない
+        dump_level = self.dump_level
+        self._emit_records(self.target, [record for record in records if record.levelno < dump_level])
+
+    def records(self) -> List[logging.LogRecord]:
+        with self.lock:
+            return list(self.buffer)
+
+    def dump(self) -> List[str]:
+        """保持しているレコードを整形して返す"""
+        return [self.format(record) for record in self.records()]
+
+    def dump_to(self, handler:logging.Handler, exclude:Optional[logging.LogRecord]=None) -> None:
+        """保持しているレコードを handler に出力する（ハンドラのレベル・フィルタは無視する）"""
+        self._emit_records(handler, [record for record in self.records() if record is not exclude])
+
+    @staticmethod
+    def _emit_records(handler:logging.Handler, records:List[logging.LogRecord]) -> None:
+        if not records:
+            return
+        handler.emit(_marker(f"--- ログ履歴 {len(records)} 件 ---"))
+        for record in records:
+            handler.emit(record)
+        handler.emit(_marker("--- ログ履歴ここまで ---"))
+
+
+def _marker(message:str) -> logging.LogRecord:
+    return logging.LogRecord("InterfaceLog", logging.CRITICAL, __file__, 0, message, None, None)
+
+
+class _ModuleLevelFilter(logging.Filter):
+    """ロガー名（モジュール名）毎に出力するレベルを切り替えるフィルタ"""
+    def __init__(self, default:int, levels:Dict[str, int]):
+        super().__init__()
+        self.default = default
+        self.levels = levels
+        self._cache = {}
+
+    def _threshold(self, name:str) -> int:
+        threshold = self._cache.get(name)
+        if threshold is None:
+            threshold = self.default
+            # 最も長く一致するモジュール名を採用する ("a.b" は "a" の設定を引き継ぐ)
+            best = -1
+            for module, level in self.levels.items():
+                if (name == module or name.startswith(module + ".")) and len(module) > best:
+                    threshold, best = level, len(module)
+            self._cache[name] = threshold
+        return threshold
+
+    def filter(self, record:logging.LogRecord) -> bool:
+        return record.levelno >= self._threshold(record.name)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """レコードを整形せずにキューへ渡す（整形は出力スレッドで行う）"""
+    def prepare(self, record:logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class BatchingListener:
+    """
+    キューに溜まったレコードをまとめて整形し、1回の write/flush で出力するスレッド
+    """
+    _STOP = object()
+
+    def __init__(self, log_queue:queue.Queue, stream:TextIO, formatter:logging.Formatter, max_batch:int=256):
+        self.queue = log_queue
+        self.stream = stream
+        self.formatter = formatter
+        self.max_batch = max_batch
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(record is self._STOP for record in batch)
+            lines = [self.formatter.format(record) for record in batch if record is not self._STOP]
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if stop:
+                return
+
+    def stop(self) -> None:
+        """残っているレコードを出力してからスレッドを終了する"""
+        if self._thread is None:
+            return
+        self.queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+
+class LogSystem:
+    """configure_logging で構成したハンドラ一式"""
+    def __init__(self, output:logging.Handler, ring:RingBufferHandler, listener:BatchingListener):
+        self.output = output
+        self.ring = ring
+        self.listener = listener
+
+    def dump_ring(self) -> None:
+        """リングバッファの内容を出力先に書き出す（シグナルハンドラ等から呼ぶ）"""
+        self.ring.dump_to(self.output)
+
+    def stop(self) -> None:
+        root = logging.getLogger()
+        for handler in (self.output, self.ring):
+            root.removeHandler(handler)
+        self.listener.stop()
+
+
+_system: Optional[LogSystem] = None
+
+
+def _to_level(level) -> int:
+    return level if isinstance(level, int) else logging.getLevelName(str(level).upper())
+
+
+def configure_logging(
+        level="WARNING",
+        levels:Optional[Dict[str, str]]=None,
+        ring_size:int=1000,
+        ring_level="INFO",
+        stream:Optional[TextIO]=None,
+        fmt:str=DEFAULT_FORMAT
+) -> LogSystem:
+    """
+    ログ出力を構成する
+    :param level: 出力先に書き出すレベル（運用時は WARNING）
+    :param levels: モジュール毎のレベル（例 {"mlb_ctrl": "DEBUG"}）
+    :param ring_size: リングバッファに保持する件数
+    :param ring_level: リングバッファに記録するレベル
+    :param stream: 出力先（省略時は標準エラー）
+    """
+    global _system
+    if _system is not None:
+        _system.stop()
+
+    default_level = _to_level(level)
+    module_levels = {name: _to_level(module_level) for name, module_level in (levels or {}).items()}
+    ring_level = _to_level(ring_level)
+
+    formatter = logging.Formatter(fmt)
+    log_queue = queue.Queue()
+    output = _DeferredQueueHandler(log_queue)
+    output.addFilter(_ModuleLevelFilter(default_level, module_levels))
+    listener = BatchingListener(log_queue, stream if stream is not None else sys.stderr, formatter)
+
+    ring = RingBufferHandler(ring_size, target=output)
+    ring.setLevel(ring_level)
+    ring.setFormatter(formatter)
+
+    # ロガーのレベルより低いレコードは生成すらされない（整形も行われない）
+    root = logging.getLogger()
+    root.setLevel(min(default_level, ring_level))
+    root.addHandler(output)
+    root.addHandler(ring)
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(min(module_level, ring_level))
+
+    listener.start()
+    _system = LogSystem(output, ring, listener)
+    return _system
+
+
+def shutdown_logging() -> None:
+    global _system
+    if _system is not None:
+        _system.stop()
+        _system = None
+
+
+atexit.register(shutdown_logging)
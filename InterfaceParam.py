@@ -1,84 +1,193 @@
+import asyncio
+import inspect
+import logging
 import os
 import re
+import selectors
+import time
 
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from fnmatch import fnmatchcase
 from typing import Callable, Any, Optional
-from InterfaceCtrl import InterfaceCtrl
+from InterfaceCtrl import InterfaceCtrl, SerializedCtrl, CtrlSession
+from InterfaceWatch import create_watcher
+from InterfaceSchedule import PollScheduler
+from InterfaceImage import StatusImageWriter, STATUS_IMAGE_NAME
+from InterfaceStats import CardStats, timed, counted_validator
+from InterfaceHistory import HistoryStore, compile_parser
+from InterfaceEvents import ChangeBus, Subscription, DEFAULT_MAXSIZE
+from InterfaceServer import ControlServer
+from InterfaceWriter import FileWriter
+from InterfaceStorage import StorageBackend, FILE_STORAGE
+
+logger = logging.getLogger(__name__)
+
+async def _call_maybe_async(func:Callable, *args, executor=None) -> Any:
+    """
+    コルーチン関数は await し、同期関数（ファイルI/O等のブロッキング処理）は executor で実行する
+    """
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(executor, func, *args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
 
 class BaseParameter:
     """共通のプロパティを持つベースクラス"""
-    def __init__(self, filename:str, value:int=None, validator_func=None, input_func=None, output_func=None):
+    # 属性は固定（パラメータ数が多い構成でのメモリ削減、インスタンス毎の __dict__ を持たない）
+    __slots__ = (
+        "filename", "_value", "full_path", "validator_func", "input_func", "output_func",
+        "watched", "frozen", "period_ms", "max_period_ms", "read_key", "_file_stat", "update_hooks", "_last_invalid",
+        "file_writer", "storage",
+    )
+
+    def __init__(self, filename:str, value:int=None, validator_func=None, input_func=None, output_func=None, period_ms:int=None, read_key:str=None, max_period_ms:int=None):
         self.filename = filename
         self._value = value
         self.full_path = None
         self.validator_func = validator_func
         self.input_func = input_func
         self.output_func = output_func
+        # True の場合は inotify で変更を検知するため、周期アクセスの対象外
+        self.watched = False
+        # True の場合は値が確定しているため、周期アクセスの対象外（ConstParameter）
+        self.frozen = False
+        # ポーリング周期 (None の場合はカードの既定周期)
+        self.period_ms = period_ms
+        # 適応周期の上限（変化の無い間は period_ms から max_period_ms まで周期を延ばす、None はカードの指定に従う）
+        self.max_period_ms = max_period_ms
+        # InterfaceCtrl.read_many で一括読み出しする際のキー
+        self.read_key = read_key
+        # 前回読み書きした時点のファイルの (st_ino, st_mtime_ns, st_size)
+        self._file_stat = None
+        # 値の更新時に (param, 旧値, 新値) で呼ばれる関数のリスト
+        self.update_hooks = []
+        # 直前にバリデーションで不正となった値（同じ値の再検証・再出力を省略する）
+        self._last_invalid = None
+        # 指定した場合 _update_file は InterfaceWriter.FileWriter に書き込みを依頼して戻る
+        self.file_writer = None
+        # 値の保存先（InterfaceCard に追加した時点でカードの保存先になる）
+        self.storage = FILE_STORAGE
 
     def validate(self,value:int) -> bool:
         """共通のバリデーション（例：ファイル名の存在チェック）"""
         if not self.filename:
-            print("エラー: ファイル名が空です。")
+            logger.error("エラー: ファイル名が空です。")
             return False
         if self.validator_func:
+            if value is not None and value == self._last_invalid:
+                return False
             if not self.validator_func(value):
-                print(f"エラー: 独自バリデーションに失敗しました ({self.filename}={value})")
+                logger.warning("エラー: 独自バリデーションに失敗しました (%s=%s)", self.filename, value)
+                self._last_invalid = value
                 return False
+            self._last_invalid = None
         return True
 
-    def prepare_file(self, target_dir:str) -> None:
-        """ファイルが存在しない場合に作成するメソッド"""
+    def prepare_file(self, target_dir:str, existing:set=None) -> None:
+        """
+        ファイルが存在しない場合に作成するメソッド
+        :param existing: target_dir 直下のエントリ名の集合（指定した場合は保存先の exists で存在確認しない）
+        """
         full_path = os.path.join(target_dir, self.filename)
         if not full_path:
             return
         
         self.full_path = full_path
 
-        if not os.path.exists(self.full_path):
-            print(f"prepare path: {self.full_path}")
-            # ディレクトリの再確認（ファイル名にパスが含まれる場合用）
-            os.makedirs(os.path.dirname(self.full_path), exist_ok=True)
+        listed = existing is not None and os.sep not in self.filename
+        exists = self.filename in existing if listed else self.storage.exists(self.full_path)
+        if not exists:
+            logger.debug("prepare path: %s", self.full_path)
+            if not listed:
+                # ディレクトリの再確認（ファイル名にパスが含まれる場合用）
+                self.storage.makedirs(os.path.dirname(self.full_path))
             
             # 初期値があれば書き込み、なければ空ファイル作成
             self._update_file(None, self._value)
-            print(f"[Input] ファイルを新規作成しました: {self.full_path}")
+            logger.info("[Input] ファイルを新規作成しました: %s", self.full_path)
         else:
-            print(f"already exist path: {self.full_path}")
+            logger.debug("already exist path: %s", self.full_path)
     
     def _update_file(self, Controller:InterfaceCtrl, value:int) -> None:
         content = str(value) if value is not None else ""
-        with open(self.full_path, 'w', encoding='utf-8') as f:
-            f.write(str(content))
+        if self.file_writer is not None:
+            self.file_writer.submit(self.full_path, content)
+            return
+        self.storage.write(self.full_path, content)
+        # 自身の書き込みで次回に再読込が発生しないよう stat を更新する
+        self._file_stat = self._stat_key()
+
+    def _stat_key(self) -> Optional[tuple]:
+        """
+        変更検知用の (st_ino, st_mtime_ns, st_size) を返す（ファイルが無い場合は None）
+        ファイル以外の保存先では StorageBackend.version
+        """
+        return self.storage.version(self.full_path)
 
     def _read_file_content(self, Contoller:InterfaceCtrl) -> str:
         """
         共通メソッド: ファイルの存在を確認し、内容を読み出す
-        ファイルが存在しない場合は None を返す
+        ファイルが存在しない場合、または前回から変更が無い場合は None を返す
         """
-        if not os.path.exists(self.full_path):
+        stat_key = self._stat_key()
+        if stat_key is None:
+            self._file_stat = None
+            return None
+        if stat_key == self._file_stat:
+            # 変更が無いため読み出し・バリデーション・比較を省略する
             return None
         try:
-            with open(self.full_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            content = self.storage.read(self.full_path)
         except Exception as e:
-            print(f"ファイル読み込みエラー ({self.full_path}): {e}")
+            logger.error("ファイル読み込みエラー (%s): %s", self.full_path, e)
+            # 同じ内容のまま毎周期読み直して同じエラーを出し続けないよう stat は更新する
+            self._file_stat = stat_key
+            return None
+        if content is None:
             return None
+        self._file_stat = stat_key
+        return content
         
     # リファクタリング用補助メソッド（コードの重複を避ける場合）
-    def _get_processed_input(self, controller: InterfaceCtrl):
-        new_val = self.input_func(controller) if self.input_func else None
+    def _get_processed_input(self, controller: InterfaceCtrl, prefetched: dict = None):
+        if prefetched is not None and self.read_key in prefetched:
+            # 一括読み出し済みの値を使う
+            new_val = prefetched[self.read_key]
+        else:
+            new_val = self.input_func(controller) if self.input_func else None
         return str(new_val).splitlines()[0] if new_val else new_val
 
     def _apply_update(self, controller: InterfaceCtrl, value: int):
+        old_value = self._value
         self._value = value
         if self.output_func:
             self.output_func(controller, self._value)
-        print(f"[Output] パラメータを更新しました（強制）: {self._value}")
+        logger.info("[Output] パラメータを更新しました: %s=%s", self.filename, self._value)
+        self._run_update_hooks(old_value)
+
+    async def _apply_update_async(self, controller, value, executor=None):
+        """_apply_update の asyncio 版"""
+        old_value = self._value
+        self._value = value
+        if self.output_func:
+            await _call_maybe_async(self.output_func, controller, self._value, executor=executor)
+        logger.info("[Output] パラメータを更新しました: %s=%s", self.filename, self._value)
+        self._run_update_hooks(old_value)
+
+    def _run_update_hooks(self, old_value) -> None:
+        for hook in self.update_hooks:
+            hook(self, old_value, self._value)
 
-    def handle_access(self, controller: InterfaceCtrl) -> None: 
+    def handle_access(self, controller: InterfaceCtrl, prefetched: dict = None) -> None: 
         """
         通常アクセス：値に変化があった場合のみ更新・通知を行う
+        :param prefetched: InterfaceCtrl.read_many の結果（read_key が含まれる場合に使用）
         """
-        processed_value = self._get_processed_input(controller)
+        processed_value = self._get_processed_input(controller, prefetched)
         
         if processed_value is None:
             return
@@ -87,11 +196,14 @@ class BaseParameter:
         if self.validate(processed_value) and processed_value != self._value:
             self._apply_update(controller, processed_value)
 
-    def handle_access_always(self, controller: InterfaceCtrl) -> None:
+    def handle_access_always(self, controller: InterfaceCtrl, prefetched: dict = None) -> None:
         """
         強制アクセス：値の変化に関わらず、バリデーションが通れば更新・通知を実行する
+        :param prefetched: InterfaceCtrl.read_many の結果（read_key が含まれる場合に使用）
         """
-        processed_value = self._get_processed_input(controller)
+        # ファイルに変更が無くても読み出すため stat のキャッシュを破棄する
+        self._file_stat = None
+        processed_value = self._get_processed_input(controller, prefetched)
         
         if processed_value is None:
             return
@@ -99,32 +211,91 @@ class BaseParameter:
         # 変更点：値の比較 (processed_value != self._value) を行わない
         if self.validate(processed_value):
             self._apply_update(controller, processed_value)
+
+    async def handle_access_async(self, controller, executor=None, force:bool=False) -> None:
+        """
+        handle_access / handle_access_always の asyncio 版
+        input_func / output_func はコルーチン関数であれば await し、同期関数であれば executor で実行する
+        :param force: True の場合 handle_access_always と同様に値の比較を行わない
+        """
+        if force:
+            self._file_stat = None
+        new_val = await _call_maybe_async(self.input_func, controller, executor=executor) if self.input_func else None
+        processed_value = str(new_val).splitlines()[0] if new_val else new_val
+
+        if processed_value is None:
+            return
+
+        if self.validate(processed_value) and (force or processed_value != self._value):
+            await self._apply_update_async(controller, processed_value, executor)
         
 
 class InputParameter(BaseParameter):
     """入力用パラメータクラス"""
+    __slots__ = ()
+
     def __init__(
             self, 
             filename:str, 
             value:int=None, 
             validator_func: Optional[Callable[[Any], bool]]=None, 
-            input_func: Optional[Callable] = None
+            input_func: Optional[Callable] = None,
+            period_ms: Optional[int] = None,
+            read_key: Optional[str] = None,
+            max_period_ms: Optional[int] = None
     ):
         output_func = self._update_file
-        super().__init__(filename, value, validator_func, input_func, output_func)
+        super().__init__(filename, value, validator_func, input_func, output_func, period_ms, read_key, max_period_ms)
         
 
+class ConstParameter(InputParameter):
+    """
+    固定値の入力用パラメータクラス（FPGA のバージョン等、ハードウェアのセッション中に変化しない値）
+    最初に読み出せた時点で値を確定し、以降は周期アクセスしない
+    コントローラのリセット・再接続（InterfaceCtrl.notify_reset）で確定を解除し、読み直す
+    """
+    __slots__ = ()
+
+    def __init__(
+            self,
+            filename:str,
+            value:int=None,
+            validator_func: Optional[Callable[[Any], bool]]=None,
+            input_func: Optional[Callable] = None,
+            read_key: Optional[str] = None
+    ):
+        super().__init__(filename, value, validator_func, input_func, read_key=read_key)
+
+    def validate(self, value:int) -> bool:
+        # 読み出した値がバリデーションを通った時点で確定する（値に変化が無い場合も含む）
+        if not super().validate(value):
+            return False
+        self.frozen = True
+        return True
+
+
 class OutputParameter(BaseParameter):
     """出力用パラメータクラス（ファイル -> メモリ）"""
+    __slots__ = ()
+
     def __init__(
             self, 
             filename:str, 
             value:int=None, 
             validator_func: Optional[Callable[[Any], bool]] = None, 
-            output_func: Optional[Callable[[Optional[InterfaceCtrl], Any], Any]] = None
+            output_func: Optional[Callable[[Optional[InterfaceCtrl], Any], Any]] = None,
+            period_ms: Optional[int] = None
     ):
         input_func = self._read_file_content
-        super().__init__(filename, value, validator_func, input_func, output_func)
+        super().__init__(filename, value, validator_func, input_func, output_func, period_ms)
+
+    def _get_processed_input(self, controller: InterfaceCtrl, prefetched: dict = None):
+        if prefetched is not None and self.full_path in prefetched:
+            # 保存先から一括読み出し済みの内容（InterfaceCard._prefetch_devices、無い場合は None）
+            # stat を持たない保存先のため、変化の有無は保持している値との比較で判断する
+            content = prefetched[self.full_path]
+            return str(content).splitlines()[0] if content else content
+        return super()._get_processed_input(controller, prefetched)
         
 
 class Device:
@@ -136,28 +307,113 @@ class Device:
         self.directory_name = directory_name
         self.parameters = parameters if parameters is not None else []
 
-    def access(self,controlller:InterfaceCtrl) -> None:
+    def access(self,controlller:InterfaceCtrl, parameters:list=None, prefetched:dict=None) -> None:
         """
         全パラメータに対して、仕様に基づいたアクセスメソッドを実行する
+        :param parameters: 指定した場合はそのパラメータのみアクセスする
+        :param prefetched: InterfaceCtrl.read_many で一括読み出しした値
         """
-        for param in self.parameters:
-            param.handle_access(controlller)
+        for param in (parameters if parameters is not None else self.parameters):
+            if param.watched or param.frozen:
+                continue
+            if prefetched is None:
+                param.handle_access(controlller)
+            else:
+                param.handle_access(controlller, prefetched)
+
+    def read_keys(self, parameters:list=None) -> list:
+        """アクセス対象（inotify で監視中のものを除く）のパラメータの read_key を返す"""
+        return [
+            param.read_key for param in (parameters if parameters is not None else self.parameters)
+            if param.read_key is not None and not param.watched and not param.frozen
+        ]
+
+    async def access_async(self, controller, parameters:list=None, executor=None) -> None:
+        """access の asyncio 版（デバイス内のパラメータは順に処理する）"""
+        for param in (parameters if parameters is not None else self.parameters):
+            if param.watched or param.frozen:
+                continue
+            await param.handle_access_async(controller, executor)
 
 class InterfaceCard:
     """
     複数のInterfaceを束ねて管理するカードクラス
     """
-    def __init__(self, InterfaceCtrl:InterfaceCtrl, card_directory:str, Devices:Device=None):
+    def __init__(self, InterfaceCtrl:InterfaceCtrl, card_directory:str, Devices:Device=None, watch:bool=False, default_period_ms:int=1000, max_workers:int=None, persistent_session:bool=None, keepalive_s:float=None, max_period_ms:int=None, backoff_factor:float=2.0, storage:StorageBackend=None):
         """
         :param card_directory: カードのルートディレクトリ名
         :param devices: device
+        :param watch: True の場合 OutputParameter のファイル変更を inotify で検知する
+        :param default_period_ms: period_ms 未指定のパラメータのポーリング周期
+        :param max_workers: 2以上の場合、デバイスのアクセスをスレッドプールで並列に実行する
+        :param persistent_session: True の場合コントローラのセッションをサイクル間で維持する（None はコントローラの指定に従う）
+        :param keepalive_s: セッション維持時の keepalive / 健全性確認の間隔（None はコントローラの指定に従う）
+        :param max_period_ms: 指定した場合 OutputParameter 以外を適応周期でポーリングする（poll_due / run）
+                              値に変化の無い間は周期を backoff_factor 倍ずつ max_period_ms まで延ばし、
+                              同じデバイスのパラメータに変化があれば period_ms に戻す
+        :param storage: パラメータの値の保存先（InterfaceStorage を参照、省略時はファイル、shutdown で close する）
         """
         self.card_directory = card_directory
+        self.storage = storage if storage is not None else FILE_STORAGE
         self.ctrl = InterfaceCtrl()
-        self.ctrl.open()
-        self.ctrl.refresh()
-        self.ctrl.close()
+        # open/close の単位（サイクル毎 または セッション維持）
+        self.session = CtrlSession(self.ctrl, persistent_session, keepalive_s)
+        if self.session.begin():
+            self.ctrl.refresh()
+            self.session.end()
         self.devices = []
+        # inotify が使えない場合は None（従来のポーリング動作）
+        self.watcher = create_watcher() if watch and self.storage.supports_watch else None
+        # 監視対象ファイルのフルパス -> OutputParameter
+        self._watched_params = {}
+        # イベントを読み出し済みで未処理のパラメータ（挿入順の集合として使う）
+        self._watch_changed = {}
+        # 要素は (device, param)
+        self.scheduler = PollScheduler(default_period_ms)
+        self.max_period_ms = max_period_ms
+        self.backoff_factor = backoff_factor
+        # 適応周期: デバイス -> 適応周期の項目、前回の poll_due 以降に値が変化したデバイス
+        self._adaptive_items = {}
+        self._changed_devices = set()
+        self._tracked_devices = set()
+        # ConstParameter の (device, param)、確定していないものがあれば True
+        self._const_items = []
+        self._const_pending = False
+        self._reported_overruns = {}
+        # mmap のステータスイメージ（enable_status_image で有効化）
+        self.status_image = None
+        self._image_names = {}
+        # 所要時間の統計（enable_stats で有効化、None の場合は計測しない）
+        self.stats = None
+        # 数値パラメータの履歴（enable_history で有効化）
+        self.history = None
+        # 値の変化の配信（最初の subscribe で有効化）
+        self.bus = None
+        # "device/file" -> パラメータ
+        self.parameters = {}
+        # Unix ソケットのサーバ（enable_server で有効化）
+        self.server = None
+        # InputParameter のファイルの書き込み（enable_write_behind で有効化、None の場合は同期で書き込む）
+        self.writer = None
+        # コントローラのイベントグループ -> "device/file" の glob パターンのリスト（map_event で登録）
+        self.event_groups = {}
+        # イベントグループ -> 対象の (device, param)（パラメータの追加・登録で破棄する）
+        self._event_items = {}
+        # wait で使う selector と登録済みの event_sources
+        self._selector = None
+        self._selector_sources = None
+        # 並列モード：スレッドセーフでないコントローラはロックで直列化し
+        # ファイルI/Oとバリデーションのみ並列に実行する
+        self._executor = None
+        self._access_ctrl = self.ctrl
+        if max_workers is not None and max_workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="card")
+            if self.ctrl.thread_safe is not True:
+                self._access_ctrl = SerializedCtrl(self.ctrl)
+        # コントローラのリセット・再接続で ConstParameter を読み直す
+        add_reset_hook = getattr(self.ctrl, "add_reset_hook", None)
+        if add_reset_hook is not None:
+            add_reset_hook(self.invalidate_constants)
         if Devices:
             for device in Devices:
                 self.add_device(device)
@@ -166,38 +422,738 @@ class InterfaceCard:
         """
         保持している全てのInterfaceのアクセスメソッドを順次実行する
         """
-        print(f"--- Card Status update Start: {self.card_directory} ---")
+        logger.debug("--- Card Status update Start: %s ---", self.card_directory)
+        start = time.perf_counter() if self.stats is not None else None
+
+        if not self._phase("open", self.session.begin):
+            logger.debug("--- Card status update Skip: コントローラ再接続待ち ---")
+            return
+
+        try:
+            self._phase("refresh", self.ctrl.refresh)
+
+            # 監視中のファイルに変更があれば同じセッション内で反映する
+            self._phase("watch", self._handle_watch_events)
+
+            # read_many に対応していれば全パラメータ分をまとめて読み出す
+            work = [(device, None) for device in self.devices]
+            prefetched = self._phase("prefetch", self._prefetch_devices, work)
 
-        self.ctrl.open()
-        
-        self.ctrl.refresh()
-        
-        for device in self.devices:
             # 各deviceのアクセス処理を実行
-            device.access(self.ctrl)
-            
-        self.ctrl.close()
+            self._phase("access", self._access_devices, work, prefetched)
+        except Exception as e:
+            self.session.fail(e)
+            raise
+
+        self._phase("close", self.session.end)
 
-        print(f"--- Card status update End ---")
+        if start is not None:
+            self._finish_stats_cycle(start)
+
+        logger.debug("--- Card status update End ---")
 
     def add_device(self, device:Device) -> None:
         """deviceを動的に追加するメソッド"""
-        print(f"--- Card add_device Start: {device.directory_name} ---")
+        logger.info("--- Card add_device Start: %s ---", device.directory_name)
         self.devices.append(device)
 
         # 1. インターフェース用のディレクトリを作成
         target_dir = os.path.join(self.card_directory, device.directory_name)
-        print(f"makedirs: {target_dir}")
-        os.makedirs(target_dir, exist_ok=True)
+        logger.debug("makedirs: %s", target_dir)
+        self.storage.makedirs(target_dir)
         
-        self.ctrl.open()
+        opened = self.session.begin()
         
         # 2. 配下の全パラメータに対してパス設定とファイル作成を行う
         for param in device.parameters:
             # ファイルの物理作成
+            param.storage = self.storage
             param.prepare_file(target_dir)
-            param.handle_access_always(self.ctrl)
+            self._attach_parameter(device, param)
+            if opened:
+                param.handle_access_always(self.ctrl)
+            self._watch_parameter(param)
+            self._schedule(device, param)
         
-        self.ctrl.close()
+        if opened:
+            self.session.end()
+        else:
+            logger.warning("コントローラ再接続待ちのため初回の読み出しを省略しました: %s", device.directory_name)
+
+        if self.status_image is not None:
+            self._extend_status_image((device, param) for param in device.parameters)
+
+        logger.info("--- Card add_device End: %s ---", device.directory_name)
+
+    def add_devices(self, devices:list) -> None:
+        """
+        複数の device をまとめて追加する（add_device の一括版）
+        ディレクトリの内容は保存先の list_names（ファイルの場合は os.scandir）で1回だけ確認してファイルを作成し、
+        コントローラのセッションは1回のみ開いて初回の強制読み出しを行う（read_many 対応であれば一括読み出し）
+        """
+        devices = list(devices)
+        if not devices:
+            return
+        logger.info("--- Card add_devices Start: %d devices ---", len(devices))
+
+        existing_dirs = self.storage.list_names(self.card_directory, dirs_only=True)
+        prepared = []
+        for device in devices:
+            self.devices.append(device)
+            target_dir = os.path.join(self.card_directory, device.directory_name)
+            if device.directory_name in existing_dirs:
+                names = self.storage.list_names(target_dir)
+            else:
+                logger.debug("mkdir: %s", target_dir)
+                self.storage.mkdir(target_dir)
+                names = frozenset()
+            for param in device.parameters:
+                param.storage = self.storage
+                param.prepare_file(target_dir, names)
+                prepared.append((device, param))
+
+        opened = self.session.begin()
+        prefetched = self._prefetch(param for _, param in prepared) if opened else None
+        for device, param in prepared:
+            self._attach_parameter(device, param)
+            if opened:
+                param.handle_access_always(self.ctrl, prefetched)
+            self._watch_parameter(param)
+            self._schedule(device, param)
+        if opened:
+            self.session.end()
+        else:
+            logger.warning("コントローラ再接続待ちのため初回の読み出しを省略しました")
+
+        if self.status_image is not None:
+            self._extend_status_image(prepared)
+
+        logger.info("--- Card add_devices End: %d devices ---", len(devices))
+
+    def _schedule(self, device:Device, param:BaseParameter) -> None:
+        """パラメータをスケジューラに登録する（inotify で監視中のもの、ConstParameter は除く）"""
+        if isinstance(param, ConstParameter):
+            self._const_items.append((device, param))
+            if not param.frozen:
+                self._const_pending = True
+            return
+        max_period_ms = param.max_period_ms
+        if max_period_ms is None and self.max_period_ms is not None and not isinstance(param, OutputParameter):
+            # カードの指定より長い周期のパラメータは延ばさない
+            max_period_ms = max(self.max_period_ms, param.period_ms or self.scheduler.default_period_ms)
+        if max_period_ms is not None and device not in self._tracked_devices:
+            self._track_changes(device)
+        if param.watched:
+            return
+        self.scheduler.add((device, param), param.period_ms, max_period_ms=max_period_ms, factor=self.backoff_factor)
+        if max_period_ms is not None:
+            self._adaptive_items.setdefault(device, []).append((device, param))
+
+    def invalidate_constants(self, reason:str=None) -> None:
+        """
+        ConstParameter の確定を解除する（InterfaceCtrl.notify_reset から呼ばれる）
+        次の update_status / poll_due で読み直す
+        """
+        if not self._const_items:
+            return
+        logger.info("固定値を読み直します (%d 件): %s", len(self._const_items), reason)
+        for _, param in self._const_items:
+            param.frozen = False
+        self._const_pending = True
+
+    def _track_changes(self, device:Device) -> None:
+        """デバイスの全パラメータの値の変化を記録する（同じデバイスの適応周期を戻すため）"""
+        self._tracked_devices.add(device)
+        changed_devices = self._changed_devices
+
+        def mark_changed(param, old_value, new_value):
+            changed_devices.add(device)
+        for param in device.parameters:
+            param.update_hooks.append(mark_changed)
+
+    def _adapt_periods(self, due_items:list) -> None:
+        """
+        適応周期を更新する
+        値が変化したデバイスの項目は周期を戻し、処理したが変化の無かった項目は周期を延ばす
+        （変化はスレッドプール・inotify・ソケットからも記録されるため、ここでまとめて反映する）
+        """
+        changed = set(self._changed_devices)
+        self._changed_devices.difference_update(changed)
+        for device in changed:
+            for item in self._adaptive_items.get(device, ()):
+                self.scheduler.changed(item)
+        for item in due_items:
+            if item[0] not in changed:
+                self.scheduler.unchanged(item)
+
+    def enable_status_image(self, path:str=None, slot_size:int=64, capacity:int=None) -> StatusImageWriter:
+        """
+        全パラメータの値を1つの mmap ファイル（ステータスイメージ）にも書き込む
+        レイアウトは現在のデバイス/パラメータ構成から決まる（"device/file" の順）
+        後から追加したデバイスのパラメータは空きのスロットに追加する（読み出し側は開き直し不要）
+        :param path: イメージファイルのパス（省略時は card_directory/.status.img、保存先がファイル以外の場合は必須）
+        :param capacity: スロット数（省略時は現在のパラメータ数の2倍、超えた場合は倍にして作り直す）
+        """
+        path = self._card_path(path, STATUS_IMAGE_NAME, "status_image")
+        if self.status_image is not None:
+            self.status_image.close()
+
+        self._image_names = {}
+        for device in self.devices:
+            for param in device.parameters:
+                self._add_image_name(device, param)
+
+        if capacity is None:
+            capacity = max(2 * len(self._image_names), 16)
+        self.status_image = StatusImageWriter(path, self._image_names.values(), slot_size, capacity)
+        self.status_image.set_many({name: param._value for param, name in self._image_names.items()})
+        return self.status_image
+
+    def _add_image_name(self, device:Device, param:BaseParameter) -> str:
+        name = self._image_names[param] = f"{device.directory_name}/{param.filename}"
+        if self._update_status_image not in param.update_hooks:
+            param.update_hooks.append(self._update_status_image)
+        return name
+
+    def _extend_status_image(self, items) -> None:
+        """追加した (device, param) をステータスイメージの空きのスロットに追加する"""
+        values = {self._add_image_name(device, param): param._value for device, param in items}
+        if not self.status_image.append(values):
+            # 空きが無い場合のみ容量を倍にして作り直す（読み出し側は StatusImageReader.is_stale で検知して開き直す）
+            self.enable_status_image(self.status_image.path, self.status_image.slot_size, 2 * len(self._image_names))
+            return
+        self.status_image.set_many(values)
+
+    def _update_status_image(self, param:BaseParameter, old_value, new_value) -> None:
+        name = self._image_names.get(param)
+        if self.status_image is not None and name is not None:
+            self.status_image.set(name, new_value)
+
+    def _access_devices(self, work:list, prefetched:Optional[dict]) -> None:
+        """
+        デバイスのアクセス処理を実行する（並列モードではスレッドプールで実行）
+        :param work: (device, 対象パラメータのリスト or None) のリスト
+        """
+        access = self._access_device if self.stats is None else self._access_device_timed
+        if self._executor is None:
+            for device, params in work:
+                access(self.ctrl, device, params, prefetched)
+            return
+
+        futures = [
+            self._executor.submit(access, self._access_ctrl, device, params, prefetched)
+            for device, params in work
+        ]
+        wait_futures(futures)
+        for future in futures:
+            # 例外が発生していれば呼び出し元に伝える
+            future.result()
+
+    @staticmethod
+    def _access_device(ctrl, device:Device, params:Optional[list], prefetched:Optional[dict]) -> None:
+        if params is None and prefetched is None:
+            device.access(ctrl)
+        else:
+            device.access(ctrl, params, prefetched)
+
+    def _access_device_timed(self, ctrl, device:Device, params:Optional[list], prefetched:Optional[dict]) -> None:
+        """_access_device の統計有効時版（デバイス毎の所要時間を記録する）"""
+        start = time.perf_counter()
+        try:
+            self._access_device(ctrl, device, params, prefetched)
+        finally:
+            self.stats.record_device(device.directory_name, time.perf_counter() - start)
+
+    def _phase(self, name:str, func:Callable, *args) -> Any:
+        """func を実行し、統計が有効であればフェーズの所要時間として記録する"""
+        if self.stats is None:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.stats.record(name, time.perf_counter() - start)
+
+    def enable_stats(self, interval_s:float=10.0, directory:str=None) -> CardStats:
+        """
+        所要時間のヒストグラムとカウンタの収集を有効にする
+        interval_s 毎に directory（省略時は card_directory、保存先がファイル以外の場合は必須）へ .stats.json と .stats.prom を出力する
+        パラメータの input_func / validator_func / output_func を計測用の関数で包む
+        """
+        if self.stats is None:
+            self._stats_directory = self._card_path(directory, None, "stats")
+            self.stats = CardStats(interval_s)
+            for device in self.devices:
+                for param in device.parameters:
+                    self._instrument_parameter(device, param)
+        return self.stats
+
+    def enable_history(self, raw_capacity:int=None, tiers=None, parsers:dict=None) -> HistoryStore:
+        """
+        数値パラメータの値の履歴（固定長のリングバッファと 1秒/1分/1時間 の間引き段）を有効にする
+        メモリ使用量はパラメータ数 x HistoryStore.bytes_per_parameter() で固定
+        :param parsers: "device/file"（glob パターン可）-> 値を数値に変換する関数または指定（例 {"base": 16}、compile_parser を参照）
+                        省略時はバリデータが基数を持てばその基数の整数、それ以外は float
+        """
+        if self.history is None:
+            kwargs = {}
+            if raw_capacity is not None:
+                kwargs["raw_capacity"] = raw_capacity
+            if tiers is not None:
+                kwargs["tiers"] = tiers
+            self.history = HistoryStore(**kwargs)
+            self._history_parsers = {pattern: compile_parser(spec) for pattern, spec in (parsers or {}).items()}
+            for device in self.devices:
+                for param in device.parameters:
+                    self._attach_parameter(device, param)
+        return self.history
+
+    def _history_parser(self, name:str) -> Optional[Callable]:
+        parse = self._history_parsers.get(name)
+        if parse is None:
+            parse = next((p for pattern, p in self._history_parsers.items() if fnmatchcase(name, pattern)), None)
+        return parse
+
+    def subscribe(self, pattern:str, callback=None, maxsize:int=DEFAULT_MAXSIZE, sync:bool=False) -> Subscription:
+        """
+        値の変化を購読する
+        :param pattern: "device/file" の glob パターン（デバイス単位は "ethport1/*"、複数は "ethport*/linkgood"）
+        :param callback: ChangeEvent を受け取る関数（省略時は戻り値の get / get_all で取り出す）
+        :param maxsize: キューの上限（溢れた場合は古いものから捨てる）
+        :param sync: True の場合 callback をポーリング処理の中で直接呼ぶ（軽い処理のみ）
+        """
+        if self.bus is None:
+            self.bus = ChangeBus()
+            for device in self.devices:
+                for param in device.parameters:
+                    self._attach_parameter(device, param)
+        return self.bus.subscribe(pattern, callback, maxsize, sync)
+
+    def unsubscribe(self, subscription:Subscription) -> None:
+        if self.bus is not None:
+            self.bus.unsubscribe(subscription)
+
+    def parameter(self, name:str) -> BaseParameter:
+        """
+        "device/file" のパラメータを返す
+        :raises KeyError: 該当するパラメータが無い場合
+        """
+        return self.parameters[name]
+
+    def set_value(self, name:str, value) -> str:
+        """
+        OutputParameter に値を設定する（ファイルの書き換えを待たずに output_func を呼び、ファイルにも反映する）
+        値はファイル経由と同様に文字列として扱う
+        :return: 設定した値
+        :raises KeyError: 該当するパラメータが無い場合
+        :raises ValueError: OutputParameter でない、またはバリデーションに失敗した場合
+        :raises ConnectionError: コントローラに接続できない場合
+        """
+        param = self.parameter(name)
+        if not isinstance(param, OutputParameter):
+            raise ValueError(f"OutputParameter ではありません: {name}")
+        value = str(value)
+        if not param.validate(value):
+            raise ValueError(f"バリデーションに失敗しました: {name}={value}")
+        if not self.session.begin():
+            raise ConnectionError("コントローラに接続できません")
+        try:
+            param._apply_update(self.ctrl, value)
+        except Exception as e:
+            self.session.fail(e)
+            raise
+        self.session.end()
+        # 自身の書き込みは stat を更新するため、ポーリング・inotify で再度出力されない
+        param._update_file(None, value)
+        return value
+
+    def enable_server(self, path:str=None, mode:int=0o660) -> ControlServer:
+        """
+        パラメータの値の参照・設定を受け付ける Unix ソケットのサーバを有効にする（InterfaceServer を参照）
+        要求は wait（run）の待機中に処理する
+        :param path: ソケットのパス（省略時は card_directory/.control.sock、保存先がファイル以外の場合は必須）
+        """
+        if self.server is None:
+            path = self._card_path(path, ".control.sock", "server")
+            self.server = ControlServer(self, path, mode)
+        return self.server
+
+    def _card_path(self, path:Optional[str], name:Optional[str], feature:str) -> str:
+        """
+        card_directory 直下に置くファイル（ソケット・統計ファイル等）のパス
+        保存先がファイル以外の場合 card_directory はディスク上に無いため、path の指定を必須とする
+        :param name: card_directory 直下の名前（None の場合は card_directory 自体）
+        """
+        if path is not None:
+            return path
+        if not self.storage.file_backed:
+            raise ValueError(f"{feature}: 保存先がファイルではないため、パスを指定してください")
+        return os.path.join(self.card_directory, name) if name is not None else self.card_directory
+
+    def enable_write_behind(self, fsync:str="off", delay_s:float=0.0) -> FileWriter:
+        """
+        InputParameter のファイルの書き込みを専用スレッドで行う（InterfaceWriter を参照）
+        ポーリングは書き込みを待たず、同じファイルの未書き込みの値は最後の値にまとめる
+        OutputParameter のファイル（stat で変更を検知する）は従来どおり同期で書き込む
+        :param fsync: "off"、"batch" または "always"
+        :param delay_s: 書き込みをまとめるための待ち時間
+        """
+        if self.writer is None:
+            self.writer = FileWriter(fsync, delay_s, self.storage)
+            for device in self.devices:
+                for param in device.parameters:
+                    self._attach_parameter(device, param)
+        return self.writer
+
+    def event_sources(self) -> dict:
+        """待機中に select で待つ fd -> 読み込み可能になった時に呼ぶ関数"""
+        sources = {}
+        if self.watcher is not None:
+            sources[self.watcher.fileno()] = self.dispatch_events
+        if self.server is not None:
+            sources[self.server.fileno()] = self.server.process
+        ctrl_fd = self._ctrl_event_fileno()
+        if ctrl_fd is not None:
+            sources[ctrl_fd] = self.dispatch_ctrl_events
+        return sources
+
+    def _ctrl_event_fileno(self) -> Optional[int]:
+        event_fileno = getattr(self.ctrl, "event_fileno", None)
+        fd = event_fileno() if event_fileno is not None else None
+        return fd if isinstance(fd, int) and not isinstance(fd, bool) and fd >= 0 else None
+
+    def map_event(self, group:str, pattern:str) -> None:
+        """
+        コントローラのイベントグループ（InterfaceCtrl.read_events の戻り値）に対象のパラメータを対応付ける
+        イベントの通知時は対応するパラメータのみ即座に読み出す（周期ポーリングは従来どおり継続する）
+        :param pattern: "device/file" の glob パターン（例: "ethport*/linkgood"）
+        """
+        self.event_groups.setdefault(group, []).append(pattern)
+        self._event_items = {}
+
+    def _event_group_items(self, group:str) -> list:
+        items = self._event_items.get(group)
+        if items is None:
+            patterns = self.event_groups.get(group, ())
+            items = self._event_items[group] = [
+                (device, param)
+                for device in self.devices for param in device.parameters
+                if any(fnmatchcase(f"{device.directory_name}/{param.filename}", pattern) for pattern in patterns)
+            ]
+            if not items:
+                logger.debug("イベントグループに対応するパラメータがありません: %s", group)
+        return items
+
+    def dispatch_ctrl_events(self) -> None:
+        """コントローラのイベントを処理し、通知のあったグループのパラメータのみアクセスする"""
+        grouped = {}
+        for group in self.ctrl.read_events():
+            for device, param in self._event_group_items(group):
+                params = grouped.setdefault(device, [])
+                if param not in params:
+                    params.append(param)
+        if not grouped:
+            return
+        if self.stats is not None:
+            self.stats.counters["ctrl_events"] = self.stats.counters.get("ctrl_events", 0) + 1
+        if not self.session.begin():
+            # 再接続後の周期ポーリングで反映される
+            return
+        try:
+            self.ctrl.refresh()
+            work = list(grouped.items())
+            self._access_devices(work, self._prefetch_devices(work))
+        except Exception as e:
+            self.session.fail(e)
+            raise
+        self.session.end()
+
+    def _attach_parameter(self, device:Device, param:BaseParameter) -> None:
+        """パラメータを名前で引けるようにし、有効になっている統計・履歴・配信に登録する"""
+        if self._event_items:
+            self._event_items = {}
+        if self.stats is not None:
+            self._instrument_parameter(device, param)
+        name = f"{device.directory_name}/{param.filename}"
+        self.parameters[name] = param
+        if self.history is not None:
+            self.history.attach(name, param, self._history_parser(name))
+        if self.bus is not None:
+            self.bus.attach(name, param)
+        if self.writer is not None and not isinstance(param, OutputParameter):
+            param.file_writer = self.writer
+
+    def _instrument_parameter(self, device:Device, param:BaseParameter) -> None:
+        name = f"{device.directory_name}/{param.filename}"
+        if name in self.stats.parameters:
+            return
+        stats = self.stats.parameter(name)
+        if param.input_func is not None:
+            param.input_func = timed(param.input_func, stats, "input")
+        if param.output_func is not None:
+            param.output_func = timed(param.output_func, stats, "output")
+        if param.validator_func is not None:
+            param.validator_func = counted_validator(param.validator_func, stats)
+
+        def count_update(param, old_value, new_value):
+            stats.count_update()
+        param.update_hooks.append(count_update)
+
+    def _record_polls(self, due_items:list) -> None:
+        """パラメータ毎のポーリング回数と現在の周期を統計に記録する"""
+        default_s = self.scheduler.default_period_ms / 1000.0
+        for device, param in due_items:
+            stats = self.stats.parameter(f"{device.directory_name}/{param.filename}")
+            stats.polls += 1
+            period_s = self.scheduler.period((device, param))
+            if period_s is None:
+                period_s = param.period_ms / 1000.0 if param.period_ms is not None else default_s
+            stats.poll_period_s = period_s
+
+    def _finish_stats_cycle(self, start:float) -> None:
+        """1サイクル分の所要時間とカウンタを記録し、期限であれば統計ファイルを出力する"""
+        self.stats.record("cycle", time.perf_counter() - start)
+        self.stats.counters["cycles"] += 1
+        self.stats.counters["cycle_overruns"] = self.scheduler.total_overruns()
+        try:
+            self.stats.maybe_export(self._stats_directory)
+        except OSError as e:
+            logger.warning("統計ファイルの出力エラー (%s): %s", self._stats_directory, e)
+
+    def shutdown(self) -> None:
+        """スレッドプールと inotify、維持しているセッションを解放する（統計が有効な場合は最終値を出力する）"""
+        if self.stats is not None:
+            try:
+                self.stats.export(self._stats_directory)
+            except OSError as e:
+                logger.warning("統計ファイルの出力エラー (%s): %s", self._stats_directory, e)
+        self.session.close()
+        if self.writer is not None:
+            # 未書き込みの値を書き込んでから終了する
+            self.writer.close()
+            self.writer = None
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        if self.bus is not None:
+            self.bus.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._access_ctrl = self.ctrl
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+        if self.status_image is not None:
+            self.status_image.close()
+            self.status_image = None
+        # 書き込みスレッド（writer）を止めた後に閉じる
+        self.storage.close()
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+            self._selector_sources = None
+
+    def _prefetch(self, params) -> Optional[dict]:
+        """
+        パラメータの read_key をまとめて InterfaceCtrl.read_many で読み出す
+        コントローラが未対応、または対象キーが無い場合は None を返す
+        """
+        return self._read_many(
+            param.read_key for param in params if param.read_key is not None and not param.watched
+        )
+
+    def _prefetch_devices(self, work:list) -> Optional[dict]:
+        """
+        _prefetch の (device, パラメータのリスト または None) 単位版
+        保存先がファイル以外の場合、対象の出力パラメータの値も storage.read_many で1回にまとめて読み出し、
+        フルパスをキーとして加える（read_key は "/" を含まないため重ならない）
+        """
+        prefetched = self._read_many(key for device, params in work for key in device.read_keys(params))
+        if self.storage.file_backed:
+            return prefetched
+        paths = [
+            param.full_path
+            for device, params in work for param in (params if params is not None else device.parameters)
+            if isinstance(param, OutputParameter) and not param.watched and param.full_path is not None
+        ]
+        if not paths:
+            return prefetched
+        contents = self.storage.read_many(paths)
+        prefetched = dict(prefetched) if prefetched else {}
+        for path in paths:
+            prefetched[path] = contents.get(path)
+        return prefetched
+
+    def _read_many(self, keys) -> Optional[dict]:
+        # 重複を除き、最初に現れた順に並べる
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return None
+        values = self.ctrl.read_many(keys)
+        # 未対応のコントローラ（空の辞書）は従来どおり個別読み出し
+        return values if isinstance(values, dict) and values else None
+
+    def _watch_parameter(self, param:BaseParameter) -> None:
+        """OutputParameter のファイルを inotify の監視対象に登録する"""
+        if self.watcher is None or not isinstance(param, OutputParameter):
+            return
+        try:
+            self.watcher.add_watch(os.path.dirname(param.full_path))
+        except OSError as e:
+            # 登録できなかったパラメータはポーリングのまま
+            logger.warning("inotify 登録エラー (%s): %s", param.full_path, e)
+            return
+        param.watched = True
+        self._watched_params[os.path.normpath(param.full_path)] = param
+
+    def _collect_watch_events(self) -> bool:
+        """
+        inotify のイベントを読み出し、監視中のパラメータの変更のみを _watch_changed に溜める
+        （監視対象外のファイル・一時ファイルのイベントは捨てる）
+        :return: 処理すべき変更がある場合は True
+        """
+        for directory, name in self.watcher.read_events():
+            param = self._watched_params.get(os.path.join(directory, name))
+            if param is not None:
+                self._watch_changed[param] = None
+
+        if self.watcher.overflowed:
+            # イベントが欠落したので全ファイルを読み直す
+            self.watcher.overflowed = False
+            self._watch_changed = dict.fromkeys(self._watched_params.values())
+        return bool(self._watch_changed)
+
+    def _handle_watch_events(self) -> None:
+        """
+        inotify のイベントを読み出し、変更されたファイルのパラメータのみ処理する
+        （コントローラのセッションは呼び出し側で開いておくこと）
+        """
+        if self.watcher is None or not self._collect_watch_events():
+            return
+        changed, self._watch_changed = self._watch_changed, {}
+        for param in changed:
+            # イベントを優先し、stat が同一（同サイズ・同時刻の書き換え）でも読み直す
+            param._file_stat = None
+            param.handle_access(self.ctrl)
+
+    def dispatch_events(self) -> None:
+        """inotify のイベントを即座に処理する（周期処理の合間に呼ばれる）"""
+        if self.watcher is None:
+            return
+        # 監視中のパラメータに変更が無ければコントローラのセッションは開かない
+        if not self._collect_watch_events():
+            return
+        if not self.session.begin():
+            # 溜めた変更は再接続後のサイクルで処理する
+            return
+        try:
+            self._handle_watch_events()
+        except Exception as e:
+            self.session.fail(e)
+            raise
+        self.session.end()
+
+    def poll_due(self) -> int:
+        """
+        期限に達したパラメータのみアクセスする
+        :return: アクセスしたパラメータ数
+        """
+        due_items = self.scheduler.pop_due()
+        if not due_items and not self._const_pending:
+            return 0
+
+        # デバイス単位にまとめる（登録順を維持）
+        grouped = {}
+        if self._const_pending:
+            # 確定していない ConstParameter も同じサイクルで読み出す
+            for device, param in self._const_items:
+                if not param.frozen:
+                    grouped.setdefault(device, []).append(param)
+        for device, param in due_items:
+            grouped.setdefault(device, []).append(param)
+
+        start = time.perf_counter() if self.stats is not None else None
+        if not self._phase("open", self.session.begin):
+            # 再接続待ちの間の周期はスキップする（次の周期は通常どおり予定済み）
+            return 0
+        try:
+            self._phase("refresh", self.ctrl.refresh)
+            self._phase("watch", self._handle_watch_events)
+            work = list(grouped.items())
+            prefetched = self._phase("prefetch", self._prefetch_devices, work)
+            self._phase("access", self._access_devices, work, prefetched)
+        except Exception as e:
+            self.session.fail(e)
+            raise
+        self._phase("close", self.session.end)
+        if self._const_pending:
+            self._const_pending = any(not param.frozen for _, param in self._const_items)
+        if self._adaptive_items:
+            self._adapt_periods(due_items)
+        if start is not None:
+            self._record_polls(due_items)
+            self._finish_stats_cycle(start)
+
+        for device, param in due_items:
+            missed = self.scheduler.overruns.get((device, param), 0)
+            if missed > self._reported_overruns.get((device, param), 0):
+                logger.warning("周期超過: %s/%s (累計 %d 周期スキップ)", device.directory_name, param.filename, missed)
+                self._reported_overruns[(device, param)] = missed
+        return len(due_items)
+
+    def overrun_report(self) -> dict:
+        """パラメータ毎の周期超過回数を "device/file" をキーとして返す"""
+        return {
+            f"{device.directory_name}/{param.filename}": count
+            for (device, param), count in self.scheduler.overruns.items()
+        }
+
+    def run(self) -> None:
+        """
+        スケジューラに従って期限に達したパラメータを順次ポーリングする（戻らない）
+        待機中の inotify イベントは即座に処理する
+        """
+        while True:
+            self.poll_due()
+            next_due = self.scheduler.next_due()
+            if next_due is None:
+                timeout = self.scheduler.default_period_ms / 1000.0
+            else:
+                timeout = max(0.0, next_due - self.scheduler.clock())
+            self.wait(timeout)
+
+    def wait(self, timeout:float) -> None:
+        """
+        timeout 秒待機する
+        inotify・ソケットのサーバ・コントローラのイベントが有効な場合は待機中に届いたファイル変更・要求・通知を即座に処理する
+        セッション維持時は待機中に keepalive・健全性確認・再接続を行う
+        """
+        sources = self.event_sources()
+        if not sources and self.session.next_idle() is None:
+            time.sleep(timeout)
+            return
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            next_idle = self.session.next_idle()
+            step = remaining if next_idle is None else min(remaining, next_idle)
+            if not sources:
+                time.sleep(step)
+            else:
+                for key, _ in self._event_selector(sources).select(step):
+                    sources[key.fd]()
+            self.session.idle()
 
-        print(f"--- Card add_device End: {device.directory_name} ---")
+    def _event_selector(self, sources:dict) -> selectors.BaseSelector:
+        """event_sources を登録した selector（構成が変わった場合のみ作り直す）"""
+        if self._selector is None or sources != self._selector_sources:
+            if self._selector is not None:
+                self._selector.close()
+            self._selector = selectors.DefaultSelector()
+            for fd in sources:
+                self._selector.register(fd, selectors.EVENT_READ)
+            self._selector_sources = sources
+        return self._selector
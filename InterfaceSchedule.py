@@ -0,0 +1,156 @@
+import heapq
+import itertools
+import time
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+class AdaptivePeriod:
+    """
+    適応周期の状態
+    変化の無い間は周期を factor 倍ずつ max_s まで延ばし、変化があれば min_s に戻す
+    """
+    __slots__ = ("min_s", "max_s", "factor", "period", "due", "last", "seq", "polls")
+
+    def __init__(self, min_s:float, max_s:float, factor:float):
+        self.min_s = min_s
+        self.max_s = max_s
+        self.factor = factor
+        self.period = min_s
+        # 登録中の期限・前回の期限・登録中のエントリの番号（古いエントリは取り出し時に捨てる）
+        self.due = None
+        self.last = None
+        self.seq = None
+        self.polls = 0
+
+
+class PollScheduler:
+    """
+    パラメータ毎の周期を管理するスケジューラ
+    期限は単調時計上の絶対時刻で保持し、前回の期限 + 周期で次回を決めるため
+    処理時間による周期のずれ（ドリフト）が発生しない
+    """
+    def __init__(self, default_period_ms:int=1000, clock:Callable[[], float]=time.monotonic):
+        """
+        :param default_period_ms: period_ms 未指定時の周期
+        :param clock: 時刻取得関数（テスト用に差し替え可能）
+        """
+        self.default_period_ms = default_period_ms
+        self.clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        # 項目毎の周期超過（スキップした周期）の回数
+        self.overruns: Dict[Any, int] = {}
+        # 適応周期の項目の状態
+        self.adaptive: Dict[Any, AdaptivePeriod] = {}
+        # 周期の変更で置き換えられ、ヒープに残っているエントリの数
+        self._stale = 0
+
+    def add(self, item:Any, period_ms:Optional[int]=None, start:Optional[float]=None, max_period_ms:Optional[int]=None, factor:float=2.0) -> None:
+        """
+        項目を登録する
+        :param start: 初回の期限（省略時は現在時刻 + 周期）
+        :param max_period_ms: 指定した場合は適応周期とし、period_ms から max_period_ms の間で周期を変える
+                              （呼び出し側は処理後に changed / unchanged を呼ぶ）
+        :param factor: 適応周期で変化が無かった場合に周期を延ばす倍率
+        """
+        period_ms = period_ms if period_ms is not None else self.default_period_ms
+        if period_ms <= 0:
+            raise ValueError(f"period_ms は正の値を指定してください: {period_ms}")
+        period = period_ms / 1000.0
+        due = start if start is not None else self.clock() + period
+        if max_period_ms is not None:
+            if max_period_ms < period_ms:
+                raise ValueError(f"max_period_ms は period_ms 以上を指定してください: {max_period_ms}")
+            if factor <= 1.0:
+                raise ValueError(f"factor は1より大きい値を指定してください: {factor}")
+            self.adaptive[item] = AdaptivePeriod(period, max_period_ms / 1000.0, factor)
+        self._push(item, due, period)
+        self.overruns.setdefault(item, 0)
+
+    def _push(self, item:Any, due:float, period:float) -> None:
+        seq = next(self._seq)
+        heapq.heappush(self._heap, (due, seq, period, item))
+        state = self.adaptive.get(item)
+        if state is not None:
+            if state.seq is not None:
+                self._stale += 1
+            state.due = due
+            state.seq = seq
+
+    def _is_stale(self, entry:tuple) -> bool:
+        state = self.adaptive.get(entry[3]) if self.adaptive else None
+        return state is not None and entry[1] != state.seq
+
+    def period(self, item:Any) -> Optional[float]:
+        """適応周期の項目の現在の周期（秒、適応周期でない場合は None）"""
+        state = self.adaptive.get(item)
+        return state.period if state is not None else None
+
+    def changed(self, item:Any) -> None:
+        """適応周期の項目に変化があった：周期を最小に戻し、次回の期限を早める"""
+        state = self.adaptive.get(item)
+        if state is None or state.period == state.min_s:
+            return
+        state.period = state.min_s
+        due = self.clock() + state.min_s
+        if state.last is not None:
+            due = min(due, state.last + state.min_s)
+        if due < state.due:
+            self._push(item, due, state.period)
+
+    def unchanged(self, item:Any) -> None:
+        """適応周期の項目を処理したが変化が無かった：周期を延ばす"""
+        state = self.adaptive.get(item)
+        if state is None or state.period >= state.max_s:
+            return
+        state.period = min(state.period * state.factor, state.max_s)
+        if state.last is not None:
+            self._push(item, max(state.due, state.last + state.period), state.period)
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._stale
+
+    def next_due(self) -> Optional[float]:
+        """最も近い期限を返す（登録が無い場合は None）"""
+        while self._heap and self._is_stale(self._heap[0]):
+            heapq.heappop(self._heap)
+            self._stale -= 1
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now:Optional[float]=None) -> List[Any]:
+        """
+        期限に達した項目を全て取り出し、次回の期限で再登録する
+        処理が間に合わず期限を丸ごと過ぎた周期は周期超過として数える
+        """
+        if now is None:
+            now = self.clock()
+        due_items = []
+        adaptive = self.adaptive
+        while self._heap and self._heap[0][0] <= now:
+            due, seq, period, item = heapq.heappop(self._heap)
+            state = adaptive.get(item) if adaptive else None
+            if state is not None:
+                if seq != state.seq:
+                    # 周期の変更で置き換えられたエントリ
+                    self._stale -= 1
+                    continue
+                state.seq = None
+                state.last = due
+                state.polls += 1
+            due_items.append(item)
+
+            next_due = due + period
+            if next_due <= now:
+                missed = int((now - due) // period)
+                next_due = due + (missed + 1) * period
+                # 浮動小数点の丸めで期限が現在時刻に残らないようにする
+                while next_due <= now:
+                    missed += 1
+                    next_due += period
+                self.overruns[item] = self.overruns.get(item, 0) + missed
+            self._push(item, next_due, period)
+        return due_items
+
+    def total_overruns(self) -> int:
+        return sum(self.overruns.values())
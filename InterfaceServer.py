@@ -0,0 +1,298 @@
+"""
+InterfaceCard のパラメータ値をメモリから返す Unix ドメインソケットのサーバ
+
+要求・応答は1行1件の JSON（"id" を指定した場合は応答にそのまま返す）
+
+    {"op": "get", "name": "fpga/fpgaver"}              -> {"ok": true, "value": "2512"}
+    {"op": "mget", "names": ["a/x", "b/y"]}            -> {"ok": true, "values": {...}, "missing": [...]}
+    {"op": "mget", "pattern": "ethport*/linkgood"}     -> {"ok": true, "values": {...}}
+    {"op": "set", "name": "backlight1/on", "value": 1} -> {"ok": true, "value": "1"}
+    {"op": "watch", "pattern": "ethport*/*"}           -> {"ok": true}
+        以降、変化毎に {"event": "change", "name": ..., "old": ..., "new": ..., "t": ...}
+    エラーの場合は {"ok": false, "error": "..."}
+
+ソケットは全てノンブロッキングで、カードのスレッド（InterfaceCard.wait）から process を呼んで処理する
+（コントローラへのアクセスがポーリングと競合しない）
+watch のイベントは並列アクセスのスレッドからも届くため、イベントを溜めて起床用のソケットで知らせるだけにし、
+セレクタの変更と送信はカードのスレッドで行う
+"""
+import errno
+import json
+import logging
+import os
+import selectors
+import socket
+import stat
+import threading
+
+from collections import deque
+from fnmatch import fnmatchcase
+
+logger = logging.getLogger(__name__)
+
+_RECV_SIZE = 64 * 1024
+
+
+class _Client:
+    """接続1件分の送受信バッファ"""
+    def __init__(self, sock:socket.socket, max_events:int):
+        self.sock = sock
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        # watch のイベント（溢れた場合は古いものから捨てる）
+        self.events = deque(maxlen=max_events)
+        self.dropped = 0
+        self.subscriptions = []
+        self.writing = False
+
+
+class ControlServer:
+    """
+    get / mget / set / watch を受け付けるサーバ
+    :param card: 対象の InterfaceCard
+    :param path: ソケットのパス（既存のソケットは置き換える）
+    :param mode: ソケットのパーミッション
+    :param max_line: 要求1行の上限（超えた接続は切断する）
+    :param max_events: watch のイベントを接続毎に溜める上限
+    :param max_output: 応答を溜める上限（読み出さない接続は切断する）
+    """
+    def __init__(self, card, path:str, mode:int=0o660, max_line:int=64 * 1024, max_events:int=1000, max_output:int=1024 * 1024):
+        self.card = card
+        self.path = path
+        self.max_line = max_line
+        self.max_events = max_events
+        self.max_output = max_output
+        self.clients = {}
+        # watch のイベントが溜まった接続（_lock で保護、挿入順の集合として使う）
+        self._pending = {}
+        self._lock = threading.Lock()
+        try:
+            if stat.S_ISSOCK(os.lstat(path).st_mode):
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.setblocking(False)
+            self._sock.bind(path)
+            os.chmod(path, mode)
+            self._sock.listen(16)
+        except OSError:
+            self._sock.close()
+            raise
+        # epoll の fd を InterfaceCard.wait の select に渡す
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self._sock, selectors.EVENT_READ)
+        # 他のスレッドから process を起こすためのソケット対
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ)
+
+    def fileno(self) -> int:
+        return self.selector.fileno()
+
+    def process(self) -> None:
+        """準備のできた接続・要求・送信を処理する（ブロックしない）"""
+        for key, mask in self.selector.select(0):
+            if key.fileobj is self._sock:
+                self._accept()
+                continue
+            if key.fileobj is self._wake_r:
+                self._flush_pending()
+                continue
+            client = key.data
+            if mask & selectors.EVENT_READ:
+                self._receive(client)
+            if mask & selectors.EVENT_WRITE and client.sock.fileno() >= 0:
+                self._flush(client)
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                sock, _ = self._sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            sock.setblocking(False)
+            client = _Client(sock, self.max_events)
+            self.clients[sock.fileno()] = client
+            self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def _receive(self, client:_Client) -> None:
+        try:
+            data = client.sock.recv(_RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._disconnect(client)
+            return
+        client.inbuf += data
+        while True:
+            end = client.inbuf.find(b"\n")
+            if end < 0:
+                break
+            line = bytes(client.inbuf[:end])
+            del client.inbuf[:end + 1]
+            if line.strip():
+                self._send(client, self._handle_line(client, line))
+            if client.sock.fileno() < 0:
+                return
+        if len(client.inbuf) > self.max_line:
+            logger.warning("要求が長すぎるため切断します (%d bytes)", len(client.inbuf))
+            self._send(client, {"ok": False, "error": "要求が長すぎます"})
+            self._disconnect(client)
+
+    def _handle_line(self, client:_Client, line:bytes) -> dict:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("要求はオブジェクトで指定してください")
+        except ValueError as e:
+            return {"ok": False, "error": f"不正な要求です: {e}"}
+        try:
+            response = self._handle(client, request)
+        except KeyError as e:
+            response = {"ok": False, "error": f"パラメータがありません: {e.args[0]}"}
+        except (ValueError, TypeError, ConnectionError) as e:
+            response = {"ok": False, "error": str(e)}
+        except Exception as e:
+            logger.exception("要求の処理でエラーが発生しました: %r", request)
+            response = {"ok": False, "error": f"内部エラー: {e}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def _handle(self, client:_Client, request:dict) -> dict:
+        op = request.get("op")
+        if op == "get":
+            return {"ok": True, "value": self.card.parameter(request["name"])._value}
+        if op == "mget":
+            params = self.card.parameters
+            if "pattern" in request:
+                pattern = request["pattern"]
+                return {"ok": True, "values": {name: p._value for name, p in params.items() if fnmatchcase(name, pattern)}}
+            names = request["names"]
+            if not isinstance(names, list):
+                raise TypeError("names はリストで指定してください")
+            values = {}
+            missing = []
+            for name in names:
+                param = params.get(name)
+                if param is None:
+                    missing.append(name)
+                else:
+                    values[name] = param._value
+            response = {"ok": True, "values": values}
+            if missing:
+                response["missing"] = missing
+            return response
+        if op == "set":
+            return {"ok": True, "value": self.card.set_value(request["name"], request["value"])}
+        if op == "watch":
+            pattern = request["pattern"]
+            client.subscriptions.append(
+                self.card.subscribe(pattern, callback=lambda event: self._push(client, event), sync=True)
+            )
+            return {"ok": True}
+        raise ValueError(f"不明な op です: {op!r}")
+
+    def _push(self, client:_Client, event) -> None:
+        """
+        watch のイベントを送信待ちにする（任意のスレッドから呼ばれる）
+        セレクタには触れず、カードのスレッドを起こして _flush_pending で送信させる
+        """
+        with self._lock:
+            if len(client.events) == client.events.maxlen:
+                client.dropped += 1
+            client.events.append(event)
+            wake = not self._pending
+            self._pending[client] = None
+        if wake:
+            try:
+                self._wake_w.send(b"\0")
+            except OSError:
+                # 送信できない場合は起床待ちのデータが残っている（または close 済み）
+                pass
+
+    def _flush_pending(self) -> None:
+        """イベントが溜まった接続を送信する（カードのスレッド）"""
+        try:
+            while self._wake_r.recv(_RECV_SIZE):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        with self._lock:
+            clients = list(self._pending)
+            self._pending.clear()
+        for client in clients:
+            if client.sock.fileno() >= 0:
+                self._flush(client)
+
+    def _send(self, client:_Client, response:dict) -> None:
+        if client.sock.fileno() < 0:
+            return
+        client.outbuf += json.dumps(response, ensure_ascii=False, default=str).encode() + b"\n"
+        if len(client.outbuf) > self.max_output:
+            logger.warning("応答を読み出さない接続を切断します")
+            self._disconnect(client)
+            return
+        self._flush(client)
+
+    def _flush(self, client:_Client) -> None:
+        while True:
+            while client.events and len(client.outbuf) < _RECV_SIZE:
+                with self._lock:
+                    event = client.events.popleft()
+                client.outbuf += json.dumps({
+                    "event": "change",
+                    "name": event.name,
+                    "old": event.old_value,
+                    "new": event.new_value,
+                    "t": event.timestamp,
+                }, ensure_ascii=False, default=str).encode() + b"\n"
+            if not client.outbuf:
+                self._want_write(client, False)
+                return
+            try:
+                sent = client.sock.send(client.outbuf)
+            except (BlockingIOError, InterruptedError):
+                self._want_write(client, True)
+                return
+            except OSError:
+                self._disconnect(client)
+                return
+            del client.outbuf[:sent]
+
+    def _want_write(self, client:_Client, writing:bool) -> None:
+        if client.writing == writing or client.sock.fileno() < 0:
+            return
+        client.writing = writing
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+        self.selector.modify(client.sock, events, client)
+
+    def _disconnect(self, client:_Client) -> None:
+        if client.sock.fileno() < 0:
+            return
+        for subscription in client.subscriptions:
+            self.card.unsubscribe(subscription)
+        client.subscriptions = []
+        self.clients.pop(client.sock.fileno(), None)
+        self.selector.unregister(client.sock)
+        client.sock.close()
+
+    def close(self) -> None:
+        for client in list(self.clients.values()):
+            self._disconnect(client)
+        self.selector.unregister(self._sock)
+        self._sock.close()
+        self.selector.unregister(self._wake_r)
+        self._wake_r.close()
+        self._wake_w.close()
+        self.selector.close()
+        try:
+            os.unlink(self.path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                logger.warning("ソケットを削除できません (%s): %s", self.path, e)
@@ -0,0 +1,206 @@
+import os
+import random
+import threading
+import time
+
+from typing import Any, Callable, Dict, Iterable, Optional
+from InterfaceCtrl import InterfaceCtrl
+
+
+class SimulatedCtrl(InterfaceCtrl):
+    """
+    ベンチマーク・試験用の模擬コントローラ
+    読み出し毎に遅延（+ ゆらぎ）を入れ、一定の確率で値を変化させる
+    InterfaceCard にはクラスを渡すため、設定は functools.partial で束縛する
+        InterfaceCard(functools.partial(SimulatedCtrl, latency_ms=2), ...)
+    """
+    thread_safe = True
+
+    def __init__(
+            self,
+            latency_ms:float=0.0,
+            jitter_ms:float=0.0,
+            change_rate:float=0.0,
+            session_latency_ms:float=0.0,
+            seed:Optional[int]=None
+    ):
+        """
+        :param latency_ms: 1回の読み出し（read_many は1回分）にかかる時間
+        :param jitter_ms: latency_ms に加える一様乱数の最大値
+        :param change_rate: 読み出し毎に値が変化する確率 (0.0～1.0)
+        :param session_latency_ms: open/refresh/close の各呼び出しにかかる時間
+        :param seed: 乱数のシード
+        """
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.change_rate = change_rate
+        self.session_latency_ms = session_latency_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.values: Dict[str, int] = {}
+        # 出力: キー -> (値, time.perf_counter() の時刻)
+        self.writes: Dict[str, tuple] = {}
+        self.read_calls = 0
+        self.session_calls = 0
+
+    def _sleep(self, latency_ms:float, jitter_ms:float=0.0) -> None:
+        delay = latency_ms
+        if jitter_ms:
+            with self._lock:
+                delay += self._random.uniform(0.0, jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def _session(self) -> None:
+        with self._lock:
+            self.session_calls += 1
+        self._sleep(self.session_latency_ms)
+
+    def open(self) -> None:
+        self._session()
+
+    def refresh(self) -> None:
+        self._session()
+
+    def close(self) -> None:
+        self._session()
+
+    def _next_value(self, key:str) -> str:
+        with self._lock:
+            value = self.values.get(key, 0)
+            if self.change_rate and self._random.random() < self.change_rate:
+                value += 1
+                self.values[key] = value
+        return str(value)
+
+    def read(self, key:str) -> str:
+        """1件の読み出し"""
+        with self._lock:
+            self.read_calls += 1
+        self._sleep(self.latency_ms, self.jitter_ms)
+        return self._next_value(key)
+
+    def read_many(self, keys:Iterable[str]) -> Dict[str, Any]:
+        """一括読み出し（遅延は1回分）"""
+        with self._lock:
+            self.read_calls += 1
+        self._sleep(self.latency_ms, self.jitter_ms)
+        return {key: self._next_value(key) for key in keys}
+
+    def write(self, key:str, value:Any) -> None:
+        """出力（反映された時刻を記録する）"""
+        self._sleep(self.latency_ms, self.jitter_ms)
+        with self._lock:
+            self.writes[key] = (value, time.perf_counter())
+
+
+class PipeEventCtrl(SimulatedCtrl):
+    """
+    変化をパイプで通知する模擬コントローラ（割り込み・eventfd を持つハードウェアの代わり）
+    signal でイベントグループを通知すると event_fileno が読み込み可能になり、
+    read_events で通知のあったグループを返す（割り込みステータスレジスタ相当）
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._event_r, self._event_w = os.pipe()
+        os.set_blocking(self._event_r, False)
+        os.set_blocking(self._event_w, False)
+        self._pending = set()
+
+    def event_fileno(self) -> Optional[int]:
+        return self._event_r
+
+    def read_events(self) -> Iterable[str]:
+        try:
+            while os.read(self._event_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            groups = self._pending
+            self._pending = set()
+        return sorted(groups)
+
+    def signal(self, group:str) -> None:
+        """イベントグループを通知する（任意のスレッドから呼べる）"""
+        with self._lock:
+            armed = bool(self._pending)
+            self._pending.add(group)
+        if not armed:
+            try:
+                os.write(self._event_w, b"\0")
+            except BlockingIOError:
+                # 未読の通知があるため読み込み可能のまま
+                pass
+
+    def set_value(self, key:str, value:int, group:Optional[str]=None) -> None:
+        """値を変更し、group を指定した場合は通知する"""
+        with self._lock:
+            self.values[key] = value
+        if group is not None:
+            self.signal(group)
+
+    def close_events(self) -> None:
+        for fd in (self._event_r, self._event_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class SimHandlerMap:
+    """
+    "sim_in:<key>" / "sim_out:<key>" という名前から模擬コントローラ用のハンドラを生成する
+    mlb_func.func_map の代わりに build_devices / resolve_validator に渡す
+    """
+    def __init__(self, base:Optional[Dict[str, Callable]]=None):
+        self.base = base or {}
+        self._cache: Dict[str, Callable] = {}
+
+    def get(self, name:Optional[str], default=None) -> Optional[Callable]:
+        if name is None:
+            return default
+        if name in self._cache:
+            return self._cache[name]
+        kind, _, key = name.partition(":")
+        if kind == "sim_in" and key:
+            handler = lambda controller: controller.read(key)
+        elif kind == "sim_out" and key:
+            handler = lambda controller, value: controller.write(key, value)
+        else:
+            return self.base.get(name, default)
+        self._cache[name] = handler
+        return handler
+
+
+def generate_config(
+        num_devices:int,
+        card_directory:str,
+        inputs_per_device:int=2,
+        outputs_per_device:int=1,
+        period_ms:Optional[int]=None,
+        use_read_key:bool=True
+) -> dict:
+    """
+    config.json と同じ形式の合成設定を生成する
+    入力は "sim_in:<device>/<file>"、出力は "sim_out:<device>/<file>" のハンドラを使う
+    """
+    devices = {}
+    width = max(4, len(str(num_devices)))
+    for d in range(num_devices):
+        name = f"dev{d:0{width}d}"
+        params = []
+        for i in range(inputs_per_device):
+            key = f"{name}/in{i}"
+            p = {"type": "in", "file": f"in{i}", "val": "-", "v": {"int_range": [0, 1 << 30]}, "in": f"sim_in:{key}"}
+            if use_read_key:
+                p["key"] = key
+            if period_ms is not None:
+                p["period_ms"] = period_ms
+            params.append(p)
+        for o in range(outputs_per_device):
+            key = f"{name}/out{o}"
+            params.append({"type": "out", "file": f"out{o}", "val": "0", "v": {"int_range": [0, 1 << 30]}, "out": f"sim_out:{key}"})
+        devices[name] = params
+    return {"card_directory": card_directory, "devices": devices}
@@ -0,0 +1,295 @@
+import functools
+import json
+import os
+import threading
+import time
+
+from typing import Callable, Dict, Optional
+
+# InterfaceCard が card_directory 直下に出力する統計ファイル名
+STATS_JSON_NAME = ".stats.json"
+STATS_OPENMETRICS_NAME = ".stats.prom"
+
+# OpenMetrics に出力するバケットの上限（秒）
+EXPORT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class LatencyHistogram:
+    """
+    HDR 形式（対数 + 線形）のレイテンシヒストグラム
+    マイクロ秒単位で記録し、2のべき乗毎に 2**SUB_BITS 個のバケットに分ける（相対誤差 約3%）
+    スレッドセーフではない（複数のスレッドから記録する場合は所有する ParameterStats / CardStats のロックで保護する）
+    """
+    SUB_BITS = 5
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def _index(cls, us:int) -> int:
+        shift = us.bit_length() - cls.SUB_BITS
+        if shift <= 0:
+            return us
+        return (shift << cls.SUB_BITS) + (us >> shift)
+
+    @classmethod
+    def _upper_us(cls, index:int) -> int:
+        """バケットに入る値の上限（マイクロ秒）"""
+        shift = index >> cls.SUB_BITS
+        if shift == 0:
+            return index
+        mantissa = index & ((1 << cls.SUB_BITS) - 1)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds:float) -> None:
+        us = int(seconds * 1_000_000)
+        if us < 0:
+            us = 0
+        index = self._index(us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q:float) -> Optional[float]:
+        """q (0.0～1.0) 分位の値（秒、バケットの上限値）"""
+        if not self.count:
+            return None
+        target = max(1, int(round(q * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._upper_us(index) / 1_000_000, self.max)
+        return self.max
+
+    def cumulative(self, bounds=EXPORT_BUCKETS) -> list:
+        """bounds の各上限以下の件数（OpenMetrics の累積バケット）"""
+        items = sorted((self._upper_us(index) / 1_000_000, n) for index, n in self.counts.items())
+        result = []
+        seen = 0
+        i = 0
+        for bound in bounds:
+            while i < len(items) and items[i][0] <= bound:
+                seen += items[i][1]
+                i += 1
+            result.append(seen)
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+        }
+
+
+class ParameterStats:
+    """
+    パラメータ毎の統計（input/validate/output の所要時間と更新・バリデーション失敗の回数）
+    poll_due（run）で処理した場合はポーリング回数と現在の周期（適応周期の実効値）も記録する
+    並列アクセスのスレッドから記録されるため、記録は lock（CardStats から作成した場合はカード共通のロック）の中で行う
+    validation_failures はバリデータを呼んで不正となった回数で、BaseParameter.validate が直前と同じ不正な値を
+    バリデータを呼ばずに棄却した場合（否定キャッシュ）は数えない（同じ不正値が続く間は1回）
+    """
+    def __init__(self, lock:Optional[threading.Lock]=None):
+        self._lock = lock if lock is not None else threading.Lock()
+        self.phases: Dict[str, LatencyHistogram] = {}
+        self.updates = 0
+        self.validation_failures = 0
+        self.polls = 0
+        self.poll_period_s = None
+
+    def _record(self, phase:str, seconds:float) -> None:
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def record(self, phase:str, seconds:float) -> None:
+        with self._lock:
+            self._record(phase, seconds)
+
+    def record_validation(self, seconds:float, valid:bool) -> None:
+        with self._lock:
+            self._record("validate", seconds)
+            if not valid:
+                self.validation_failures += 1
+
+    def count_update(self) -> None:
+        with self._lock:
+            self.updates += 1
+
+    def to_dict(self) -> dict:
+        """（CardStats から呼ぶ場合はカードのロックの中で呼ばれる）"""
+        result = {
+            "updates": self.updates,
+            "validation_failures": self.validation_failures,
+            "phases": {phase: h.to_dict() for phase, h in self.phases.items()},
+        }
+        if self.poll_period_s is not None:
+            result["polls"] = self.polls
+            result["poll_period_s"] = self.poll_period_s
+            result["poll_rate_hz"] = 1.0 / self.poll_period_s
+        return result
+
+
+def timed(func:Callable, stats:ParameterStats, phase:str) -> Callable:
+    """func の所要時間を stats に記録するラッパーを返す"""
+    perf_counter = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.record(phase, perf_counter() - start)
+    return wrapper
+
+
+def counted_validator(func:Callable, stats:ParameterStats) -> Callable:
+    """
+    バリデーションの所要時間と失敗回数を記録するラッパーを返す
+    （base などバリデータの属性は functools.wraps で引き継ぐ。否定キャッシュで棄却された値は数えない、ParameterStats を参照）
+    """
+    perf_counter = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(value):
+        start = perf_counter()
+        result = func(value)
+        stats.record_validation(perf_counter() - start, bool(result))
+        return result
+    return wrapper
+
+
+class CardStats:
+    """
+    InterfaceCard の統計
+    カード全体のフェーズ（open/refresh/close/prefetch/cycle）とデバイス・パラメータ毎のヒストグラム、
+    各種カウンタを保持し、JSON と OpenMetrics のテキストで出力する
+    記録は並列アクセスのスレッドからも行われるため、全てのヒストグラムを1つのロックで保護する
+    （パラメータの統計も同じロックを使い、出力時はロックの中で文字列にする）
+    """
+    def __init__(self, interval_s:float=10.0, clock:Callable[[], float]=time.monotonic):
+        self.interval_s = interval_s
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.phases: Dict[str, LatencyHistogram] = {}
+        self.devices: Dict[str, LatencyHistogram] = {}
+        self.parameters: Dict[str, ParameterStats] = {}
+        self.counters: Dict[str, int] = {"cycles": 0, "cycle_overruns": 0}
+        self._last_export = clock()
+
+    def record(self, phase:str, seconds:float) -> None:
+        with self._lock:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def record_device(self, name:str, seconds:float) -> None:
+        with self._lock:
+            histogram = self.devices.get(name)
+            if histogram is None:
+                histogram = self.devices[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def parameter(self, name:str) -> ParameterStats:
+        with self._lock:
+            stats = self.parameters.get(name)
+            if stats is None:
+                stats = self.parameters[name] = ParameterStats(self._lock)
+            return stats
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return self._to_dict()
+
+    def _to_dict(self) -> dict:
+        return {
+            "timestamp": time.time(),
+            "counters": dict(self.counters),
+            "updates": sum(p.updates for p in self.parameters.values()),
+            "validation_failures": sum(p.validation_failures for p in self.parameters.values()),
+            "phases": {phase: h.to_dict() for phase, h in self.phases.items()},
+            "devices": {name: h.to_dict() for name, h in self.devices.items()},
+            "parameters": {name: p.to_dict() for name, p in self.parameters.items()},
+        }
+
+    @staticmethod
+    def _histogram_lines(metric:str, labels:str, histogram:LatencyHistogram) -> list:
+        lines = []
+        for bound, n in zip(EXPORT_BUCKETS, histogram.cumulative()):
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {n}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        lines.append(f'{metric}_sum{{{labels}}} {histogram.total}')
+        return lines
+
+    def to_openmetrics(self) -> str:
+        with self._lock:
+            return self._to_openmetrics()
+
+    def _to_openmetrics(self) -> str:
+        lines = ["# TYPE interface_phase_seconds histogram", "# UNIT interface_phase_seconds seconds"]
+        for phase, histogram in self.phases.items():
+            lines += self._histogram_lines("interface_phase_seconds", f'phase="{phase}"', histogram)
+        lines += ["# TYPE interface_device_seconds histogram", "# UNIT interface_device_seconds seconds"]
+        for name, histogram in self.devices.items():
+            lines += self._histogram_lines("interface_device_seconds", f'device="{name}"', histogram)
+        lines += ["# TYPE interface_parameter_seconds histogram", "# UNIT interface_parameter_seconds seconds"]
+        for name, stats in self.parameters.items():
+            for phase, histogram in stats.phases.items():
+                lines += self._histogram_lines("interface_parameter_seconds", f'param="{name}",phase="{phase}"', histogram)
+        lines.append("# TYPE interface_parameter_updates counter")
+        for name, stats in self.parameters.items():
+            lines.append(f'interface_parameter_updates_total{{param="{name}"}} {stats.updates}')
+        lines.append("# TYPE interface_parameter_validation_failures counter")
+        for name, stats in self.parameters.items():
+            lines.append(f'interface_parameter_validation_failures_total{{param="{name}"}} {stats.validation_failures}')
+        polled = [(name, stats) for name, stats in self.parameters.items() if stats.poll_period_s is not None]
+        if polled:
+            lines.append("# TYPE interface_parameter_polls counter")
+            for name, stats in polled:
+                lines.append(f'interface_parameter_polls_total{{param="{name}"}} {stats.polls}')
+            lines += ["# TYPE interface_parameter_poll_period_seconds gauge", "# UNIT interface_parameter_poll_period_seconds seconds"]
+            for name, stats in polled:
+                lines.append(f'interface_parameter_poll_period_seconds{{param="{name}"}} {stats.poll_period_s}')
+        for counter, value in self.counters.items():
+            lines.append(f"# TYPE interface_{counter} counter")
+            lines.append(f"interface_{counter}_total {value}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory:str) -> None:
+        """統計ファイルを出力する（読み出し側が書きかけを見ないよう置き換えで更新する）"""
+        for name, content in (
+            (STATS_JSON_NAME, json.dumps(self.to_dict(), indent=2)),
+            (STATS_OPENMETRICS_NAME, self.to_openmetrics()),
+        ):
+            path = os.path.join(directory, name)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        self._last_export = self.clock()
+
+    def maybe_export(self, directory:str) -> bool:
+        """前回の出力から interval_s 経過していれば出力する"""
+        if self.clock() - self._last_export < self.interval_s:
+            return False
+        self.export(directory)
+        return True
@@ -0,0 +1,421 @@
+"""
+パラメータの値の保存先（StorageBackend）
+
+    FileStorage    : 従来どおりディレクトリ・ファイルで保持する（既定、FILE_STORAGE）
+    MemoryStorage  : プロセス内の辞書で保持する（試験・シミュレーション用、ディスクに触れない）
+    MmapStorage    : 1つの mmap 領域にまとめて保持する（InterfaceImage のステータスイメージと同じレイアウト）
+
+キーはパラメータのフルパス（card_directory/device/file）
+version はファイルの stat の代わりに変更検知に使う3つの整数の組（変化が無ければ同じ値）
+"""
+import logging
+import mmap
+import os
+import threading
+
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Optional
+from InterfaceImage import MAGIC, VERSION, HEADER_SIZE, NAME_SIZE, _HEADER, _SEQ, _SEQ_OFFSET, _ENTRY, _LENGTH, truncate_utf8
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(ABC):
+    # True の場合 inotify でファイルの変更を検知できる
+    supports_watch = False
+    # True の場合キーは実際のファイルのパス（card_directory 直下にソケット・統計ファイル等を置ける）
+    # False の場合 InterfaceCard は出力パラメータの値を周期毎に read_many でまとめて読み出す
+    file_backed = False
+
+    @abstractmethod
+    def makedirs(self, directory:str) -> None:
+        """ディレクトリを作成する（既にある場合は何もしない）"""
+        pass
+
+    def mkdir(self, directory:str) -> None:
+        """直下のディレクトリを作成する（親が既にある場合の makedirs）"""
+        self.makedirs(directory)
+
+    @abstractmethod
+    def list_names(self, directory:str, dirs_only:bool=False) -> frozenset:
+        """ディレクトリ直下のエントリ名の集合（ディレクトリが無い場合は空）"""
+        pass
+
+    @abstractmethod
+    def exists(self, key:str) -> bool:
+        pass
+
+    @abstractmethod
+    def read(self, key:str) -> Optional[str]:
+        """値を読み出す（無い場合は None、読み出せない場合は OSError）"""
+        pass
+
+    @abstractmethod
+    def write(self, key:str, content:str) -> None:
+        pass
+
+    @abstractmethod
+    def version(self, key:str) -> Optional[tuple]:
+        """変更検知用の3つの整数の組（無い場合は None）"""
+        pass
+
+    def read_many(self, keys:Iterable[str]) -> Dict[str, str]:
+        """複数の値をまとめて読み出す（無いキーは戻り値に含めない）"""
+        values = {}
+        for key in keys:
+            value = self.read(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def write_many(self, items:Dict[str, str], fsync:str="off") -> Dict[str, Exception]:
+        """
+        複数の値をまとめて書き込む（InterfaceWriter.FileWriter から呼ばれる）
+        :param fsync: InterfaceWriter.FSYNC_MODES のいずれか（対応しない保存先では無視する）
+        :return: 書き込めなかったキー -> 例外
+        """
+        errors = {}
+        for key, content in items.items():
+            try:
+                self.write(key, content)
+            except OSError as e:
+                errors[key] = e
+        return errors
+
+    def close(self) -> None:
+        """保持している資源を解放する（InterfaceCard.shutdown から呼ばれる）"""
+        pass
+
+
+def _fsync_directory(directory:str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FileStorage(StorageBackend):
+    """
+    ディレクトリ・ファイルで保持する（従来の動作）
+    出力パラメータの変更は stat で検知する（変化の無いファイルは開かない）
+    """
+    supports_watch = True
+    file_backed = True
+
+    def makedirs(self, directory:str) -> None:
+        os.makedirs(directory, exist_ok=True)
+
+    def mkdir(self, directory:str) -> None:
+        # 親がある場合は1回の mkdir で済ませる
+        try:
+            os.mkdir(directory)
+        except FileNotFoundError:
+            os.makedirs(directory, exist_ok=True)
+        except FileExistsError:
+            pass
+
+    def list_names(self, directory:str, dirs_only:bool=False) -> frozenset:
+        try:
+            with os.scandir(directory) as entries:
+                if dirs_only:
+                    return frozenset(entry.name for entry in entries if entry.is_dir())
+                return frozenset(entry.name for entry in entries)
+        except (FileNotFoundError, NotADirectoryError):
+            return frozenset()
+
+    def exists(self, key:str) -> bool:
+        return os.path.exists(key)
+
+    def read(self, key:str) -> Optional[str]:
+        try:
+            with open(key, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key:str, content:str) -> None:
+        with open(key, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def version(self, key:str) -> Optional[tuple]:
+        try:
+            st = os.stat(key)
+        except (OSError, TypeError):
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def write_many(self, items:Dict[str, str], fsync:str="off") -> Dict[str, Exception]:
+        """
+        一時ファイルに書いてから os.replace で置き換える（読み出し側は書きかけの内容を見ない）
+        fsync が "batch" の場合、ディレクトリの fsync は最後にまとめて1回ずつ行う
+        """
+        errors = {}
+        directories = set()
+        for key, content in items.items():
+            try:
+                self._write_atomic(key, content, fsync)
+            except OSError as e:
+                errors[key] = e
+                continue
+            directories.add(os.path.dirname(key))
+        if fsync == "batch":
+            for directory in directories:
+                try:
+                    _fsync_directory(directory)
+                except OSError as e:
+                    logger.warning("ディレクトリの fsync に失敗しました (%s): %s", directory, e)
+        return errors
+
+    def _write_atomic(self, key:str, content:str, fsync:str) -> None:
+        directory, name = os.path.split(key)
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            if fsync != "off":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, key)
+        if fsync == "always":
+            _fsync_directory(directory)
+
+
+# パラメータ・InterfaceCard の既定の保存先
+FILE_STORAGE = FileStorage()
+
+
+class _KeyTree:
+    """キー（パス）からディレクトリの構成を管理する（MemoryStorage / MmapStorage 用）"""
+    def __init__(self):
+        # ディレクトリ -> 直下のエントリ名の集合
+        self._children: Dict[str, set] = {}
+        self._directories = set()
+
+    def _add(self, path:str, is_dir:bool) -> None:
+        path = os.path.normpath(path)
+        while True:
+            parent, name = os.path.split(path)
+            if is_dir:
+                if path in self._directories:
+                    return
+                self._directories.add(path)
+            if not name or parent == path:
+                return
+            self._children.setdefault(parent, set()).add(name)
+            path = parent
+            is_dir = True
+
+    def list_names(self, directory:str, dirs_only:bool=False) -> frozenset:
+        directory = os.path.normpath(directory)
+        names = self._children.get(directory, ())
+        if dirs_only:
+            return frozenset(name for name in names if os.path.join(directory, name) in self._directories)
+        return frozenset(names)
+
+
+class MemoryStorage(StorageBackend):
+    """プロセス内の辞書で保持する（ディスクに触れない）"""
+    def __init__(self):
+        self.values: Dict[str, str] = {}
+        # キー -> 書き込み回数（version に使う）
+        self._writes: Dict[str, int] = {}
+        self._tree = _KeyTree()
+        self._lock = threading.Lock()
+
+    def makedirs(self, directory:str) -> None:
+        with self._lock:
+            self._tree._add(directory, True)
+
+    def list_names(self, directory:str, dirs_only:bool=False) -> frozenset:
+        with self._lock:
+            return self._tree.list_names(directory, dirs_only)
+
+    def exists(self, key:str) -> bool:
+        return key in self.values
+
+    def read(self, key:str) -> Optional[str]:
+        return self.values.get(key)
+
+    def write(self, key:str, content:str) -> None:
+        with self._lock:
+            if key not in self.values:
+                self._tree._add(key, False)
+            self.values[key] = content
+            self._writes[key] = self._writes.get(key, 0) + 1
+
+    def version(self, key:str) -> Optional[tuple]:
+        with self._lock:
+            content = self.values.get(key)
+            if content is None:
+                return None
+            return (0, self._writes[key], len(content))
+
+    def read_many(self, keys:Iterable[str]) -> Dict[str, str]:
+        values = self.values
+        return {key: values[key] for key in keys if key in values}
+
+    def write_many(self, items:Dict[str, str], fsync:str="off") -> Dict[str, Exception]:
+        for key, content in items.items():
+            self.write(key, content)
+        return {}
+
+
+class MmapStorage(StorageBackend):
+    """
+    1つの mmap ファイルにまとめて保持する
+    レイアウトは InterfaceImage のステータスイメージと同じため、StatusImageReader で読み出せる
+    （スロットは書き込まれた順に割り当て、オフセットテーブルの予約欄はスロット毎の書き込み回数）
+    :param path: mmap するファイルのパス（/dev/shm 等）
+    :param capacity: スロット数の上限
+    :param slot_size: 1スロットのバイト数（先頭2バイトは長さ）
+    :param root: 指定した場合、スロットの名前はこのディレクトリからの相対パス（64バイトまで）
+    """
+    def __init__(self, path:str, capacity:int=4096, slot_size:int=64, root:Optional[str]=None):
+        self.path = path
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.root = os.path.normpath(root) if root is not None else None
+        self.table_offset = HEADER_SIZE
+        self.data_offset = self.table_offset + capacity * _ENTRY.size
+        size = self.data_offset + capacity * slot_size
+        # キー -> スロット番号
+        self.index: Dict[str, int] = {}
+        self._tree = _KeyTree()
+        self._lock = threading.Lock()
+
+        # 読み出し側が初期化途中のファイルを開かないよう、一時ファイルで作成して置き換える
+        buf = bytearray(size)
+        _HEADER.pack_into(buf, 0, MAGIC, VERSION, 0, 0, slot_size, self.table_offset, self.data_offset)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buf)
+        os.replace(tmp_path, path)
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+
+    def _name(self, key:str) -> str:
+        if self.root is not None:
+            relative = os.path.relpath(os.path.normpath(key), self.root)
+            if not relative.startswith(os.pardir):
+                return relative
+        return key
+
+    def _slot(self, key:str) -> int:
+        """キーのスロット番号（無ければ割り当てる、ロックを取得して呼ぶこと）"""
+        slot = self.index.get(key)
+        if slot is not None:
+            return slot
+        encoded = self._name(key).encode("utf-8")
+        if len(encoded) > NAME_SIZE:
+            raise ValueError(f"名前が長すぎます: {key}")
+        slot = len(self.index)
+        if slot >= self.capacity:
+            raise ValueError(f"スロットが不足しています (capacity={self.capacity}): {key}")
+        _ENTRY.pack_into(self._mm, self.table_offset + slot * _ENTRY.size, encoded, self.data_offset + slot * self.slot_size, 0)
+        self.index[key] = slot
+        # ヘッダの count を更新する（StatusImageReader は未知の名前の参照時に読み直す）
+        _HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, slot + 1, self.slot_size, self.table_offset, self.data_offset)
+        self._tree._add(key, False)
+        return slot
+
+    def _encode(self, content:str) -> bytes:
+        data = content.encode("utf-8")
+        capacity = self.slot_size - _LENGTH.size
+        if len(data) > capacity:
+            logger.warning("mmap: 値がスロットに収まらないため切り詰めます (%d > %d)", len(data), capacity)
+            data = truncate_utf8(data, capacity)
+        return data
+
+    def _put(self, key:str, data:bytes) -> None:
+        slot = self._slot(key)
+        entry = self.table_offset + slot * _ENTRY.size
+        name, offset, writes = _ENTRY.unpack_from(self._mm, entry)
+        _ENTRY.pack_into(self._mm, entry, name, offset, writes + 1)
+        _LENGTH.pack_into(self._mm, offset, len(data))
+        start = offset + _LENGTH.size
+        self._mm[start:start + len(data)] = data
+
+    def _get(self, key:str) -> Optional[bytes]:
+        slot = self.index.get(key)
+        if slot is None:
+            return None
+        offset = self.data_offset + slot * self.slot_size
+        length = _LENGTH.unpack_from(self._mm, offset)[0]
+        start = offset + _LENGTH.size
+        return self._mm[start:start + length]
+
+    def makedirs(self, directory:str) -> None:
+        with self._lock:
+            self._tree._add(directory, True)
+
+    def list_names(self, directory:str, dirs_only:bool=False) -> frozenset:
+        with self._lock:
+            return self._tree.list_names(directory, dirs_only)
+
+    def exists(self, key:str) -> bool:
+        return key in self.index
+
+    def read(self, key:str) -> Optional[str]:
+        with self._lock:
+            data = self._get(key)
+        return data.decode("utf-8", errors="ignore") if data is not None else None
+
+    def write(self, key:str, content:str) -> None:
+        errors = self.write_many({key: content})
+        if errors:
+            raise errors[key]
+
+    def version(self, key:str) -> Optional[tuple]:
+        with self._lock:
+            slot = self.index.get(key)
+            if slot is None:
+                return None
+            _, offset, writes = _ENTRY.unpack_from(self._mm, self.table_offset + slot * _ENTRY.size)
+            return (0, writes, _LENGTH.unpack_from(self._mm, offset)[0])
+
+    def read_many(self, keys:Iterable[str]) -> Dict[str, str]:
+        """1回のロックでまとめて読み出す"""
+        with self._lock:
+            raw = {key: self._get(key) for key in keys}
+        return {key: data.decode("utf-8", errors="ignore") for key, data in raw.items() if data is not None}
+
+    def write_many(self, items:Dict[str, str], fsync:str="off") -> Dict[str, Exception]:
+        """まとめて書き込む（StatusImageReader からは1回の更新に見える、fsync 指定時は msync する）"""
+        encoded = [(key, self._encode(content)) for key, content in items.items()]
+        errors = {}
+        with self._lock:
+            seq = _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+            _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 1)
+            try:
+                for key, data in encoded:
+                    try:
+                        self._put(key, data)
+                    except ValueError as e:
+                        errors[key] = e
+            finally:
+                _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 2)
+            if fsync != "off":
+                self._mm.flush()
+        return errors
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+
+def create_storage(spec=None) -> StorageBackend:
+    """
+    設定から保存先を作成する
+    :param spec: None または "file"、"memory"、{"type": "mmap", "path": ..., "capacity": ..., ...}
+    """
+    if spec is None or spec == "file":
+        return FILE_STORAGE
+    if spec == "memory":
+        return MemoryStorage()
+    if isinstance(spec, dict) and spec.get("type") == "mmap":
+        options = dict(spec)
+        del options["type"]
+        return MmapStorage(**options)
+    raise ValueError(f"storage: \"file\"、\"memory\" または {{\"type\": \"mmap\", ...}} を指定してください: {spec!r}")
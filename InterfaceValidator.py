@@ -0,0 +1,107 @@
+import json
+import re
+
+from typing import Any, Callable, Dict, Optional
+
+# 基数毎の数値表現（0x プレフィックスは16進のみ許容）
+_INT_PATTERNS = {
+    10: re.compile(r'^[+-]?[0-9]+$'),
+    16: re.compile(r'^(0[xX])?[0-9a-fA-F]+$'),
+}
+
+
+def _compile_enum(choices) -> Callable[[Any], bool]:
+    """{"enum": [0, 1]} : 文字列化した値が選択肢のいずれかであること"""
+    allowed = frozenset(str(c) for c in choices)
+
+    def validator(value):
+        return str(value) in allowed
+    return validator
+
+
+def _compile_hex(options:Dict[str, Any]) -> Callable[[Any], bool]:
+    """{"hex": {"max_digits": 6, "max": 16777215}} : 0x 付き/なしの16進数であること"""
+    max_digits = options.get("max_digits")
+    digits = f"{{1,{int(max_digits)}}}" if max_digits else "+"
+    pattern = re.compile(rf'^(0[xX])?[0-9a-fA-F]{digits}$')
+    maximum = options.get("max")
+
+    def validator(value):
+        if value is None:
+            return False
+        s_val = str(value).strip()
+        if not pattern.match(s_val):
+            return False
+        return maximum is None or int(s_val, 16) <= maximum
+    # 値を数値として扱う側（履歴等）が基数を参照する
+    validator.base = 16
+    return validator
+
+
+def _compile_int_range(bounds, base:int=10) -> Callable[[Any], bool]:
+    """{"int_range": [0, 100], "base": 16} : 指定した基数の整数が範囲内であること"""
+    low, high = bounds
+    pattern = _INT_PATTERNS.get(base)
+
+    def validator(value):
+        if value is None:
+            return False
+        s_val = str(value).strip()
+        if pattern is not None and not pattern.match(s_val):
+            return False
+        try:
+            return low <= int(s_val, base) <= high
+        except ValueError:
+            return False
+    validator.base = base
+    return validator
+
+
+def _compile_regex(expr:str) -> Callable[[Any], bool]:
+    """{"regex": "^[0-9]+$"} : 正規表現に一致すること"""
+    pattern = re.compile(expr)
+
+    def validator(value):
+        return value is not None and pattern.match(str(value)) is not None
+    return validator
+
+
+def compile_validator(spec:Dict[str, Any]) -> Callable[[Any], bool]:
+    """
+    config.json の宣言的なバリデータ指定を関数に変換する
+    選択肢の集合や正規表現は変換時に1回だけ作成する
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"バリデータの指定が不正です: {spec!r}")
+    if "enum" in spec:
+        return _compile_enum(spec["enum"])
+    if "hex" in spec:
+        return _compile_hex(spec["hex"] or {})
+    if "int_range" in spec:
+        return _compile_int_range(spec["int_range"], spec.get("base", 10))
+    if "regex" in spec:
+        return _compile_regex(spec["regex"])
+    raise ValueError(f"未対応のバリデータ指定です: {spec!r}")
+
+
+# 宣言的な指定 (JSON) -> 変換済みの関数（同じ指定のパラメータは関数を共有する）
+_compiled: Dict[str, Callable[[Any], bool]] = {}
+
+
+def resolve_validator(spec, func_map:Dict[str, Callable]) -> Optional[Callable[[Any], bool]]:
+    """
+    "v" フィールドの値をバリデータ関数に解決する
+    文字列は func_map の名前、辞書は宣言的な指定として扱う
+    """
+    if spec is None:
+        return None
+    if isinstance(spec, str):
+        return func_map.get(spec)
+    try:
+        key = json.dumps(spec, sort_keys=True)
+    except (TypeError, ValueError):
+        return compile_validator(spec)
+    validator = _compiled.get(key)
+    if validator is None:
+        validator = _compiled[key] = compile_validator(spec)
+    return validator
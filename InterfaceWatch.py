@@ -0,0 +1,131 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# inotify のイベントマスク (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+def _load_libc():
+    """inotify_* を公開している libc を読み込む"""
+    name = ctypes.util.find_library("c")
+    libc = ctypes.CDLL(name, use_errno=True)
+    # 存在しない場合は AttributeError になる
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class InotifyWatcher:
+    """
+    inotify によるディレクトリ監視クラス
+    書き込み完了 (IN_CLOSE_WRITE) と置き換え (IN_MOVED_TO) のみを監視する
+    """
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+
+    def __init__(self):
+        self._libc = _load_libc()
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 に失敗しました: {os.strerror(err)}")
+        self._fd = fd
+        self._wd_to_dir = {}
+        self._dir_to_wd = {}
+        # キューが溢れた場合は全ファイルの再読込が必要
+        self.overflowed = False
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def add_watch(self, directory: str) -> int:
+        """ディレクトリを監視対象に追加する（登録済みの場合は何もしない）"""
+        directory = os.path.normpath(directory)
+        if directory in self._dir_to_wd:
+            return self._dir_to_wd[directory]
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch に失敗しました: {os.strerror(err)}", directory)
+        self._wd_to_dir[wd] = directory
+        self._dir_to_wd[directory] = wd
+        return wd
+
+    def read_events(self) -> List[Tuple[str, str]]:
+        """
+        溜まっているイベントを全て読み出し (ディレクトリ, ファイル名) のリストを返す
+        イベントが無い場合は空リストを返す（ブロックしない）
+        """
+        events = []
+        while True:
+            try:
+                buf = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                raw_name = buf[offset:offset + length]
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True
+                    continue
+                if mask & IN_IGNORED:
+                    # 監視対象のディレクトリが削除された
+                    directory = self._wd_to_dir.pop(wd, None)
+                    if directory is not None:
+                        self._dir_to_wd.pop(directory, None)
+                    continue
+
+                directory = self._wd_to_dir.get(wd)
+                if directory is None:
+                    continue
+                name = os.fsdecode(raw_name.rstrip(b"\0"))
+                events.append((directory, name))
+        return events
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """イベントが届くまで最大 timeout 秒待つ。届いた場合は True"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        return bool(readable)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._wd_to_dir.clear()
+        self._dir_to_wd.clear()
+
+
+def create_watcher() -> Optional[InotifyWatcher]:
+    """
+    InotifyWatcher を生成する
+    inotify が使えない環境では None を返し、呼び出し側はポーリングにフォールバックする
+    """
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError, TypeError) as e:
+        logger.warning("inotify が利用できないためポーリングで動作します: %s", e)
+        return None
@@ -0,0 +1,112 @@
+"""
+InputParameter のファイル書き込みをポーリングの外で行う FileWriter（write-behind）
+
+    writer = FileWriter(fsync="batch")
+    writer.submit("/tmp/mlb/ethport1/linkgood", "1")
+
+書き込みはファイル毎にまとめ（未書き込みの値は最後の値で置き換える）、専用スレッドで書き込む
+書き込みは InterfaceStorage の保存先の write_many でまとめて行う
+（FileStorage は各ファイルを一時ファイルに書いてから os.replace で置き換えるため、読み出し側が書きかけの内容を見ることはない）
+"""
+import logging
+import threading
+import time
+
+from typing import Dict, Optional
+from InterfaceStorage import StorageBackend, FILE_STORAGE
+
+logger = logging.getLogger(__name__)
+
+# fsync の方式
+#   "off":    fsync しない（電源断で直前の値が失われ得る）
+#   "batch":  一時ファイルを fsync し、ディレクトリの fsync は1回の書き込み分でまとめて行う
+#   "always": 書き込み毎に一時ファイルとディレクトリを fsync する
+FSYNC_MODES = ("off", "batch", "always")
+
+
+class FileWriter:
+    """
+    ファイルの書き込み要求をパス毎にまとめて、専用スレッドで書き込む
+    :param fsync: FSYNC_MODES のいずれか
+    :param delay_s: 要求を受けてから書き込むまでの待ち時間（この間の同じファイルへの要求は1回の書き込みにまとまる）
+    :param storage: 書き込み先（省略時はファイル）
+    """
+    def __init__(self, fsync:str="off", delay_s:float=0.0, storage:StorageBackend=FILE_STORAGE):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"fsync は {', '.join(FSYNC_MODES)} のいずれかを指定してください: {fsync!r}")
+        self.fsync = fsync
+        self.delay_s = delay_s
+        self.storage = storage
+        # 要求数・書き込み数・まとめて省略した数・書き込みエラー数
+        self.submitted = 0
+        self.written = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.closed = False
+        # パス -> 書き込む内容（挿入順に書き込む）
+        self._pending: Dict[str, str] = {}
+        self._writing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="file-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path:str, content:str) -> None:
+        """書き込みを要求する（待たない、同じパスの未書き込みの要求は置き換える）"""
+        with self._cond:
+            if self.closed:
+                raise RuntimeError("FileWriter は close されています")
+            self.submitted += 1
+            if path in self._pending:
+                self.coalesced += 1
+            self._pending[path] = content
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        """未書き込みのファイル数"""
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self, timeout:Optional[float]=None) -> bool:
+        """
+        要求済みの書き込みが全て終わるまで待つ
+        :return: timeout 秒以内に終わった場合は True
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self.closed)
+                if not self._pending:
+                    return
+            if self.delay_s > 0 and not self.closed:
+                time.sleep(self.delay_s)
+            with self._cond:
+                batch = self._pending
+                self._pending = {}
+                self._writing = True
+            try:
+                self._write_batch(batch)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write_batch(self, batch:Dict[str, str]) -> None:
+        try:
+            errors = self.storage.write_many(batch, self.fsync)
+        except Exception as e:
+            # 書き込みのスレッドは止めない
+            errors = dict.fromkeys(batch, e)
+        for path, e in errors.items():
+            logger.error("ファイル書き込みエラー (%s): %s", path, e)
+        self.errors += len(errors)
+        self.written += len(batch) - len(errors)
+
+    def close(self, timeout:Optional[float]=None) -> None:
+        """残りの要求を書き込んでからスレッドを終了する"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
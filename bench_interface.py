@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+InterfaceCard / Device / BaseParameter のスケーラビリティ計測
+
+    python bench_interface.py --devices 10,100,1000 --cycles 50 --latency-ms 0.2 --out bench_results.json
+    python bench_interface.py --compare bench_results.json   # 前回結果との比較（悪化時は終了コード 1）
+
+計測項目（デバイス数毎）
+    cycle_ms        : update_status 1回の所要時間 (p50/p90/p99/max)
+    syscalls        : 1サイクルあたりの read/write システムコール数 (/proc/self/io) と open 回数 (audit フック)
+    alloc           : 1サイクルあたりの確保ブロック数の増減とピークのメモリ確保量 (tracemalloc)
+    device_bytes    : build_devices で構築したデバイス・パラメータのメモリ量 (tracemalloc)
+    output_latency  : 出力ファイルの書き換えから output_func に反映されるまでの時間
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from InterfaceParam import InterfaceCard
+from InterfaceSim import SimulatedCtrl, SimHandlerMap, generate_config
+from InterfaceStorage import MemoryStorage
+from mlb_interface import build_devices
+
+_open_events = 0
+# 監査フックは削除できないため、プロセス内で1回だけ登録する（run_benchmark を繰り返し呼ぶ場合）
+_audit_hook_installed = False
+
+
+def _audit_hook(event, args):
+    global _open_events
+    if event == "open":
+        _open_events += 1
+
+
+def _install_audit_hook():
+    global _audit_hook_installed
+    if not _audit_hook_installed:
+        sys.addaudithook(_audit_hook)
+        _audit_hook_installed = True
+
+
+def _proc_io():
+    """(read 系システムコール数, write 系システムコール数) を返す（Linux のみ）"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            fields = dict(line.split(":", 1) for line in f.read().splitlines())
+        return int(fields["syscr"]), int(fields["syscw"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+    return {
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": ordered[-1],
+        "mean": sum(ordered) / len(ordered),
+    }
+
+
+def _build_card(num_devices, args, root):
+    config = generate_config(
+        num_devices,
+        os.path.join(root, f"card{num_devices}"),
+        inputs_per_device=args.inputs,
+        outputs_per_device=args.outputs,
+    )
+    ctrl_class = functools.partial(
+        SimulatedCtrl,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        change_rate=args.change_rate,
+        session_latency_ms=args.session_latency_ms,
+        seed=0,
+    )
+    storage = MemoryStorage() if args.storage == "memory" else None
+    card = InterfaceCard(
+        ctrl_class,
+        config["card_directory"],
+        watch=args.watch,
+        max_workers=args.max_workers,
+        storage=storage,
+    )
+    # デバイスのメモリ量は別に構築して計測する（tracemalloc の負荷を setup_s に含めない）
+    tracemalloc.start()
+    devices = build_devices(config, SimHandlerMap())
+    device_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del devices
+
+    start = time.perf_counter()
+    card.add_devices(build_devices(config, SimHandlerMap()))
+    setup_s = time.perf_counter() - start
+    if args.write_behind is not None:
+        card.enable_write_behind(fsync=args.write_behind)
+    return card, setup_s, device_bytes
+
+
+def _measure_cycles(card, cycles):
+    durations = []
+    reads = writes = opens = 0
+    io_available = _proc_io() is not None
+    for _ in range(cycles):
+        before_io = _proc_io()
+        before_open = _open_events
+        start = time.perf_counter()
+        card.update_status()
+        durations.append((time.perf_counter() - start) * 1000.0)
+        opens += _open_events - before_open
+        after_io = _proc_io()
+        if io_available:
+            # /proc/self/io の読み出し自体の read 1回分を差し引く
+            reads += after_io[0] - before_io[0] - 1
+            writes += after_io[1] - before_io[1]
+    result = {"cycle_ms": _percentiles(durations)}
+    result["syscalls_per_cycle"] = {
+        "open": opens / cycles,
+        "read": reads / cycles if io_available else None,
+        "write": writes / cycles if io_available else None,
+    }
+    return result
+
+
+def _measure_allocations(card, cycles):
+    tracemalloc.start()
+    blocks = 0
+    peaks = []
+    for _ in range(cycles):
+        before = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        card.update_status()
+        _, peak = tracemalloc.get_traced_memory()
+        blocks += sys.getallocatedblocks() - before
+        peaks.append(peak - base)
+    tracemalloc.stop()
+    return {
+        "net_blocks_per_cycle": blocks / cycles,
+        "peak_bytes_per_cycle": _percentiles(peaks),
+    }
+
+
+def _run_loop_until(card, deadline, done=lambda: False):
+    """InterfaceCard.run と同じ wait + poll_due のループを deadline まで（または done() まで）回す"""
+    while not done():
+        now = time.perf_counter()
+        if now >= deadline:
+            return False
+        next_due = card.scheduler.next_due()
+        remaining = deadline - now
+        timeout = remaining if next_due is None else max(0.0, min(remaining, next_due - card.scheduler.clock()))
+        card.wait(timeout)
+        card.poll_due()
+    return True
+
+
+def _measure_output_latency(card, samples, timeout_s=5.0):
+    """
+    出力ファイルを書き換え、実際の周期処理（wait + poll_due）で反映されるまでの時間
+    書き換えのタイミングがポーリング周期に対して偏らないよう、各計測の前にランダムな時間だけループを回す
+    """
+    rng = random.Random(0)
+    period_s = card.scheduler.default_period_ms / 1000.0
+    params = [
+        (device, param) for device in card.devices for param in device.parameters
+        if param.output_func is not None and param.filename.startswith("out")
+    ]
+    if not params:
+        return {}
+    latencies = []
+    for i in range(samples):
+        device, param = params[i % len(params)]
+        key = f"{device.directory_name}/{param.filename}"
+        value = str(1000 + i)
+        _run_loop_until(card, time.perf_counter() + rng.uniform(0.0, period_s))
+
+        start = time.perf_counter()
+        card.storage.write(param.full_path, value)
+
+        def reflected():
+            written = card.ctrl.writes.get(key)
+            return written is not None and written[0] == value
+        if _run_loop_until(card, start + timeout_s, reflected):
+            latencies.append((card.ctrl.writes[key][1] - start) * 1000.0)
+    return _percentiles(latencies)
+
+
+def run_benchmark(args):
+    _install_audit_hook()
+    root = tempfile.mkdtemp(prefix="bench_interface_")
+    results = []
+    try:
+        for num_devices in args.devices:
+            card, setup_s, device_bytes = _build_card(num_devices, args, root)
+            num_params = sum(len(device.parameters) for device in card.devices)
+            entry = {
+                "devices": num_devices,
+                "parameters": num_params,
+                "setup_s": setup_s,
+                "device_bytes": device_bytes,
+                "watch": card.watcher is not None,
+            }
+            entry.update(_measure_cycles(card, args.cycles))
+            entry["alloc"] = _measure_allocations(card, max(1, args.cycles // 5))
+            entry["output_latency_ms"] = _measure_output_latency(card, args.latency_samples)
+            card.shutdown()
+            results.append(entry)
+            print(
+                f"devices={num_devices:>6} params={num_params:>6} "
+                f"cycle p50={entry['cycle_ms']['p50']:.2f}ms p99={entry['cycle_ms']['p99']:.2f}ms "
+                f"open/cycle={entry['syscalls_per_cycle']['open']:.1f} "
+                f"out-latency p50={entry['output_latency_ms'].get('p50', float('nan')):.2f}ms"
+            )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """前回結果と比較し、cycle_ms の p50 が threshold 倍を超えて悪化したものを返す"""
+    previous = {entry["devices"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in current:
+        old = previous.get(entry["devices"])
+        if old is None:
+            continue
+        before, after = old["cycle_ms"]["p50"], entry["cycle_ms"]["p50"]
+        ratio = after / before if before else float("inf")
+        print(f"devices={entry['devices']:>6} cycle p50 {before:.2f}ms -> {after:.2f}ms (x{ratio:.2f})")
+        if ratio > threshold:
+            regressions.append(entry["devices"])
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", default="10,100,1000",
+                        type=lambda s: [int(v) for v in s.split(",")],
+                        help="デバイス数（カンマ区切り、10～10000）")
+    parser.add_argument("--inputs", type=int, default=2, help="デバイス毎の入力パラメータ数")
+    parser.add_argument("--outputs", type=int, default=1, help="デバイス毎の出力パラメータ数")
+    parser.add_argument("--cycles", type=int, default=20, help="計測するサイクル数")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="読み出し1回の遅延")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="遅延のゆらぎ")
+    parser.add_argument("--session-latency-ms", type=float, default=0.0, help="open/refresh/close の遅延")
+    parser.add_argument("--change-rate", type=float, default=0.1, help="読み出し毎に値が変化する確率")
+    parser.add_argument("--max-workers", type=int, default=None, help="並列アクセスのスレッド数")
+    parser.add_argument("--watch", action="store_true", help="inotify による出力ファイルの監視を有効にする")
+    parser.add_argument("--write-behind", choices=("off", "batch", "always"), default=None,
+                        help="入力ファイルを専用スレッドで書き込む（fsync の方式を指定）")
+    parser.add_argument("--storage", choices=("file", "memory"), default="file",
+                        help="値の保存先（memory はディスクI/O を除いたロジックのみを計測する）")
+    parser.add_argument("--latency-samples", type=int, default=5, help="出力遅延の計測回数")
+    parser.add_argument("--out", default=None, help="結果を保存する JSON ファイル")
+    parser.add_argument("--compare", default=None, help="比較する前回結果の JSON ファイル")
+    parser.add_argument("--threshold", type=float, default=1.2, help="悪化と判定する倍率")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    report = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"性能が悪化しています: devices={regressions}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
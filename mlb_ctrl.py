@@ -1,65 +1,110 @@
-from typing import Optional, Tuple
-from InterfaceCtrl import InterfaceCtrl
+import logging
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+from InterfaceCtrl import InterfaceCtrl, CtrlSnapshot, snapshot_getter
+
+logger = logging.getLogger(__name__)
 
 class MlbCtrl(InterfaceCtrl):
+    # read_many のキー名 -> ゲッター名 ("ether_status:1" のように ":" 以降はポート番号)
+    READ_KEYS = {
+        "fpgaver": "get_fpgaver",
+        "id": "get_id",
+        "rsw": "get_rsw",
+        "ether_status": "get_ether_statuses",
+        "backlight_status": "get_backlight_statuses",
+        "backlight_pwm_duty": "get_backlight_pwm_duty",
+    }
+
     def __init__(self):
         super().__init__()
-        print("MlbCtrl instance created\n")
+        logger.info("MlbCtrl instance created")
     
     def open(self) -> None:
-        print("MlbCtrl: MLB API への接続を開始します...")
+        logger.debug("MlbCtrl: MLB API への接続を開始します...")
     
-    def refresh(self) -> None:
-        print("MlbCtrl: リーグの最新スコアを取得中...")
+    def refresh(self) -> CtrlSnapshot:
+        """
+        サイクル毎のスナップショットを作り直す
+        以降のゲッター（mlb_func のハンドラ・read_many から呼ばれる）はスナップショットから値を返し、
+        未取得の値のみ実際に読み出す
+        """
+        logger.debug("MlbCtrl: リーグの最新スコアを取得中...")
+        return self.new_snapshot()
 
     def close(self) -> None:
-        print("MlbCtrl: セッションを正常に終了しました。")
+        logger.debug("MlbCtrl: セッションを正常に終了しました。")
+
+    def read_many(self, keys:Iterable[str]) -> Dict[str, Any]:
+        """
+        複数キーを一括で読み出す
+        実機では1回のバストランザクションでまとめて取得する
+        """
+        keys = list(keys)
+        logger.debug("MlbCtrl: 一括読み出し %d 件", len(keys))
+        result = {}
+        for key in keys:
+            name, _, arg = key.partition(":")
+            getter = self.READ_KEYS.get(name)
+            if getter is None:
+                continue
+            if arg:
+                result[key] = getattr(self, getter)(int(arg))
+            else:
+                result[key] = getattr(self, getter)()
+        return result
 
+    @snapshot_getter
     def get_fpgaver(self) -> Optional[str]:
-        print(f"exec get_fpgaver.")
+        logger.debug("exec get_fpgaver.")
         return "2512"
 
+    @snapshot_getter
     def get_id(self) -> Optional[str]:
         return "17"
 
+    @snapshot_getter
     def get_rsw(self) -> Optional[str]:
-        print(f"exec get_rsw.")
+        logger.debug("exec get_rsw.")
         return "543211"
 
+    @snapshot_getter
     def get_ether_statuses(self, port_num: int) -> Optional[Tuple[str, str]]:
-        print(f"exec get_ether_statuses.{port_num:04X}")
+        logger.debug("exec get_ether_statuses.%04X", port_num)
         return "1"
 
+    @snapshot_getter
     def get_backlight_statuses(self, port_num: int) -> Optional[Tuple[str, str]]:
         return "0123"
 
+    @snapshot_getter
     def get_backlight_pwm_duty(self, port_num: int) -> Optional[Tuple[str, str]]:
-        print(f"exec get_backlight_pwm_duty.{port_num:04X}")
+        logger.debug("exec get_backlight_pwm_duty.%04X", port_num)
         return "0020"
 
     def backlight1_turnon(self) -> None:
-        print("MlbCtrl: backlight1_turnon")
+        logger.info("MlbCtrl: backlight1_turnon")
 
     def backlight1_turnoff(self) -> None:
-        print("MlbCtrl: backlight1_turnoff")
+        logger.info("MlbCtrl: backlight1_turnoff")
     
     def backlight2_turnon(self) -> None:
-        print("MlbCtrl: backlight2_turnon")
+        logger.info("MlbCtrl: backlight2_turnon")
 
     def backlight2_turnoff(self) -> None:
-        print("MlbCtrl: backlight2_turnoff")
+        logger.info("MlbCtrl: backlight2_turnoff")
     
     def set_brightness(self, value: int) -> bool:
         return True
     
     def display_mode_single(self) -> None:
-        print("MlbCtrl: single display mode")
+        logger.info("MlbCtrl: single display mode")
     
     def display_mode_double(self) -> None:
-        print("MlbCtrl: double display mode")
+        logger.info("MlbCtrl: double display mode")
 
     def set_testled(self, enable: bool) -> None:
         if enable == True:
-            print("MlbCtrl: testled turnon")
+            logger.info("MlbCtrl: testled turnon")
         else:
-            print("MlbCtrl: testled turnoff")
+            logger.info("MlbCtrl: testled turnoff")
@@ -1,6 +1,18 @@
+import logging
+import re
+
 from typing import Iterable, Any, Callable
 from mlb_ctrl import MlbCtrl
 
+logger = logging.getLogger(__name__)
+
+# 0x または 0X 始まりを許容する正規表現
+# 1. 0xがある場合、その後に1～6桁の16進数文字
+# 2. 0xがない場合、1～6桁の16進数文字
+_HEX6_PATTERN = re.compile(r'^(0[xX])?[0-9a-fA-F]{1,6}$')
+
+# 入力ハンドラが呼ぶ MlbCtrl のゲッターは refresh のスナップショットから値を返す
+# （同一サイクル内で同じポートを複数のパラメータが参照しても読み出しは1回になる）
 def fpgaver_handler(controller:MlbCtrl) -> str:
     return controller.get_fpgaver()
 
@@ -23,11 +35,11 @@ def ethport3_linkgood_handler(controller:MlbCtrl) -> str:
     return controller.get_ether_statuses(3)
 
 def backlight1_error_handler(controller:MlbCtrl) -> str:
-    print(f"exec backlight1_error_handler.")
+    logger.debug("exec backlight1_error_handler.")
     return "0"
 
 def backlight2_error_handler(controller:MlbCtrl) -> str:
-    print(f"exec backlight2_error_handler.")
+    logger.debug("exec backlight2_error_handler.")
     return "1"
 
 def backlight1_duty_handler(controller:MlbCtrl) -> str:
@@ -53,24 +65,19 @@ def backlight2_on_handler(controller:MlbCtrl,value: str) -> str:
 # より汎用的に作るなら（引数で選択肢を指定できるクロージャ形式）
 def create_choice_validator(choices:Iterable[Any]) -> Callable[[Any], bool]:
     """指定されたリストのいずれかに含まれるかチェックする関数を返す"""
+    # 数値と文字列の両方を考慮するため、すべて文字列に変換して比較
+    allowed = frozenset(str(c) for c in choices)
     def validator(value):
-        # 数値と文字列の両方を考慮するため、すべて文字列に変換して比較
-        return str(value) in [str(c) for c in choices]
+        return str(value) in allowed
     return validator
 
 def validate_16bit_hex_6culum(val:int) -> bool:
-    import re
-
     if val is None:
         return False
     # 文字列に変換
     s_val = str(val).strip()
-    # 0x または 0X 始まりを許容する正規表現
-    # 1. 0xがある場合、その後に1～6桁の16進数文字
-    # 2. 0xがない場合、1～6桁の16進数文字
-    pattern = r'^(0[xX])?[0-9a-fA-F]{1,6}$'
     
-    if re.match(pattern, s_val):
+    if _HEX6_PATTERN.match(s_val):
         try:
             # 数値として0xFFFF以下であることを確認
             return int(s_val, 16) <= 0xFFFFFF
@@ -79,18 +86,12 @@ def validate_16bit_hex_6culum(val:int) -> bool:
     return False
 
 def validate_percent(val:int) -> bool:
-    import re
-
     if val is None:
         return False
     # 文字列に変換
     s_val = str(val).strip()
-    # 0x または 0X 始まりを許容する正規表現
-    # 1. 0xがある場合、その後に1～6桁の16進数文字
-    # 2. 0xがない場合、1～6桁の16進数文字
-    pattern = r'^(0[xX])?[0-9a-fA-F]{1,6}$'
     
-    if re.match(pattern, s_val):
+    if _HEX6_PATTERN.match(s_val):
         try:
             # 数値として100以下であることを確認
             return int(s_val, 16) <= 100
@@ -98,6 +99,10 @@ def validate_percent(val:int) -> bool:
             return False
     return False
 
+# 16進数の値を扱うバリデータ（履歴等は base を参照して値を数値に変換する）
+validate_16bit_hex_6culum.base = 16
+validate_percent.base = 16
+
 # --- 関数マッピング ---
 # JSON内の文字列を実際の関数オブジェクトに変換するための辞書
 func_map = {
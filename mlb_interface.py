@@ -1,52 +1,141 @@
 import json
 import os
-import time
-from InterfaceParam import InterfaceCard, Device, InputParameter, OutputParameter
+import signal
+from InterfaceParam import InterfaceCard, Device, InputParameter, OutputParameter, ConstParameter
 from mlb_func import func_map
+from InterfaceValidator import resolve_validator
+from InterfaceLog import configure_logging
+from InterfaceStorage import create_storage
 from mlb_ctrl import MlbCtrl
+from mlb_plan import load_plan, load_object, PlanHandlers
 
-def main(config_file:str="config.json") -> None:
-    # 1. JSON読み込み
-    with open(config_file, "r", encoding="utf-8") as f:
-        config = json.load(f)
-
-    mlb = InterfaceCard(InterfaceCtrl=MlbCtrl, card_directory=config["card_directory"])
-
-    # 2. デバイスの構築
+def build_devices(config:dict, handlers=func_map) -> list:
+    """
+    設定から Device のリストを構築する
+    （AsyncInterfaceCard など InterfaceCard 以外から利用する場合も共通）
+    :param handlers: 名前から関数を引く辞書（get を持つもの）
+    """
+    devices = []
     for dev_name, params_info in config["devices"].items():
         params = []
         for p in params_info:
             # func_mapから関数を取得 (なければNone)
-            v_func = func_map.get(p.get("v"))
-            in_func = func_map.get(p.get("in"))
-            out_func = func_map.get(p.get("out"))
+            # "v" は関数名の他に {"enum": [0, 1]} のような宣言的な指定も可能
+            v_func = resolve_validator(p.get("v"), handlers)
+            in_func = handlers.get(p.get("in"))
+            out_func = handlers.get(p.get("out"))
 
             param = None
             if p["type"] == "in":
-                param = InputParameter(p["file"], value=p["val"], validator_func=v_func, input_func=in_func)
+                param = InputParameter(p["file"], value=p["val"], validator_func=v_func, input_func=in_func, period_ms=p.get("period_ms"), read_key=p.get("key"), max_period_ms=p.get("max_period_ms"))
             elif p["type"] == "out":
-                param = OutputParameter(p["file"], value=p["val"], validator_func=v_func, output_func=out_func)
+                param = OutputParameter(p["file"], value=p["val"], validator_func=v_func, output_func=out_func, period_ms=p.get("period_ms"))
+            elif p["type"] == "const":
+                # 初回のみ読み出し、コントローラのリセット・再接続時に読み直す
+                param = ConstParameter(p["file"], value=p["val"], validator_func=v_func, input_func=in_func, read_key=p.get("key"))
             
             if param:
                 params.append(param)
         
-        mlb.add_device(Device(directory_name=dev_name, parameters=params))
+        devices.append(Device(directory_name=dev_name, parameters=params))
+    return devices
+
+def build_card(config:dict, ctrl_class=MlbCtrl, handlers=func_map, watch:bool=True) -> InterfaceCard:
+    """
+    1枚分の設定から InterfaceCard を構築し、デバイスを追加する
+    （mlb_supervisor から複数カード分を構築する場合も共通）
+    """
+    # 値の保存先（例: "storage": "memory"、{"type": "mmap", "path": "/dev/shm/mlb.img"}、省略時はファイル）
+    storage = config.get("storage")
+    if isinstance(storage, dict):
+        # mmap のスロット名は card_directory からの相対パス
+        storage = dict({"root": config["card_directory"]}, **storage)
+
+    card = InterfaceCard(
+        InterfaceCtrl=ctrl_class,
+        card_directory=config["card_directory"],
+        watch=watch,
+        # 指定した場合のみデバイスを並列にアクセスする
+        max_workers=config.get("max_workers"),
+        # 省略時はコントローラの指定に従う（例: "persistent_session": true, "keepalive_s": 5）
+        persistent_session=config.get("persistent_session"),
+        keepalive_s=config.get("keepalive_s"),
+        # 適応周期（例: "max_period_ms": 60000 で変化の無い入力の周期を最大60秒まで延ばす）
+        max_period_ms=config.get("max_period_ms"),
+        backoff_factor=config.get("backoff_factor", 2.0),
+        storage=create_storage(storage),
+    )
+
+    # デバイスの構築（1回のコントローラセッションでまとめて追加する）
+    card.add_devices(build_devices(config, handlers))
+
+    # コントローラのイベントグループ -> 即座に読み出すパラメータ（例: "events": {"link": ["ethport*/linkgood"]}）
+    # コントローラが event_fileno に対応していない場合は使われない
+    for group, patterns in config.get("events", {}).items():
+        for pattern in patterns:
+            card.map_event(group, pattern)
+
+    # ステータスイメージ（true の場合は card_directory/.status.img）
+    status_image = config.get("status_image")
+    if status_image:
+        card.enable_status_image(status_image if isinstance(status_image, str) else None)
+
+    # 所要時間の統計（例: "stats": {"interval_s": 10} で card_directory/.stats.json, .stats.prom を出力）
+    stats = config.get("stats")
+    if stats:
+        card.enable_stats(**(stats if isinstance(stats, dict) else {}))
+
+    # 数値パラメータの履歴（例: "history": {"raw_capacity": 1024, "tiers": [[1, 300], [60, 1440], [3600, 2232]]}）
+    # 16進数のバリデータ（{"hex": ...}、validate_percent 等）の値は16進数として記録する
+    # それ以外は "parsers": {"backlight*/duty": {"base": 16}} のように指定できる
+    history = config.get("history")
+    if history:
+        card.enable_history(**(history if isinstance(history, dict) else {}))
+
+    # 入力ファイルの書き込みを専用スレッドで行う（例: "write_behind": {"fsync": "batch"}、true の場合は fsync しない）
+    write_behind = config.get("write_behind")
+    if write_behind:
+        card.enable_write_behind(**(write_behind if isinstance(write_behind, dict) else {}))
+
+    # 値の参照・設定用の Unix ソケット（true の場合は card_directory/.control.sock）
+    server = config.get("server")
+    if server:
+        card.enable_server(server if isinstance(server, str) else None)
+    return card
+
+def main(config_file:str="config.json") -> None:
+    # 1. JSON読み込み（検証済みのプランがキャッシュにあれば検証を省略する）
+    config = load_plan(config_file)
+
+    # ログ設定（既定は WARNING 以上のみ出力し、INFO 以上をリングバッファに保持する）
+    # 例: "logging": {"level": "WARNING", "levels": {"mlb_ctrl": "DEBUG"}, "ring_size": 1000}
+    log_system = configure_logging(**config.get("logging", {}))
+    # SIGUSR1 でリングバッファの内容を出力する
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: log_system.dump_ring())
+
+    # 2. カードとデバイスの構築
+    # "module:function" 形式のハンドラは最初に呼ばれた時点で import する
+    mlb = build_card(config, handlers=PlanHandlers(func_map))
 
     # 3. 実行
-    print(f"--- 監視開始 (1秒周期 / Config: {config_file}) ---")
+    print(f"--- 監視開始 (パラメータ毎の周期 / Config: {config_file}) ---")
     print("終了するには Ctrl+C を押してください")
     
     try:
-        while True:
-            # 状態の更新を実行
-            mlb.update_status()
-            
-            # 次の実行まで1秒待機
-            time.sleep(1)
+        # period_ms に従って期限に達したパラメータのみ更新する
+        # （待機中の出力ファイル変更は即座に反映される）
+        mlb.run()
             
     except KeyboardInterrupt:
         # Ctrl+C が押されたときに綺麗に終了する
         print("\n--- 監視を停止しました ---")
+        for name, count in mlb.overrun_report().items():
+            if count:
+                print(f"周期超過: {name} {count} 回")
+    finally:
+        mlb.shutdown()
+        log_system.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,346 @@
+"""
+config.json の検証・ハンドラ解決を行い、結果（プラン）を設定のハッシュをキーにキャッシュする
+プランはハッシュとともに "<config_file>.plan" に記録し、次回の起動では同じ内容の設定の検証・ハンドラ解決を省略する
+（パラメータの構築は起動毎に行う）
+"module:function" で参照するモジュールのパスと更新時刻も記録し、モジュールが更新・削除された場合は検証し直す
+
+    config = load_plan("config.json")                 # 2回目以降は検証を省略する
+    card = build_card(config, handlers=PlanHandlers(func_map))
+
+ハンドラ名は func_map の名前の他に "module:function" 形式で指定できる
+"module:function" のモジュールは最初に呼ばれた時点で import する（使われないモジュールは import しない）
+"""
+import hashlib
+import importlib
+import importlib.machinery
+import importlib.util
+import json
+import logging
+import os
+import re
+
+from typing import Any, Callable, Dict, Optional
+from InterfaceHistory import compile_parser
+from InterfaceValidator import compile_validator
+from InterfaceWriter import FSYNC_MODES
+
+logger = logging.getLogger(__name__)
+
+# プランの形式を変更した場合は上げる（古いキャッシュを無効にする）
+PLAN_VERSION = 3
+
+# 一括読み出しのキー（"name" または "name:番号"、MlbCtrl.read_many は番号を int で渡す）
+_READ_KEY = re.compile(r"[A-Za-z_]\w*(:\d+)?")
+
+# 検証済みのプラン（同一プロセス内での再読込用）: ハッシュ -> (設定, _module_stamps)
+_plan_cache: Dict[str, tuple] = {}
+
+
+def load_object(spec:str):
+    """
+    "module:attr" 形式の指定からオブジェクトを読み込む（例: "mlb_ctrl:MlbCtrl"）
+    """
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"'module:attr' 形式で指定してください: {spec!r}")
+    obj = importlib.import_module(module_name)
+    for name in attr.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+class LazyHandler:
+    """"module:function" を最初の呼び出し時に import して呼び出すハンドラ"""
+    def __init__(self, spec:str):
+        self.spec = spec
+        self._func = None
+
+    def __call__(self, *args):
+        func = self._func
+        if func is None:
+            func = self._func = load_object(self.spec)
+        return func(*args)
+
+    def __repr__(self):
+        return f"LazyHandler({self.spec!r})"
+
+
+class PlanHandlers:
+    """
+    build_devices / resolve_validator に渡すハンドラの参照先
+    base（func_map）の名前を優先し、"module:function" 形式は LazyHandler に解決する
+    """
+    def __init__(self, base:Optional[Any]=None):
+        self.base = base if base is not None else {}
+        self._lazy: Dict[str, LazyHandler] = {}
+
+    def get(self, name:Optional[str], default=None) -> Optional[Callable]:
+        if name is None:
+            return default
+        func = self.base.get(name)
+        if func is not None:
+            return func
+        if ":" not in name:
+            return default
+        handler = self._lazy.get(name)
+        if handler is None:
+            handler = self._lazy[name] = LazyHandler(name)
+        return handler
+
+
+def _handler_names(handlers) -> list:
+    """キャッシュのキーに含めるハンドラ名（名前の増減でキャッシュを無効にする）"""
+    try:
+        return sorted(handlers.keys())
+    except AttributeError:
+        return [type(handlers).__name__]
+
+
+def config_hash(data:bytes, handlers=None) -> str:
+    """設定ファイルの内容・プランの形式・ハンドラ名からキャッシュのキーを計算する"""
+    h = hashlib.sha256()
+    h.update(f"plan-v{PLAN_VERSION}\0".encode())
+    if handlers is not None:
+        h.update("\0".join(_handler_names(handlers)).encode())
+        h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+def _module_spec(module_name:str):
+    """
+    モジュールの spec を返す（無い場合は None、親パッケージも含めて import しない）
+    importlib.util.find_spec は "a.b" の確認で "a" を import するため、パッケージの探索パスを順に辿る
+    """
+    parts = module_name.split(".")
+    try:
+        spec = importlib.util.find_spec(parts[0])
+        for i in range(1, len(parts)):
+            if spec is None or spec.submodule_search_locations is None:
+                return None
+            spec = importlib.machinery.PathFinder.find_spec(".".join(parts[:i + 1]), spec.submodule_search_locations)
+    except (ImportError, ValueError):
+        return None
+    return spec
+
+
+def _module_exists(module_name:str) -> bool:
+    return _module_spec(module_name) is not None
+
+
+def _module_stamps(plan:dict) -> Dict[str, Optional[list]]:
+    """
+    プランが参照する "module:function" のモジュール -> [ファイルのパス, 更新時刻(ns)]（無い場合は None）
+    記録したプランはモジュールの追加・削除・更新で無効にする
+    """
+    modules = set()
+    for params in plan.get("devices", {}).values():
+        for p in params:
+            for field in ("v", "in", "out"):
+                reference = p.get(field)
+                if isinstance(reference, str) and ":" in reference:
+                    modules.add(reference.partition(":")[0])
+    stamps = {}
+    for module_name in sorted(modules):
+        spec = _module_spec(module_name)
+        if spec is None:
+            stamps[module_name] = None
+            continue
+        try:
+            mtime = os.stat(spec.origin).st_mtime_ns
+        except (OSError, TypeError):
+            mtime = None
+        stamps[module_name] = [spec.origin, mtime]
+    return stamps
+
+
+def _check_reference(name, handlers, where:str) -> Optional[str]:
+    """
+    ハンドラ名が解決できるか確認し、プランに記録する参照を返す（"module:function" はモジュールの存在のみ確認し import しない）
+    func_map に無い名前は警告のみとし、None を返す（build_devices と同様にハンドラ無しとして扱う）
+    """
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"{where}: ハンドラ名は文字列で指定してください: {name!r}")
+    if handlers.get(name) is not None:
+        return name
+    module_name, sep, attr = name.partition(":")
+    if not sep:
+        # 従来どおりハンドラ無し (None) として扱う
+        logger.warning("%s: ハンドラが見つかりません: %r", where, name)
+        return None
+    if not module_name or not attr:
+        raise ValueError(f"{where}: 'module:function' 形式で指定してください: {name!r}")
+    if not _module_exists(module_name):
+        raise ValueError(f"{where}: モジュールが見つかりません: {module_name!r}")
+    return name
+
+
+def compile_config(config:dict, handlers=None, mlb_read_keys:bool=True) -> dict:
+    """
+    設定を検証し、検証済みの設定（プラン）を返す
+    プランは config.json と同じ形式のため、そのまま build_devices / build_card に渡せる
+    （解決できないハンドラ名はプランから除き、起動時に改めて解決・警告しない）
+    :param handlers: ハンドラ名の参照先（get を持つもの、省略時は mlb_func.func_map）
+    :param mlb_read_keys: "key" が MlbCtrl の形式か確認する（False の場合は文字列であることのみ確認する）
+    :raises ValueError: 設定に誤りがある場合（場所を含むメッセージ）
+    """
+    if handlers is None:
+        from mlb_func import func_map
+        handlers = func_map
+    if not isinstance(config, dict):
+        raise ValueError("設定はオブジェクトで指定してください")
+    card_directory = config.get("card_directory")
+    if not isinstance(card_directory, str) or not card_directory:
+        raise ValueError("card_directory: 文字列で指定してください")
+    devices = config.get("devices")
+    if not isinstance(devices, dict):
+        raise ValueError("devices: オブジェクトで指定してください")
+
+    max_period_ms = config.get("max_period_ms")
+    if max_period_ms is not None and (isinstance(max_period_ms, bool) or not isinstance(max_period_ms, int) or max_period_ms <= 0):
+        raise ValueError(f"max_period_ms: 正の整数で指定してください: {max_period_ms!r}")
+    backoff_factor = config.get("backoff_factor")
+    if backoff_factor is not None and (isinstance(backoff_factor, bool) or not isinstance(backoff_factor, (int, float)) or backoff_factor <= 1):
+        raise ValueError(f"backoff_factor: 1より大きい数値で指定してください: {backoff_factor!r}")
+    write_behind = config.get("write_behind")
+    if isinstance(write_behind, dict) and write_behind.get("fsync", "off") not in FSYNC_MODES:
+        raise ValueError(f"write_behind.fsync: {', '.join(FSYNC_MODES)} のいずれかを指定してください: {write_behind['fsync']!r}")
+    storage = config.get("storage")
+    if storage is not None and storage not in ("file", "memory") and not (
+            isinstance(storage, dict) and storage.get("type") == "mmap" and isinstance(storage.get("path"), str)):
+        raise ValueError(f"storage: \"file\"、\"memory\" または {{\"type\": \"mmap\", \"path\": ...}} を指定してください: {storage!r}")
+    if storage is not None and storage != "file":
+        # card_directory がディスク上に無いため、ソケット・統計ファイル等の置き場所を明示させる
+        for key in ("status_image", "server"):
+            value = config.get(key)
+            if value and not isinstance(value, str):
+                raise ValueError(f"{key}: storage がファイル以外の場合はパスを指定してください")
+        stats = config.get("stats")
+        if stats and not (isinstance(stats, dict) and isinstance(stats.get("directory"), str)):
+            raise ValueError("stats.directory: storage がファイル以外の場合は出力先のディレクトリを指定してください")
+    history = config.get("history")
+    if isinstance(history, dict):
+        parsers = history.get("parsers") or {}
+        if not isinstance(parsers, dict):
+            raise ValueError("history.parsers: オブジェクトで指定してください")
+        for pattern, spec in parsers.items():
+            if callable(spec):
+                raise ValueError(f"history.parsers.{pattern}: \"float\"、\"int\" または {{\"base\": 16}} の形式で指定してください")
+            try:
+                compile_parser(spec)
+            except ValueError as e:
+                raise ValueError(f"history.parsers.{pattern}: {e}") from None
+    events = config.get("events")
+    if events is not None:
+        if not isinstance(events, dict):
+            raise ValueError("events: オブジェクトで指定してください")
+        for group, patterns in events.items():
+            if not isinstance(patterns, list) or not all(isinstance(pattern, str) for pattern in patterns):
+                raise ValueError(f"events.{group}: 文字列のリストで指定してください")
+
+    plan_devices = {}
+    for dev_name, params_info in devices.items():
+        if not isinstance(params_info, list):
+            raise ValueError(f"devices.{dev_name}: リストで指定してください")
+        files = set()
+        plan_params = []
+        for i, p in enumerate(params_info):
+            where = f"devices.{dev_name}[{i}]"
+            if not isinstance(p, dict):
+                raise ValueError(f"{where}: オブジェクトで指定してください")
+            kind = p.get("type")
+            if kind not in ("in", "out", "const"):
+                raise ValueError(f"{where}.type: 'in'、'out' または 'const' を指定してください: {kind!r}")
+            filename = p.get("file")
+            if not isinstance(filename, str) or not filename:
+                raise ValueError(f"{where}.file: 文字列で指定してください")
+            if filename in files:
+                raise ValueError(f"{where}.file: ファイル名が重複しています: {filename!r}")
+            files.add(filename)
+
+            for field in ("period_ms", "max_period_ms"):
+                ms = p.get(field)
+                if ms is not None and (isinstance(ms, bool) or not isinstance(ms, int) or ms <= 0):
+                    raise ValueError(f"{where}.{field}: 正の整数で指定してください: {ms!r}")
+            if kind == "const":
+                for field in ("period_ms", "max_period_ms"):
+                    if p.get(field) is not None:
+                        raise ValueError(f"{where}.{field}: 'const' のパラメータは周期を指定できません")
+            max_period_ms = p.get("max_period_ms")
+            if max_period_ms is not None and max_period_ms < (p.get("period_ms") or 1000):
+                raise ValueError(f"{where}.max_period_ms: period_ms 以上を指定してください: {max_period_ms!r}")
+            key = p.get("key")
+            if key is not None and not (isinstance(key, str) and key):
+                raise ValueError(f"{where}.key: 文字列で指定してください: {key!r}")
+            if key is not None and mlb_read_keys and not _READ_KEY.fullmatch(key):
+                raise ValueError(f"{where}.key: 'name' または 'name:番号' の形式で指定してください: {key!r}")
+
+            plan_param = dict(p)
+            validator = p.get("v")
+            if isinstance(validator, dict):
+                try:
+                    compile_validator(validator)
+                except (ValueError, TypeError, KeyError) as e:
+                    raise ValueError(f"{where}.v: {e}") from None
+            elif validator is not None:
+                plan_param["v"] = _check_reference(validator, handlers, f"{where}.v")
+            func_key = "out" if kind == "out" else "in"
+            if p.get(func_key) is not None:
+                plan_param[func_key] = _check_reference(p[func_key], handlers, f"{where}.{func_key}")
+
+            plan_params.append({k: v for k, v in plan_param.items() if v is not None or k == "val"})
+        plan_devices[dev_name] = plan_params
+
+    plan = dict(config)
+    plan["devices"] = plan_devices
+    return plan
+
+
+def load_plan(config_file:str, handlers=None, cache_path:Optional[str]=None) -> dict:
+    """
+    設定ファイルを読み込み、検証済みのプランを返す
+    設定のハッシュと参照するハンドラのモジュール（パス・更新時刻）が一致するプランが記録されていれば、
+    検証・ハンドラ解決を省略してそれを返す
+    :param cache_path: プランを記録するファイル（省略時は "<config_file>.plan"、空文字の場合は記録しない）
+    """
+    if handlers is None:
+        from mlb_func import func_map
+        handlers = func_map
+    with open(config_file, "rb") as f:
+        data = f.read()
+    key = config_hash(data, handlers)
+
+    cached = _plan_cache.get(key)
+    if cached is not None and _module_stamps(cached[0]) == cached[1]:
+        return cached[0]
+
+    plan = None
+    if cache_path is None:
+        cache_path = f"{config_file}.plan"
+    if cache_path:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("hash") == key and isinstance(cached.get("plan"), dict):
+                stamps = _module_stamps(cached["plan"])
+                if stamps == cached.get("modules"):
+                    plan = cached["plan"]
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    if plan is not None:
+        logger.debug("検証済みの設定です（検証を省略します）: %s", config_file)
+    else:
+        plan = compile_config(json.loads(data), handlers)
+        stamps = _module_stamps(plan)
+        if cache_path:
+            tmp_path = f"{cache_path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"hash": key, "version": PLAN_VERSION, "plan": plan, "modules": stamps}, f, ensure_ascii=False)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                # 読み取り専用の場所など（次回も検証するだけで動作には影響しない）
+                logger.info("検証結果を保存できません (%s): %s", cache_path, e)
+    _plan_cache[key] = (plan, stamps)
+    return plan
@@ -0,0 +1,414 @@
+"""
+複数カードの監視をプロセス単位に分散して実行するスーパーバイザ
+
+    python mlb_supervisor.py cards.json
+
+設定ファイルの形式
+    {
+        "processes": 4,                       # 省略時は CPU コア数とカード数の小さい方
+        "health_file": "/tmp/mlb/health.json",  # 集約したヘルス情報の出力先（省略可）
+        "logging": {"level": "WARNING"},
+        "cards": [
+            {"name": "card0", "card_directory": "/tmp/mlb0", "ctrl": "mlb_ctrl:MlbCtrl", "devices": {...}},
+            {"name": "card1", "card_directory": "/tmp/mlb1", "ctrl": "mlb_ctrl:MlbCtrl", "devices": {...}}
+        ]
+    }
+各カードの設定は config.json と同じ形式（"ctrl" / "handlers" は "module:attr" 形式で指定する）
+"""
+import json
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import select
+import signal
+import sys
+import threading
+import time
+
+from typing import Dict, List, Optional
+from InterfaceLog import configure_logging
+from mlb_interface import build_card
+from mlb_plan import compile_config, load_object, PlanHandlers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CTRL = "mlb_ctrl:MlbCtrl"
+DEFAULT_HANDLERS = "mlb_func:func_map"
+
+
+def _load_handlers(card_config:dict):
+    """カード設定の "handlers" を読み込む（クラスの場合はインスタンスを作る）"""
+    handlers = load_object(card_config.get("handlers", DEFAULT_HANDLERS))
+    if isinstance(handlers, type):
+        handlers = handlers()
+    return handlers
+
+
+def compile_cards(config:dict) -> dict:
+    """
+    各カードの設定を mlb_plan.compile_config で検証し、プランに置き換えた設定を返す
+    （mlb_interface.main と同じ検証をワーカーの起動前に行い、誤りはカード名を付けて報告する）
+    "key" の形式は MlbCtrl 固有のため、他のコントローラのカードでは文字列であることのみ確認する
+    :raises ValueError: 設定に誤りがある場合
+    """
+    cards = config.get("cards")
+    if not isinstance(cards, list) or not cards:
+        raise ValueError("cards: カードの設定のリストで指定してください")
+    plans = []
+    for i, card_config in enumerate(cards):
+        if not isinstance(card_config, dict) or not isinstance(card_config.get("name"), str) or not card_config["name"]:
+            raise ValueError(f"cards[{i}].name: 文字列で指定してください")
+        try:
+            mlb_read_keys = card_config.get("ctrl", DEFAULT_CTRL) == DEFAULT_CTRL
+            plans.append(compile_config(card_config, _load_handlers(card_config), mlb_read_keys))
+        except ValueError as e:
+            raise ValueError(f"cards[{i}] ({card_config['name']}): {e}") from None
+    return dict(config, cards=plans)
+
+
+def _card_weight(card_config:dict) -> int:
+    """分散の目安とするカードの負荷（パラメータ数）"""
+    return max(1, sum(len(params) for params in card_config.get("devices", {}).values()))
+
+
+def shard_cards(cards:List[dict], processes:int) -> List[List[dict]]:
+    """
+    カードをプロセス数分のグループに分ける
+    パラメータ数の多いカードから順に、負荷の最も小さいグループへ割り当てる
+    """
+    processes = max(1, min(processes, len(cards)))
+    shards = [[] for _ in range(processes)]
+    loads = [0] * processes
+    for card in sorted(cards, key=_card_weight, reverse=True):
+        i = loads.index(min(loads))
+        shards[i].append(card)
+        loads[i] += _card_weight(card)
+    return shards
+
+
+def _card_health(card, polled:int) -> dict:
+    health = {
+        "devices": len(card.devices),
+        "parameters": sum(len(device.parameters) for device in card.devices),
+        "polled": polled,
+        "overruns": card.scheduler.total_overruns(),
+    }
+    if card.stats is not None:
+        health["counters"] = dict(card.stats.counters)
+        health["updates"] = sum(p.updates for p in card.stats.parameters.values())
+        health["validation_failures"] = sum(p.validation_failures for p in card.stats.parameters.values())
+    return health
+
+
+def run_cards(cards:Dict[str, object], stop, report=None, heartbeat_s:float=1.0) -> None:
+    """
+    1プロセス内で複数カードのポーリングを行う（InterfaceCard.run の複数カード版）
+    inotify のイベント・ソケットの要求・コントローラの通知は全カード分をまとめて select で待つ
+    :param cards: カード名 -> InterfaceCard
+    :param stop: is_set() が True になると終了する（wait(timeout) も必要、threading.Event 等）
+    :param report: heartbeat_s 毎に {カード名: ヘルス情報} で呼ばれる
+    """
+    polled = {name: 0 for name in cards}
+    next_report = time.monotonic()
+    while not stop.is_set():
+        for name, card in cards.items():
+            polled[name] += card.poll_due()
+
+        now = time.monotonic()
+        if report is not None and now >= next_report:
+            report({name: _card_health(card, polled[name]) for name, card in cards.items()})
+            next_report = now + heartbeat_s
+
+        # 次の期限・報告・停止確認のうち最も早いものまで待つ
+        timeout = min(next_report - now, heartbeat_s)
+        for card in cards.values():
+            next_due = card.scheduler.next_due()
+            if next_due is not None:
+                timeout = min(timeout, next_due - card.scheduler.clock())
+            next_idle = card.session.next_idle()
+            if next_idle is not None:
+                timeout = min(timeout, next_idle)
+        timeout = max(0.0, timeout)
+
+        sources = {}
+        for card in cards.values():
+            sources.update(card.event_sources())
+        if sources:
+            readable, _, _ = select.select(list(sources), [], [], timeout)
+            for fd in readable:
+                sources[fd]()
+        elif timeout:
+            stop.wait(timeout)
+        # セッション維持時の keepalive・健全性確認・再接続
+        for card in cards.values():
+            card.session.idle()
+
+
+class _WorkerStop:
+    """
+    ワーカーの停止条件（SIGTERM を受けた、またはスーパーバイザが居なくなった）
+    プロセス間で共有するロックは強制終了されたワーカーが保持したままになり得るため使わない
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._parent = os.getppid()
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._event.set())
+
+    def is_set(self) -> bool:
+        return self._event.is_set() or os.getppid() != self._parent
+
+    def wait(self, timeout:float) -> bool:
+        return self._event.wait(timeout)
+
+
+def _worker_main(worker_id:int, card_configs:List[dict], logging_config:dict, conn, heartbeat_s:float) -> None:
+    """ワーカープロセスの本体（担当カードを構築してポーリングする）"""
+    # Ctrl+C はスーパーバイザが受け取り、SIGTERM で停止を伝える
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop = _WorkerStop()
+    log_system = configure_logging(**logging_config)
+    cards = {}
+    try:
+        for card_config in card_configs:
+            ctrl_class = load_object(card_config.get("ctrl", DEFAULT_CTRL))
+            handlers = PlanHandlers(_load_handlers(card_config))
+            cards[card_config["name"]] = build_card(card_config, ctrl_class, handlers, card_config.get("watch", True))
+
+        def report(health):
+            conn.send((time.time(), health))
+        run_cards(cards, stop, report, heartbeat_s)
+    finally:
+        for card in cards.values():
+            card.shutdown()
+        conn.close()
+        log_system.stop()
+
+
+class _Worker:
+    """ワーカープロセスの状態（再起動時は process と conn のみ差し替える）"""
+    def __init__(self, worker_id:int, cards:List[dict]):
+        self.worker_id = worker_id
+        self.cards = cards
+        self.process = None
+        # ワーカーからヘルス情報を受け取るパイプ（ワーカー毎に分け、強制終了の影響を他に及ぼさない）
+        self.conn = None
+        self.started = None
+        self.last_heartbeat = None
+        self.health = {}
+        self.restarts = 0
+        # 連続して異常終了した回数（再起動の待ち時間に使う）
+        self.failures = 0
+        self.restart_at = 0.0
+
+
+class CardSupervisor:
+    """
+    カードをプロセスに分散して実行し、異常終了・無応答のワーカーを再起動する
+    各ワーカーのヘルス情報を集約し、health_file に出力する
+    """
+    def __init__(
+            self,
+            config:dict,
+            processes:Optional[int]=None,
+            heartbeat_s:float=1.0,
+            heartbeat_timeout_s:float=30.0,
+            restart_backoff_s:float=1.0,
+            max_backoff_s:float=60.0,
+            health_file:Optional[str]=None,
+            context:Optional[str]="spawn"
+    ):
+        """
+        :param config: "cards" を含む設定
+        :param processes: プロセス数（省略時は CPU コア数）
+        :param heartbeat_timeout_s: この時間ヘルス情報が届かないワーカーは停止・再起動する
+        :param restart_backoff_s: 再起動までの待ち時間（連続失敗毎に倍、max_backoff_s まで）
+        :param context: multiprocessing の開始方法（ログのスレッド等を引き継がないよう既定は spawn）
+        """
+        cards = config["cards"]
+        names = [card["name"] for card in cards]
+        if len(set(names)) != len(names):
+            raise ValueError(f"カード名が重複しています: {names}")
+        self.logging_config = config.get("logging", {})
+        self.heartbeat_s = heartbeat_s
+        self.heartbeat_timeout_s = heartbeat_timeout_s
+        self.restart_backoff_s = restart_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.health_file = health_file
+        self._ctx = multiprocessing.get_context(context)
+        self._stop = threading.Event()
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.workers = [_Worker(i, shard) for i, shard in enumerate(shard_cards(cards, processes))]
+
+    def _start_worker(self, worker:_Worker) -> None:
+        reader, writer = self._ctx.Pipe(duplex=False)
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.worker_id, worker.cards, self.logging_config, writer, self.heartbeat_s),
+            name=f"mlb-card-worker{worker.worker_id}",
+            daemon=True,
+        )
+        worker.process.start()
+        writer.close()
+        worker.conn = reader
+        worker.started = time.monotonic()
+        worker.last_heartbeat = None
+        logger.info("ワーカー起動: %d (pid=%s, cards=%s)", worker.worker_id, worker.process.pid,
+                    [card["name"] for card in worker.cards])
+
+    def start(self) -> None:
+        for worker in self.workers:
+            self._start_worker(worker)
+
+    def _drain(self, timeout:float) -> None:
+        """届いたヘルス情報を取り込む（いずれかが届くまで最大 timeout 秒待つ）"""
+        owners = {worker.conn: worker for worker in self.workers if worker.conn is not None}
+        if not owners:
+            self._stop.wait(timeout)
+            return
+        for conn in multiprocessing.connection.wait(list(owners), timeout):
+            worker = owners[conn]
+            try:
+                while conn.poll():
+                    timestamp, health = conn.recv()
+                    worker.last_heartbeat = time.monotonic()
+                    worker.health = {"pid": worker.process.pid, "timestamp": timestamp, "cards": health}
+                    worker.failures = 0
+            except (EOFError, OSError):
+                # ワーカーが終了した（終了の判定は _check_workers で行う）
+                conn.close()
+                worker.conn = None
+
+    def _check_workers(self) -> None:
+        now = time.monotonic()
+        for worker in self.workers:
+            process = worker.process
+            if process is None:
+                if now >= worker.restart_at:
+                    worker.restarts += 1
+                    self._start_worker(worker)
+                continue
+
+            reason = None
+            if process.exitcode is not None:
+                reason = f"終了コード {process.exitcode}"
+            else:
+                last = worker.last_heartbeat if worker.last_heartbeat is not None else worker.started
+                if now - last > self.heartbeat_timeout_s:
+                    reason = f"{now - last:.1f} 秒応答なし"
+                    process.terminate()
+                    process.join(1.0)
+                    if process.is_alive():
+                        process.kill()
+                        process.join()
+            if reason is None:
+                continue
+
+            delay = min(self.max_backoff_s, self.restart_backoff_s * (2 ** worker.failures))
+            worker.failures += 1
+            worker.process = None
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+            worker.restart_at = now + delay
+            logger.warning("ワーカー %d が停止しました (%s)。%.1f 秒後に再起動します", worker.worker_id, reason, delay)
+
+    def health(self) -> dict:
+        """全ワーカー・全カードのヘルス情報を集約して返す"""
+        now = time.monotonic()
+        workers = []
+        cards = {}
+        for worker in self.workers:
+            alive = worker.process is not None and worker.process.is_alive()
+            workers.append({
+                "worker": worker.worker_id,
+                "pid": worker.process.pid if worker.process is not None else None,
+                "alive": alive,
+                "restarts": worker.restarts,
+                "heartbeat_age_s": None if worker.last_heartbeat is None else now - worker.last_heartbeat,
+                "cards": [card["name"] for card in worker.cards],
+            })
+            for card in worker.cards:
+                card_health = dict(worker.health.get("cards", {}).get(card["name"], {}))
+                card_health["worker"] = worker.worker_id
+                card_health["alive"] = alive
+                cards[card["name"]] = card_health
+        return {
+            "timestamp": time.time(),
+            "healthy": all(w["alive"] and w["heartbeat_age_s"] is not None for w in workers),
+            "overruns": sum(card.get("overruns", 0) for card in cards.values()),
+            "workers": workers,
+            "cards": cards,
+        }
+
+    def _write_health(self) -> None:
+        if self.health_file is None:
+            return
+        tmp_path = f"{self.health_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.health(), f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.health_file)
+        except OSError as e:
+            logger.warning("ヘルス情報の出力エラー (%s): %s", self.health_file, e)
+
+    def poll(self, timeout:float=0.0) -> None:
+        """ヘルス情報の取り込み・ワーカーの監視と再起動・ヘルス情報の出力を1回行う"""
+        self._drain(timeout)
+        self._check_workers()
+        self._write_health()
+
+    def run(self) -> None:
+        """stop が呼ばれるまで監視を続ける"""
+        while not self._stop.is_set():
+            self.poll(self.heartbeat_s)
+
+    def request_stop(self) -> None:
+        """run のループを終了させる（シグナルハンドラから呼べる）"""
+        self._stop.set()
+
+    def stop(self, timeout:float=5.0) -> None:
+        """全ワーカーに停止を伝え（SIGTERM）、終了を待つ"""
+        self._stop.set()
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            process = worker.process
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            worker.process = None
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+
+
+def main(config_file:str="cards.json") -> None:
+    with open(config_file, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    # ワーカーを起動する前に全カードの設定を検証する（ワーカーは検証済みのプランから構築する）
+    config = compile_cards(config)
+
+    log_system = configure_logging(**config.get("logging", {}))
+    supervisor = CardSupervisor(config, processes=config.get("processes"), health_file=config.get("health_file"))
+    signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.request_stop())
+
+    print(f"--- 監視開始 (カード {len(config['cards'])} 枚 / プロセス {len(supervisor.workers)} 個 / Config: {config_file}) ---")
+    print("終了するには Ctrl+C を押してください")
+    supervisor.start()
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        print("\n--- 監視を停止しました ---")
+    finally:
+        supervisor.stop()
+        log_system.stop()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,79 @@
+import unittest
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from InterfaceAsync import AsyncInterfaceCard
+from InterfaceCtrl import AsyncInterfaceCtrl, AsyncCtrlAdapter
+from InterfaceParam import Device, InputParameter, OutputParameter
+from mlb_ctrl import MlbCtrl
+from mlb_func import func_map
+
+class FakeAsyncCtrl(AsyncInterfaceCtrl):
+    def __init__(self):
+        self.calls = []
+
+    async def open(self) -> None:
+        self.calls.append("open")
+
+    async def refresh(self) -> None:
+        self.calls.append("refresh")
+
+    async def close(self) -> None:
+        self.calls.append("close")
+
+class TestAsyncInterfaceCard(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    async def test_sync_handlers_with_adapter(self):
+        """同期コントローラと mlb_func の同期ハンドラがラップして使えるか"""
+        card = AsyncInterfaceCard(AsyncCtrlAdapter(MlbCtrl()), self.test_root)
+        await card.start()
+        param = InputParameter("fpgaver", value="----", input_func=func_map["fpgaver_handler"])
+        await card.add_device(Device("fpga", [param]))
+
+        with open(os.path.join(self.test_root, "fpga", "fpgaver")) as f:
+            self.assertEqual(f.read(), "2512")
+
+    async def test_devices_run_concurrently(self):
+        """デバイスのアクセスがタスクとして並行に実行されるか"""
+        async def slow_handler(controller):
+            await asyncio.sleep(0.2)
+            return "1"
+
+        ctrl = FakeAsyncCtrl()
+        card = AsyncInterfaceCard(ctrl, self.test_root)
+        for i in range(3):
+            await card.add_device(Device(f"dev{i}", [InputParameter("v", value="0", input_func=slow_handler)]))
+        ctrl.calls.clear()
+
+        start = time.monotonic()
+        await card.update_status()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(ctrl.calls, ["open", "refresh", "close"])
+
+    async def test_async_output_func(self):
+        """ファイルの変更が非同期の output_func に渡されるか"""
+        output = AsyncMock()
+        ctrl = FakeAsyncCtrl()
+        card = AsyncInterfaceCard(ctrl, self.test_root)
+        param = OutputParameter("on", value="0", output_func=output)
+        await card.add_device(Device("backlight1", [param]))
+        output.assert_awaited_once_with(ctrl, "0")
+
+        with open(param.full_path, "w") as f:
+            f.write("1")
+        await card.update_status()
+
+        output.assert_awaited_with(ctrl, "1")
+        self.assertEqual(param._value, "1")
+
+if __name__ == '__main__':
+    unittest.main()
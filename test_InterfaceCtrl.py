@@ -5,7 +5,7 @@ import sys
 from abc import ABC
 
 # テスト対象のクラスをインポート（ファイル名に合わせて変更してください）
-from InterfaceCtrl import InterfaceCtrl
+from InterfaceCtrl import InterfaceCtrl, CtrlSession, CtrlSnapshot, snapshot_getter
 
 class TestInterfaceCtrl(unittest.TestCase):
     def setUp(self):
@@ -58,5 +58,181 @@ class TestInterfaceCtrl(unittest.TestCase):
         except TypeError as e:
             self.fail(f"Abstract method implementation failed: {e}")
 
+    def test_read_many_optional(self):
+        """read_many は任意実装で、既定では何も取得しない（空の辞書）ことを確認"""
+        ctrl = self.concrete_class()
+        self.assertEqual(ctrl.read_many(["fpgaver"]), {})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SessionCtrl(InterfaceCtrl):
+    """セッション維持のテスト用コントローラ"""
+    persistent_session = True
+    keepalive_interval_s = 5.0
+
+    def __init__(self):
+        self.calls = []
+        self.healthy = True
+        self.open_error = None
+
+    def open(self):
+        self.calls.append("open")
+        if self.open_error is not None:
+            raise self.open_error
+
+    def refresh(self):
+        self.calls.append("refresh")
+
+    def close(self):
+        self.calls.append("close")
+
+    def keepalive(self):
+        self.calls.append("keepalive")
+
+    def is_healthy(self):
+        return self.healthy
+
+
+class TestCtrlSession(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.ctrl = SessionCtrl()
+        self.session = CtrlSession(self.ctrl, clock=self.clock)
+
+    def test_per_cycle_by_default(self):
+        """persistent_session が False のコントローラは従来どおりサイクル毎に open/close するか"""
+        SessionCtrl.persistent_session = False
+        try:
+            session = CtrlSession(self.ctrl)
+        finally:
+            SessionCtrl.persistent_session = True
+        for _ in range(2):
+            self.assertTrue(session.begin())
+            session.end()
+        self.assertEqual(self.ctrl.calls, ["open", "close", "open", "close"])
+        self.assertIsNone(session.next_idle())
+
+    def test_session_kept_open(self):
+        for _ in range(3):
+            self.assertTrue(self.session.begin())
+            self.session.end()
+        self.assertEqual(self.ctrl.calls, ["open"])
+        self.session.close()
+        self.assertEqual(self.ctrl.calls, ["open", "close"])
+
+    def test_keepalive_when_idle(self):
+        """アクセスの無い間は keepalive_s 毎に keepalive が送られるか"""
+        self.session.begin()
+        self.session.end()
+        self.clock.now = 4.0
+        self.session.idle()
+        self.assertEqual(self.ctrl.calls, ["open"])
+        self.assertEqual(self.session.next_idle(), 1.0)
+        self.clock.now = 5.0
+        self.session.idle()
+        self.assertEqual(self.ctrl.calls, ["open", "keepalive"])
+
+    def test_reconnect_with_backoff(self):
+        """健全性確認に失敗した場合、閉じて再接続し、失敗が続けば待ち時間を延ばすか"""
+        self.session.begin()
+        self.ctrl.healthy = False
+        self.ctrl.open_error = OSError("link down")
+        self.clock.now = 5.0
+        self.session.idle()
+        self.assertEqual(self.ctrl.calls, ["open", "keepalive", "close", "open"])
+        self.assertFalse(self.session.begin())
+        self.assertEqual(self.session.next_idle(), 0.5)
+
+        self.clock.now = 5.5
+        self.assertFalse(self.session.begin())
+        self.assertEqual(self.session.next_idle(), 1.0)
+
+        self.ctrl.open_error = None
+        self.ctrl.healthy = True
+        self.clock.now = 6.5
+        self.assertTrue(self.session.begin())
+        self.assertEqual(self.session.reconnects, 1)
+        self.assertEqual(self.session.failures, 0)
+
+    def test_fail_during_cycle(self):
+        self.session.begin()
+        self.session.fail(OSError("timeout"))
+        self.assertFalse(self.session.is_open)
+        self.assertTrue(self.session.begin())
+        self.assertEqual(self.ctrl.calls, ["open", "close", "open"])
+
+    def test_reconnect_is_notified(self):
+        """再接続時のみコントローラの reset_hooks が呼ばれるか"""
+        reasons = []
+        self.ctrl.add_reset_hook(reasons.append)
+        self.session.begin()
+        self.session.begin()
+        self.assertEqual(reasons, [])
+        self.session.fail(OSError("timeout"))
+        self.session.begin()
+        self.assertEqual(reasons, ["reconnect"])
+
+class SnapshotCtrl(InterfaceCtrl):
+    """スナップショットのテスト用コントローラ"""
+    def __init__(self):
+        self.live_reads = []
+
+    def open(self):
+        pass
+
+    def refresh(self):
+        return self.new_snapshot({"get_fpgaver": "2512"})
+
+    def close(self):
+        pass
+
+    @snapshot_getter
+    def get_fpgaver(self):
+        self.live_reads.append("fpgaver")
+        return "live"
+
+    @snapshot_getter
+    def get_port(self, port):
+        self.live_reads.append(port)
+        return str(port)
+
+
+class TestCtrlSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.ctrl = SnapshotCtrl()
+
+    def test_live_without_snapshot(self):
+        """refresh 前はスナップショットを使わず実際に読み出すか"""
+        self.assertEqual(self.ctrl.get_port(1), "1")
+        self.assertEqual(self.ctrl.get_port(1), "1")
+        self.assertEqual(self.ctrl.live_reads, [1, 1])
+
+    def test_coalesced_within_cycle(self):
+        """refresh で取得済みの値は読み出さず、同じ呼び出しは1回にまとめられるか"""
+        snapshot = self.ctrl.refresh()
+        self.assertEqual(self.ctrl.get_fpgaver(), "2512")
+        self.assertEqual([self.ctrl.get_port(1), self.ctrl.get_port(1), self.ctrl.get_port(2)], ["1", "1", "2"])
+        self.assertEqual(self.ctrl.live_reads, [1, 2])
+        self.assertEqual(snapshot.hits, 2)
+
+        # 次のサイクルでは読み直す
+        self.ctrl.refresh()
+        self.ctrl.get_port(1)
+        self.assertEqual(self.ctrl.live_reads, [1, 2, 1])
+
+    def test_ttl(self):
+        clock = FakeClock()
+        snapshot = CtrlSnapshot({"get_fpgaver": "2512"}, ttl_s=1.0, clock=clock)
+        self.assertEqual(snapshot.get("get_fpgaver"), "2512")
+        clock.now = 1.5
+        self.assertIsNone(snapshot.get("get_fpgaver"))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
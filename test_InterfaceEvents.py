@@ -0,0 +1,62 @@
+import threading
+import unittest
+
+from InterfaceEvents import ChangeBus
+
+class TestChangeBus(unittest.TestCase):
+    def test_glob_match_and_event_fields(self):
+        bus = ChangeBus(clock=lambda: 12.5)
+        links = bus.subscribe("ethport*/linkgood")
+        device = bus.subscribe("fpga/*")
+        bus.publish("ethport2/linkgood", "0", "1")
+        bus.publish("fpga/version", None, "2512")
+        bus.publish("backlight1/duty", "20", "30")
+
+        event = links.get(timeout=0)
+        self.assertEqual((event.name, event.device, event.filename), ("ethport2/linkgood", "ethport2", "linkgood"))
+        self.assertEqual((event.old_value, event.new_value, event.timestamp), ("0", "1", 12.5))
+        self.assertIsNone(links.get(timeout=0))
+        self.assertEqual([e.name for e in device.get_all()], ["fpga/version"])
+        bus.close()
+
+    def test_bounded_queue_drops_oldest(self):
+        bus = ChangeBus()
+        sub = bus.subscribe("*", maxsize=2)
+        for i in range(5):
+            bus.publish("dev/p", i, i + 1)
+        self.assertEqual([e.new_value for e in sub.get_all()], [4, 5])
+        self.assertEqual(sub.dropped, 3)
+        bus.close()
+
+    def test_slow_callback_does_not_block_publish(self):
+        bus = ChangeBus()
+        release = threading.Event()
+        received = []
+        done = threading.Event()
+
+        def slow(event):
+            release.wait(5)
+            received.append(event.new_value)
+            if event.new_value == 9:
+                done.set()
+        sub = bus.subscribe("dev/*", callback=slow, maxsize=3)
+        for i in range(10):
+            bus.publish("dev/p", i, i)
+        # publish は購読者を待たずに戻る
+        release.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(received[-1], 9)
+        self.assertGreater(sub.dropped, 0)
+        bus.close()
+
+    def test_unsubscribe(self):
+        bus = ChangeBus()
+        sub = bus.subscribe("dev/p")
+        bus.publish("dev/p", 0, 1)
+        bus.unsubscribe(sub)
+        bus.publish("dev/p", 1, 2)
+        self.assertEqual([e.new_value for e in sub.get_all()], [1])
+        self.assertIsNone(sub.get(timeout=1))
+
+if __name__ == '__main__':
+    unittest.main()
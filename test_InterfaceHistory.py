@@ -0,0 +1,84 @@
+import unittest
+
+from InterfaceHistory import HistoryStore, RawSeries, TierSeries, compile_parser
+from InterfaceParam import InputParameter
+from InterfaceValidator import compile_validator
+from mlb_func import validate_percent
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSeries(unittest.TestCase):
+    def test_raw_ring_overwrites_oldest(self):
+        series = RawSeries(3)
+        for t in range(5):
+            series.append(float(t), t * 10.0)
+        self.assertEqual(series.query(), [(2.0, 20.0), (3.0, 30.0), (4.0, 40.0)])
+        self.assertEqual(series.query(3.0, 4.0), [(3.0, 30.0)])
+        self.assertEqual(series.nbytes, 3 * 12)
+
+    def test_tier_min_max_mean(self):
+        tier = TierSeries(60.0, 10)
+        for t, value in ((0, 1.0), (30, 3.0), (59, 2.0), (60, 5.0)):
+            tier.add(float(t), value)
+        # 集計中のバケットも返す
+        self.assertEqual(tier.query(), [(0.0, 1.0, 3.0, 2.0, 3), (60.0, 5.0, 5.0, 5.0, 1)])
+        self.assertEqual(tier.query(start=30.0), [(60.0, 5.0, 5.0, 5.0, 1)])
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = HistoryStore(raw_capacity=8, tiers=((1.0, 4), (60.0, 4)), clock=self.clock)
+
+    def test_records_parameter_updates(self):
+        """パラメータの更新が記録され、分解能に応じた段から返されるか"""
+        param = InputParameter("linkgood", value="1")
+        self.store.attach("ethport1/linkgood", param)
+        for t, value in ((0.2, "0"), (0.7, "1"), (1.5, "0")):
+            self.clock.now = t
+            old, param._value = param._value, value
+            param._run_update_hooks(old)
+
+        self.assertEqual(self.store.query("ethport1/linkgood"), [(0.0, 1.0), (0.2, 0.0), (0.7, 1.0), (1.5, 0.0)])
+        self.assertEqual(self.store.query("ethport1/linkgood", resolution=1.0),
+                         [(0.0, 0.0, 1.0, 2 / 3, 3), (1.0, 0.0, 0.0, 0.0, 1)])
+        self.assertEqual(self.store.query("ethport1/linkgood", resolution=30.0), [(0.0, 0.0, 1.0, 0.5, 4)])
+
+    def test_non_numeric_not_allocated(self):
+        """数値でない値は記録せず、領域も確保しないか"""
+        param = InputParameter("fpgaver", value="----")
+        self.store.attach("fpga/fpgaver", param)
+        self.assertEqual(self.store.query("fpga/fpgaver"), [])
+        self.assertNotIn("fpga/fpgaver", self.store.series)
+        self.assertEqual(self.store.rejected, 1)
+        with self.assertRaises(KeyError):
+            self.store.query("unknown")
+
+    def test_hex_values_follow_validator(self):
+        """16進数のバリデータを持つパラメータは16進数として記録されるか"""
+        for name, validator in (("backlight1/duty", validate_percent), ("fpga/rsw", compile_validator({"hex": {"max_digits": 6}}))):
+            with self.subTest(name=name):
+                param = InputParameter(name, value="0020", validator_func=validator)
+                self.store.attach(name, param)
+                self.assertEqual(self.store.query(name), [(0.0, 32.0)])
+
+    def test_compile_parser(self):
+        self.assertEqual(compile_parser({"base": 16})("00FF"), 255.0)
+        self.assertEqual(compile_parser("int")(" 12"), 12.0)
+        self.assertIs(compile_parser("float"), float)
+        with self.assertRaises(ValueError):
+            compile_parser({"base": 7})
+
+    def test_memory_is_fixed(self):
+        param = InputParameter("duty", value="0")
+        self.store.attach("backlight1/duty", param)
+        self.assertEqual(self.store.series["backlight1/duty"].nbytes, self.store.bytes_per_parameter())
+        self.assertEqual(self.store.bytes_per_parameter(), 8 * 12 + 4 * 28 + 4 * 28)
+
+if __name__ == '__main__':
+    unittest.main()
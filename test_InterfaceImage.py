@@ -0,0 +1,85 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from InterfaceImage import StatusImageWriter, StatusImageReader
+
+class TestStatusImage(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_root, "status.img")
+        self.writer = StatusImageWriter(self.path, ["fpga/fpgaver", "backlight1/duty"], slot_size=16)
+
+    def tearDown(self):
+        self.writer.close()
+        shutil.rmtree(self.test_root)
+
+    def test_layout(self):
+        """名前とスロットのレイアウトが読み出し側から参照できるか"""
+        reader = StatusImageReader(self.path)
+        self.assertEqual(reader.names, ["fpga/fpgaver", "backlight1/duty"])
+        self.assertEqual(reader.slot_size, 16)
+        self.assertEqual(reader.get("fpga/fpgaver"), "")
+        reader.close()
+
+    def test_set_and_get(self):
+        """書き込んだ値が読み出し側に反映されるか（開き直し不要）"""
+        reader = StatusImageReader(self.path)
+        self.writer.set_many({"fpga/fpgaver": "2512", "backlight1/duty": "0020"})
+        self.assertEqual(reader.get_all(), {"fpga/fpgaver": "2512", "backlight1/duty": "0020"})
+        self.writer.set("backlight1/duty", "7")
+        self.assertEqual(reader.get("backlight1/duty"), "7")
+
+        view = reader.view("fpga/fpgaver")
+        self.assertEqual(bytes(view), b"2512")
+        view.release()
+        self.assertEqual(reader.seq() % 2, 0)
+        reader.close()
+
+    def test_value_truncated_to_slot(self):
+        """スロットに収まらない値は切り詰められるか"""
+        self.writer.set("fpga/fpgaver", "x" * 40)
+        reader = StatusImageReader(self.path)
+        self.assertEqual(reader.get("fpga/fpgaver"), "x" * 14)
+        reader.close()
+
+    def test_value_truncated_on_character_boundary(self):
+        """マルチバイト文字の途中で切り詰めないか"""
+        self.writer.set("fpga/fpgaver", "a" + "あ" * 10)
+        reader = StatusImageReader(self.path)
+        view = reader.view("fpga/fpgaver")
+        self.assertEqual(bytes(view), ("a" + "あ" * 4).encode("utf-8"))
+        view.release()
+        reader.close()
+
+    def test_append_names(self):
+        """capacity の範囲で名前を追加でき、開いたままの読み出し側から参照できるか"""
+        path = os.path.join(self.test_root, "grow.img")
+        writer = StatusImageWriter(path, ["a/x"], slot_size=16, capacity=2)
+        reader = StatusImageReader(path)
+        self.assertTrue(writer.append(["a/x", "b/y"]))
+        writer.set("b/y", "1")
+        self.assertEqual(reader.get("b/y"), "1")
+        self.assertEqual(reader.names, ["a/x", "b/y"])
+        self.assertFalse(writer.append(["c/z"]))
+        reader.close()
+        writer.close()
+
+    def test_stale_after_rebuild(self):
+        """イメージが作り直された場合に検知できるか"""
+        reader = StatusImageReader(self.path)
+        self.assertFalse(reader.is_stale())
+        StatusImageWriter(self.path, ["fpga/fpgaver"]).close()
+        self.assertTrue(reader.is_stale())
+        reader.close()
+
+    def test_invalid_file(self):
+        bad = os.path.join(self.test_root, "bad.img")
+        with open(bad, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            StatusImageReader(bad)
+
+if __name__ == '__main__':
+    unittest.main()
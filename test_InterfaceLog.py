@@ -0,0 +1,116 @@
+import unittest
+import io
+import logging
+
+from InterfaceLog import RingBufferHandler, configure_logging, shutdown_logging
+
+class TestRingBufferHandler(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("test_InterfaceLog.ring")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+
+    def test_bounded(self):
+        """保持件数を超えた古いレコードは破棄されるか"""
+        ring = RingBufferHandler(capacity=3)
+        self.logger.addHandler(ring)
+        for i in range(5):
+            self.logger.info("value %d", i)
+        self.assertEqual([r.getMessage() for r in ring.records()], ["value 2", "value 3", "value 4"])
+
+    def test_lazy_formatting(self):
+        """記録時には整形されず、dump 時に整形されるか"""
+        class Value:
+            formatted = 0
+            def __str__(self):
+                Value.formatted += 1
+                return "v"
+        ring = RingBufferHandler(capacity=10)
+        ring.handle(logging.LogRecord("test", logging.INFO, __file__, 0, "value %s", (Value(),), None))
+        self.assertEqual(Value.formatted, 0)
+        self.assertIn("value v", ring.dump()[0])
+
+    def test_dump_on_error(self):
+        """ERROR を受け取るとそれまでの履歴が target に出力されるか"""
+        target = []
+        class Capture(logging.Handler):
+            def emit(self, record):
+                target.append(record.getMessage())
+        ring = RingBufferHandler(capacity=10, target=Capture())
+        self.logger.addHandler(ring)
+        self.logger.info("before")
+        self.logger.error("failed")
+        self.assertIn("before", target)
+        self.assertNotIn("failed", target)
+
+    def test_dump_only_new_records(self):
+        """自動出力は前回の出力以降のレコードのみで、間隔内の繰り返しは間引かれるか"""
+        target = []
+        class Capture(logging.Handler):
+            def emit(self, record):
+                target.append(record.getMessage())
+        ring = RingBufferHandler(capacity=10, target=Capture(), dump_interval_s=0.0)
+        self.logger.addHandler(ring)
+        self.logger.info("first")
+        self.logger.error("failed")
+        self.logger.info("second")
+        self.logger.error("failed")
+        self.assertEqual(target.count("first"), 1)
+        self.assertEqual(target.count("second"), 1)
+        self.assertNotIn("failed", target)
+
+        target.clear()
+        ring.dump_interval_s = 60.0
+        self.logger.error("failed")
+        self.assertEqual(target, [])
+
+    def test_dump_skips_records_at_dump_level(self):
+        """間引かれた間の ERROR は履歴に含めず、dump_level 未満のレコードのみ出力されるか"""
+        target = []
+        class Capture(logging.Handler):
+            def emit(self, record):
+                target.append(record.getMessage())
+        ring = RingBufferHandler(capacity=10, target=Capture(), dump_interval_s=60.0)
+        self.logger.addHandler(ring)
+        self.logger.error("first")
+        self.logger.info("middle")
+        self.logger.error("second")
+        self.assertEqual(target, [])
+
+        ring.dump_interval_s = 0.0
+        self.logger.error("third")
+        self.assertIn("middle", target)
+        self.assertNotIn("second", target)
+        self.assertNotIn("third", target)
+
+class TestConfigureLogging(unittest.TestCase):
+    def tearDown(self):
+        shutdown_logging()
+        logging.getLogger("test_mod").setLevel(logging.NOTSET)
+
+    def test_levels_and_batched_output(self):
+        """既定レベルとモジュール毎のレベルで出力が切り替わるか"""
+        stream = io.StringIO()
+        system = configure_logging(level="WARNING", levels={"test_mod": "DEBUG"}, stream=stream)
+        logging.getLogger("other").info("hidden")
+        logging.getLogger("other").warning("shown warning")
+        logging.getLogger("test_mod.sub").debug("shown debug")
+        system.listener.stop()
+
+        output = stream.getvalue()
+        self.assertNotIn("hidden", output)
+        self.assertIn("shown warning", output)
+        self.assertIn("shown debug", output)
+        # INFO はリングバッファには保持される
+        self.assertTrue(any("hidden" in line for line in system.ring.dump()))
+
+    def test_debug_not_created_by_default(self):
+        """既定設定では DEBUG レコードが生成されないか"""
+        configure_logging(stream=io.StringIO())
+        self.assertFalse(logging.getLogger("InterfaceParam").isEnabledFor(logging.DEBUG))
+
+if __name__ == '__main__':
+    unittest.main()
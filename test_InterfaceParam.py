@@ -1,7 +1,22 @@
 import unittest
 from unittest.mock import MagicMock, patch, call
 import os
-from InterfaceParam import InterfaceCard, BaseParameter
+import shutil
+import tempfile
+import threading
+import time
+from InterfaceParam import InterfaceCard, BaseParameter, Device, OutputParameter, InputParameter, ConstParameter
+from InterfaceCtrl import InterfaceCtrl
+from InterfaceImage import StatusImageReader
+from InterfaceValidator import compile_validator
+from InterfaceSim import PipeEventCtrl, SimHandlerMap
+
+class StubFileParameter(BaseParameter):
+    """ファイルを作成しないパラメータ（ディレクトリを作成しないテスト用）"""
+    __slots__ = ()
+
+    def prepare_file(self, target_dir:str, existing:set=None) -> None:
+        pass
 
 class TestInterfaceCard(unittest.TestCase):
 
@@ -94,6 +109,595 @@ class TestInterfaceCard(unittest.TestCase):
         for param in self.mock_device.parameters:
             param.prepare_file.assert_called_with("fake/path/device_A")
 
+    @patch('os.makedirs')
+    def test_poll_due_accesses_only_due_parameters(self, mock_makedirs):
+        """period_ms に従い期限に達したパラメータのみアクセスされるか"""
+        card = InterfaceCard(self.mock_ctrl_class, self.card_dir)
+        fast = StubFileParameter("fast", input_func=MagicMock(return_value="1"), period_ms=50)
+        slow = StubFileParameter("slow", input_func=MagicMock(return_value="1"), period_ms=60000)
+        card.add_device(Device("dev", [fast, slow]))
+        fast.input_func.reset_mock()
+        slow.input_func.reset_mock()
+
+        now = card.scheduler.clock()
+        card.scheduler.clock = lambda: now + 0.06
+        self.assertEqual(card.poll_due(), 1)
+        fast.input_func.assert_called_once()
+        slow.input_func.assert_not_called()
+        self.assertEqual(card.overrun_report(), {"dev/fast": 0, "dev/slow": 0})
+
+    @patch('os.makedirs')
+    def test_update_status_batched_read(self, mock_makedirs):
+        """read_many 対応コントローラでは1回の一括読み出しで各パラメータに値が渡されるか"""
+        self.mock_ctrl_instance.read_many.return_value = {"ether_status:1": "1"}
+        card = InterfaceCard(self.mock_ctrl_class, self.card_dir)
+        port1 = StubFileParameter("port1", input_func=MagicMock(return_value="0"), read_key="ether_status:1")
+        port2 = StubFileParameter("port2", input_func=MagicMock(return_value="0"), read_key="ether_status:2")
+        card.add_device(Device("dev", [port1, port2]))
+        port1.input_func.reset_mock()
+        port2.input_func.reset_mock()
+
+        card.update_status()
+
+        self.mock_ctrl_instance.read_many.assert_called_once_with(["ether_status:1", "ether_status:2"])
+        # 一括読み出しで得られた値はinput_funcを呼ばずに使われる
+        port1.input_func.assert_not_called()
+        self.assertEqual(port1._value, "1")
+        # 戻り値に含まれないキーは個別読み出しにフォールバックする
+        port2.input_func.assert_called_once_with(self.mock_ctrl_instance)
+
+    @patch('os.makedirs')
+    def test_update_status_read_many_not_implemented(self, mock_makedirs):
+        """read_many 未実装（既定の空の辞書）のコントローラは従来の個別読み出しになるか"""
+        self.mock_ctrl_instance.read_many.return_value = {}
+        card = InterfaceCard(self.mock_ctrl_class, self.card_dir)
+        param = StubFileParameter("port1", input_func=MagicMock(return_value="1"), read_key="ether_status:1")
+        card.add_device(Device("dev", [param]))
+
+        card.update_status()
+
+        self.assertEqual(param.input_func.call_count, 2)
+        self.assertEqual(param._value, "1")
+
+
+class TestInterfaceCardBulkAdd(unittest.TestCase):
+    """add_devices による一括追加のテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.ctrl_class = MagicMock()
+        self.ctrl = self.ctrl_class.return_value
+        self.ctrl.read_many.return_value = {"rsw": "12", "ether_status:1": "1"}
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_single_session_and_batched_read(self):
+        """1回のセッション・1回の一括読み出しで全パラメータが準備されるか"""
+        os.makedirs(os.path.join(self.test_root, "fpga"))
+        with open(os.path.join(self.test_root, "fpga", "rsw"), "w") as f:
+            f.write("old")
+        rsw_input = MagicMock(return_value="0")
+        devices = [
+            Device("fpga", [InputParameter("rsw", value="-", input_func=rsw_input, read_key="rsw")]),
+            Device("ethport1", [
+                InputParameter("linkgood", value="-", input_func=MagicMock(), read_key="ether_status:1"),
+                OutputParameter("mode", value="1", output_func=MagicMock()),
+            ]),
+        ]
+        card = InterfaceCard(self.ctrl_class, self.test_root)
+        self.ctrl.open.reset_mock()
+        self.ctrl.close.reset_mock()
+
+        with patch("os.path.exists", side_effect=os.path.exists) as mock_exists:
+            card.add_devices(devices)
+        mock_exists.assert_not_called()
+
+        self.ctrl.open.assert_called_once()
+        self.ctrl.close.assert_called_once()
+        self.ctrl.read_many.assert_called_once_with(["rsw", "ether_status:1"])
+        rsw_input.assert_not_called()
+        self.assertEqual(card.devices, devices)
+        self.assertEqual(len(card.scheduler.overruns), 3)
+        with open(os.path.join(self.test_root, "fpga", "rsw")) as f:
+            self.assertEqual(f.read(), "12")
+        with open(os.path.join(self.test_root, "ethport1", "mode")) as f:
+            self.assertEqual(f.read(), "1")
+
+
+class TestInterfaceCardPersistentSession(unittest.TestCase):
+    """セッション維持モードのテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.ctrl_class = MagicMock()
+        self.ctrl = self.ctrl_class.return_value
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_session_kept_across_cycles(self):
+        """サイクル毎に open/close せず、例外発生時は次のサイクルで開き直すか"""
+        values = iter(["1", "2", RuntimeError("bus error"), "3"])
+
+        def read(ctrl):
+            value = next(values)
+            if isinstance(value, Exception):
+                raise value
+            return value
+        card = InterfaceCard(self.ctrl_class, self.test_root, persistent_session=True)
+        card.add_device(Device("dev", [InputParameter("in0", value="-", input_func=read)]))
+        card.update_status()
+        self.assertEqual(self.ctrl.open.call_count, 1)
+        self.assertEqual(self.ctrl.close.call_count, 0)
+        self.assertEqual(self.ctrl.refresh.call_count, 2)
+
+        with self.assertRaises(RuntimeError):
+            card.update_status()
+        self.assertEqual(self.ctrl.close.call_count, 1)
+        card.update_status()
+        self.assertEqual(self.ctrl.open.call_count, 2)
+        self.assertEqual(card.devices[0].parameters[0]._value, "3")
+
+        card.shutdown()
+        self.assertEqual(self.ctrl.close.call_count, 2)
+
+
+class TestInterfaceCardParallel(unittest.TestCase):
+    """スレッドプールによるデバイス並列アクセスのテスト"""
+
+    def _slow_device(self, name, ctrl_method):
+        def handler(controller):
+            time.sleep(0.2)
+            return getattr(controller, ctrl_method)()
+        param = StubFileParameter(name, input_func=handler)
+        return Device(name, [param])
+
+    @patch('os.makedirs')
+    def test_parallel_devices(self, mock_makedirs):
+        """スレッドセーフなコントローラではデバイスが並列に処理されるか"""
+        ctrl_class = MagicMock()
+        ctrl_class.return_value.thread_safe = True
+        card = InterfaceCard(ctrl_class, "test_card_dir", max_workers=4)
+        devices = [self._slow_device(f"dev{i}", "get_value") for i in range(3)]
+        for device in devices:
+            card.add_device(device)
+
+        start = time.monotonic()
+        card.update_status()
+        elapsed = time.monotonic() - start
+        card.shutdown()
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(ctrl_class.return_value.get_value.call_count, 6)
+
+    @patch('os.makedirs')
+    def test_not_thread_safe_ctrl_is_serialized(self, mock_makedirs):
+        """スレッドセーフでないコントローラへの呼び出しは同時に実行されないか"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def get_value():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return "1"
+
+        ctrl_class = MagicMock()
+        ctrl_class.return_value.thread_safe = False
+        ctrl_class.return_value.get_value.side_effect = get_value
+        card = InterfaceCard(ctrl_class, "test_card_dir", max_workers=4)
+        for i in range(4):
+            param = StubFileParameter(f"p{i}", input_func=lambda c: c.get_value())
+            card.devices.append(Device(f"dev{i}", [param]))
+
+        card.update_status()
+        card.shutdown()
+
+        self.assertEqual(max(peak), 1)
+        self.assertEqual(len(peak), 4)
+
+
+class TestInterfaceCardStatusImage(unittest.TestCase):
+    """ステータスイメージへの書き込みのテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_status_image_follows_updates(self):
+        """パラメータの更新がステータスイメージに反映されるか"""
+        values = iter(["20", "30"])
+        card = InterfaceCard(MagicMock(), self.test_root)
+        card.add_device(Device("backlight1", [InputParameter("duty", value="-", input_func=lambda c: next(values))]))
+        card.enable_status_image()
+
+        reader = StatusImageReader(os.path.join(self.test_root, ".status.img"))
+        self.assertEqual(reader.get_all(), {"backlight1/duty": "20"})
+        card.update_status()
+        self.assertEqual(reader.get("backlight1/duty"), "30")
+        reader.close()
+
+        # デバイス追加で空きのスロットに追加される
+        card.add_device(Device("fpga", [InputParameter("rsw", value="0", input_func=lambda c: "1")]))
+        reader = StatusImageReader(os.path.join(self.test_root, ".status.img"))
+        self.assertEqual(reader.get_all(), {"backlight1/duty": "30", "fpga/rsw": "1"})
+        reader.close()
+        card.shutdown()
+
+    def test_status_image_grows_without_rebuild(self):
+        """デバイスを1台ずつ追加しても作り直さず、開いたままの読み出し側から追加分を参照できるか"""
+        card = InterfaceCard(MagicMock(), self.test_root)
+        card.add_device(Device("backlight0", [InputParameter("duty", value="0")]))
+        writer = card.enable_status_image(capacity=4)
+        reader = StatusImageReader(os.path.join(self.test_root, ".status.img"))
+        for i in range(1, 4):
+            card.add_device(Device(f"backlight{i}", [InputParameter("duty", value=str(i))]))
+        self.assertIs(card.status_image, writer)
+        self.assertFalse(reader.is_stale())
+        self.assertEqual(reader.get("backlight3/duty"), "3")
+        self.assertEqual(len(reader.names), 4)
+
+        # 容量を超えた場合は倍にして作り直す
+        card.add_device(Device("backlight4", [InputParameter("duty", value="4")]))
+        self.assertEqual(card.status_image.capacity, 10)
+        self.assertTrue(reader.is_stale())
+        reader.close()
+        card.shutdown()
+
+
+class TestInterfaceCardStats(unittest.TestCase):
+    """所要時間の統計のテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_stats_collected_and_exported(self):
+        """フェーズ・パラメータ毎の計測とカウンタが記録され、終了時に出力されるか"""
+        values = iter(["20", "x", "30"])
+        card = InterfaceCard(MagicMock(), self.test_root)
+        stats = card.enable_stats(interval_s=3600)
+        card.add_device(Device("backlight1", [
+            InputParameter("duty", value="-", validator_func=str.isdigit, input_func=lambda c: next(values)),
+        ]))
+        card.update_status()
+        card.update_status()
+
+        param_stats = stats.parameters["backlight1/duty"]
+        self.assertEqual(param_stats.updates, 2)
+        self.assertEqual(param_stats.validation_failures, 1)
+        self.assertEqual(param_stats.phases["input"].count, 3)
+        self.assertEqual(param_stats.phases["output"].count, 2)
+        self.assertEqual(stats.phases["open"].count, 2)
+        self.assertEqual(stats.devices["backlight1"].count, 2)
+        self.assertEqual(stats.counters["cycles"], 2)
+
+        card.shutdown()
+        self.assertTrue(os.path.exists(os.path.join(self.test_root, ".stats.json")))
+        self.assertTrue(os.path.exists(os.path.join(self.test_root, ".stats.prom")))
+
+    def test_disabled_by_default(self):
+        card = InterfaceCard(MagicMock(), self.test_root)
+        param = InputParameter("duty", value="-", input_func=lambda c: "1")
+        card.add_device(Device("backlight1", [param]))
+        self.assertIsNone(card.stats)
+        self.assertEqual(param.update_hooks, [])
+
+
+class TestInterfaceCardHistory(unittest.TestCase):
+    """値の履歴のテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_history_follows_updates(self):
+        values = iter(["20", "30", "30", "25"])
+        card = InterfaceCard(MagicMock(), self.test_root)
+        card.add_device(Device("backlight1", [InputParameter("duty", value="-", input_func=lambda c: next(values))]))
+        history = card.enable_history(raw_capacity=16)
+        for _ in range(3):
+            card.update_status()
+        self.assertEqual([v for _, v in history.query("backlight1/duty")], [20.0, 30.0, 25.0])
+        card.shutdown()
+
+    def test_history_parsers_from_config(self):
+        """"parsers" は glob パターンと宣言的な指定 ({"base": 16}) で指定できるか"""
+        card = InterfaceCard(MagicMock(), self.test_root)
+        card.add_device(Device("backlight1", [InputParameter("duty", value="00FF", input_func=lambda c: None)]))
+        history = card.enable_history(raw_capacity=16, parsers={"backlight*/duty": {"base": 16}})
+        self.assertEqual([v for _, v in history.query("backlight1/duty")], [255.0])
+        card.shutdown()
+
+    def test_history_keeps_validator_base_with_stats(self):
+        """統計を先に有効にしてバリデータが包まれていても 16進の値を16進として記録するか"""
+        card = InterfaceCard(MagicMock(), self.test_root)
+        card.add_device(Device("fpga", [InputParameter("fpgaver", value="0010", validator_func=compile_validator({"hex": {"max_digits": 4}}), input_func=lambda c: None)]))
+        card.enable_stats(interval_s=3600)
+        history = card.enable_history(raw_capacity=16)
+        self.assertEqual([v for _, v in history.query("fpga/fpgaver")], [16.0])
+        card.shutdown()
+
+
+class TestInterfaceCardAdaptivePolling(unittest.TestCase):
+    """適応周期のテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_stable_parameters_back_off_and_siblings_snap_back(self):
+        values = {"stable": "1", "other": "1", "status": "0"}
+        card = InterfaceCard(MagicMock(), self.test_root, default_period_ms=100, max_period_ms=1600)
+        params = {}
+        inputs = {}
+        for name in values:
+            inputs[name] = MagicMock(side_effect=lambda c, name=name: values[name])
+            params[name] = InputParameter(name, input_func=inputs[name])
+        card.add_device(Device("fpga", [params["stable"]]))
+        card.add_device(Device("backlight1", [params["other"], params["status"]]))
+        card.enable_stats()
+        now = [card.scheduler.clock()]
+        card.scheduler.clock = lambda: now[0]
+
+        def run_until(t):
+            while card.scheduler.next_due() <= t:
+                now[0] = card.scheduler.next_due()
+                card.poll_due()
+            now[0] = t
+
+        start = now[0]
+        run_until(start + 10.0)
+        # 10秒間、周期 100ms なら各100回のところ、上限 1.6秒まで延びる
+        self.assertLess(inputs["stable"].call_count, 15)
+        self.assertEqual(card.scheduler.period((card.devices[1], params["other"])), 1.6)
+
+        # 同じデバイスのパラメータの変化で周期が戻る
+        values["status"] = "1"
+        while params["status"]._value != "1":
+            now[0] = card.scheduler.next_due()
+            card.poll_due()
+        self.assertEqual(card.scheduler.period((card.devices[1], params["other"])), 0.1)
+        self.assertLessEqual(card.scheduler.next_due(), now[0] + 0.1)
+        self.assertEqual(card.scheduler.period((card.devices[0], params["stable"])), 1.6)
+        stats = card.stats.to_dict()["parameters"]["fpga/stable"]
+        self.assertEqual(stats["poll_period_s"], 1.6)
+        self.assertGreater(stats["polls"], 0)
+        card.shutdown()
+
+
+class ResetCtrl(InterfaceCtrl):
+    """リセット通知のテスト用コントローラ"""
+    def open(self):
+        pass
+
+    def refresh(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestInterfaceCardConstant(unittest.TestCase):
+    """ConstParameter のテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_read_once_until_reset(self):
+        version = {"value": "2512"}
+        read = MagicMock(side_effect=lambda c: version["value"])
+        fpgaver = ConstParameter("fpgaver", value="----", input_func=read)
+        card = InterfaceCard(ResetCtrl, self.test_root, default_period_ms=100)
+        card.add_device(Device("fpga", [fpgaver, InputParameter("rsw", input_func=lambda c: "1")]))
+        # add_device の強制読み出しで確定し、以降は周期アクセスしない
+        self.assertEqual(fpgaver._value, "2512")
+        self.assertTrue(fpgaver.frozen)
+        self.assertEqual(len(card.scheduler), 1)
+        for _ in range(3):
+            card.update_status()
+        self.assertEqual(read.call_count, 1)
+
+        # リセットの通知で読み直す（期限に達したパラメータが無くても次の poll_due で読む）
+        version["value"] = "2601"
+        card.ctrl.notify_reset()
+        self.assertFalse(fpgaver.frozen)
+        card.poll_due()
+        self.assertEqual(read.call_count, 2)
+        self.assertTrue(fpgaver.frozen)
+        with open(os.path.join(self.test_root, "fpga", "fpgaver")) as f:
+            self.assertEqual(f.read(), "2601")
+        card.poll_due()
+        card.update_status()
+        self.assertEqual(read.call_count, 2)
+        card.shutdown()
+
+
+class TestInterfaceCardCtrlEvents(unittest.TestCase):
+    """コントローラのイベント通知のテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.ctrl = PipeEventCtrl()
+
+    def tearDown(self):
+        self.ctrl.close_events()
+        shutil.rmtree(self.test_root)
+
+    def test_signaled_group_is_refreshed_while_waiting(self):
+        handlers = SimHandlerMap()
+        card = InterfaceCard(lambda: self.ctrl, self.test_root, default_period_ms=60000)
+        for name in ("ethport1", "ethport2", "fpga"):
+            card.add_device(Device(name, [InputParameter("linkgood", value="-", input_func=handlers.get(f"sim_in:{name}"))]))
+        card.map_event("link", "ethport*/linkgood")
+        self.assertIn(self.ctrl.event_fileno(), card.event_sources())
+
+        self.ctrl.set_value("ethport2", 1)
+        self.ctrl.set_value("fpga", 1, group="link")
+        reads = self.ctrl.read_calls
+        # 周期（60秒）を待たずに、待機中の通知で対応するパラメータのみ読み出す
+        card.wait(0.05)
+        self.assertEqual(self.ctrl.read_calls - reads, 2)
+        self.assertEqual(card.parameter("ethport2/linkgood")._value, "1")
+        self.assertEqual(card.parameter("fpga/linkgood")._value, "0")
+        # 対応付けの無いグループは無視する
+        self.ctrl.signal("unknown")
+        card.wait(0.01)
+        self.assertEqual(self.ctrl.read_calls - reads, 2)
+        card.shutdown()
+
+
+class TestInterfaceCardSubscribe(unittest.TestCase):
+    """値の変化の購読のテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_subscribe_receives_changes(self):
+        values = iter(["0", "1", "1", "0"])
+        card = InterfaceCard(MagicMock(), self.test_root)
+        card.add_device(Device("ethport1", [InputParameter("linkgood", value="-", input_func=lambda c: next(values))]))
+        links = card.subscribe("ethport*/linkgood")
+        received = []
+        card.subscribe("ethport1/*", callback=received.append, sync=True)
+        card.add_device(Device("ethport2", [InputParameter("linkgood", value="-", input_func=lambda c: "1")]))
+        for _ in range(3):
+            card.update_status()
+        events = [(e.name, e.old_value, e.new_value) for e in links.get_all()]
+        self.assertIn(("ethport2/linkgood", "-", "1"), events)
+        self.assertEqual([(e.old_value, e.new_value) for e in received], [("0", "1"), ("1", "0")])
+        card.shutdown()
+
+
+class TestInterfaceCardWatch(unittest.TestCase):
+    """inotify によるOutputParameterの変更検知のテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.mock_ctrl_class = MagicMock()
+        self.mock_output = MagicMock()
+        self.mock_input = MagicMock(return_value="1")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def _create_card(self):
+        card = InterfaceCard(self.mock_ctrl_class, self.test_root, watch=True)
+        if card.watcher is None:
+            self.skipTest("inotify が利用できない環境")
+        self.out_param = OutputParameter("on", value="0", output_func=self.mock_output)
+        self.in_param = InputParameter("error", value="0", input_func=self.mock_input)
+        card.add_device(Device("backlight1", [self.out_param, self.in_param]))
+        self.mock_output.reset_mock()
+        return card
+
+    def test_output_parameter_is_watched(self):
+        """OutputParameterのみ監視対象となり、周期アクセスから外れるか"""
+        card = self._create_card()
+        self.assertTrue(self.out_param.watched)
+        self.assertFalse(self.in_param.watched)
+
+        card.update_status()
+        # ファイルに変更が無いので output_func は呼ばれない
+        self.mock_output.assert_not_called()
+        self.assertEqual(self.in_param._value, "1")
+
+    def test_dispatch_changed_file(self):
+        """書き換えられたファイルのパラメータのみ output_func が呼ばれるか"""
+        card = self._create_card()
+        with open(self.out_param.full_path, 'w') as f:
+            f.write("1")
+
+        self.assertTrue(card.watcher.wait(1.0))
+        card.dispatch_events()
+
+        self.mock_output.assert_called_once_with(self.mock_ctrl_class.return_value, "1")
+        self.assertEqual(self.out_param._value, "1")
+
+    def test_unwatched_file_does_not_open_session(self):
+        """監視対象外のファイルの書き換えではコントローラのセッションを開かないか"""
+        card = self._create_card()
+        ctrl = self.mock_ctrl_class.return_value
+        ctrl.open.reset_mock()
+        self.in_param._update_file(ctrl, "1")
+
+        self.assertTrue(card.watcher.wait(1.0))
+        card.dispatch_events()
+
+        ctrl.open.assert_not_called()
+        self.mock_output.assert_not_called()
+
+    def test_fallback_to_polling(self):
+        """inotify が使えない場合は従来のポーリングで反映されるか"""
+        with patch('InterfaceParam.create_watcher', return_value=None):
+            card = InterfaceCard(self.mock_ctrl_class, self.test_root, watch=True)
+        param = OutputParameter("on", value="0", output_func=self.mock_output)
+        card.add_device(Device("backlight1", [param]))
+        self.assertFalse(param.watched)
+
+        with open(param.full_path, 'w') as f:
+            f.write("1")
+        card.update_status()
+
+        self.assertEqual(param._value, "1")
+
+
+class TestOutputParameterStatCache(unittest.TestCase):
+    """stat による変更検知キャッシュのテスト"""
+
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.mock_ctrl = MagicMock()
+        self.mock_output = MagicMock()
+        self.param = OutputParameter("on", value="0", output_func=self.mock_output)
+        self.param.prepare_file(self.test_root)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_own_write_does_not_trigger_read(self):
+        """自身の書き込み後は stat が一致し、読み出しが省略されるか"""
+        self.assertIsNone(self.param._read_file_content(self.mock_ctrl))
+
+    def test_forced_access_reads_unchanged_file(self):
+        """強制アクセスでは変更が無くても読み出されるか"""
+        self.param.handle_access_always(self.mock_ctrl)
+        self.mock_output.assert_called_once_with(self.mock_ctrl, "0")
+
+    def test_unchanged_file_is_not_opened(self):
+        """変更が無いファイルは open されないか"""
+        self.param.handle_access_always(self.mock_ctrl)
+        with patch('builtins.open') as mock_open:
+            self.param.handle_access(self.mock_ctrl)
+            mock_open.assert_not_called()
+
+    def test_external_write_is_detected(self):
+        """外部からの書き換えは検知されるか"""
+        self.param.handle_access_always(self.mock_ctrl)
+        with open(self.param.full_path, 'w') as f:
+            f.write("10")
+        self.param.handle_access(self.mock_ctrl)
+        self.mock_output.assert_called_with(self.mock_ctrl, "10")
+
 
 class TestBaseParameter(unittest.TestCase):
     """BaseParameterクラスの新メソッドに対するテスト"""
@@ -113,6 +717,15 @@ class TestBaseParameter(unittest.TestCase):
             output_func=self.mock_output
         )
 
+    def test_attributes_are_slots(self):
+        """属性は __slots__ に保持され、インスタンスの辞書を持たないか"""
+        for param in (InputParameter("in", value="1"), OutputParameter("out", value="1"), ConstParameter("const", value="1")):
+            with self.subTest(cls=type(param).__name__):
+                self.assertFalse(hasattr(param, "__dict__"))
+                self.assertEqual(param._value, "1")
+                with self.assertRaises(AttributeError):
+                    param.unknown = 1
+
     def test_get_processed_input(self):
         """入力値が正しく1行目のみ抽出・文字列化されるか"""
         # 正常系: 改行を含む文字列
@@ -164,6 +777,22 @@ class TestBaseParameter(unittest.TestCase):
         # _value も更新されない
         self.assertEqual(self.param._value, "100")
 
+    def test_invalid_value_is_not_revalidated(self):
+        """同じ不正値が続く場合はバリデータを再実行しないことを確認"""
+        validator = MagicMock(return_value=False)
+        self.param.validator_func = validator
+        self.mock_input.return_value = "-50"
+
+        self.param.handle_access(self.mock_ctrl)
+        self.param.handle_access(self.mock_ctrl)
+        self.assertEqual(validator.call_count, 1)
+
+        # 値が変われば再度バリデーションされる
+        self.mock_input.return_value = "-60"
+        self.param.handle_access(self.mock_ctrl)
+        self.assertEqual(validator.call_count, 2)
+        self.mock_output.assert_not_called()
+
     def test_handle_access_always_none_input(self):
         """入力がNoneの場合は処理を中断することを確認"""
         self.mock_input.return_value = None
@@ -0,0 +1,74 @@
+import unittest
+
+from InterfaceSchedule import PollScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestPollScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = PollScheduler(default_period_ms=1000, clock=self.clock)
+
+    def test_per_item_period(self):
+        """項目毎の周期で期限に達したものだけ取り出されるか"""
+        self.scheduler.add("fast", 50)
+        self.scheduler.add("slow")
+
+        self.clock.now = 0.05
+        self.assertEqual(self.scheduler.pop_due(), ["fast"])
+        self.clock.now = 0.08
+        self.assertEqual(self.scheduler.pop_due(), [])
+        self.clock.now = 1.0
+        self.assertEqual(sorted(self.scheduler.pop_due()), ["fast", "slow"])
+
+    def test_no_drift(self):
+        """処理が遅れても次回の期限は前回の期限 + 周期になるか"""
+        self.scheduler.add("p", 100)
+        self.clock.now = 0.13
+        self.scheduler.pop_due()
+        self.assertAlmostEqual(self.scheduler.next_due(), 0.2)
+        self.assertEqual(self.scheduler.overruns["p"], 0)
+
+    def test_overrun_counted(self):
+        """期限を丸ごと過ぎた周期が周期超過として数えられるか"""
+        self.scheduler.add("p", 100)
+        self.clock.now = 0.35
+        self.assertEqual(self.scheduler.pop_due(), ["p"])
+        self.assertEqual(self.scheduler.overruns["p"], 2)
+        self.assertAlmostEqual(self.scheduler.next_due(), 0.4)
+        self.assertEqual(self.scheduler.total_overruns(), 2)
+
+    def test_adaptive_backoff_and_snap_back(self):
+        """変化が無い間は周期が延び（上限あり）、変化で最小の周期に戻るか"""
+        self.scheduler.add("p", 100, max_period_ms=400)
+        periods = []
+        for _ in range(4):
+            self.clock.now = self.scheduler.next_due()
+            self.assertEqual(self.scheduler.pop_due(), ["p"])
+            self.scheduler.unchanged("p")
+            periods.append(self.scheduler.period("p"))
+        self.assertEqual(periods, [0.2, 0.4, 0.4, 0.4])
+        self.assertAlmostEqual(self.scheduler.next_due(), self.clock.now + 0.4)
+
+        # 変化があれば期限を早めて最小の周期に戻す（置き換えたエントリは取り出されない）
+        self.clock.now += 0.05
+        self.scheduler.changed("p")
+        self.assertEqual(self.scheduler.period("p"), 0.1)
+        self.assertEqual(len(self.scheduler), 1)
+        self.clock.now += 0.1
+        self.assertEqual(self.scheduler.pop_due(), ["p"])
+        self.clock.now += 1.0
+        self.assertEqual(self.scheduler.pop_due(), ["p"])
+        self.assertEqual(self.scheduler.adaptive["p"].polls, 6)
+
+    def test_invalid_period(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.add("p", 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from unittest.mock import MagicMock
+from InterfaceParam import InterfaceCard, Device, InputParameter, OutputParameter
+
+class TestControlServer(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.output = MagicMock()
+        self.card = InterfaceCard(MagicMock(), self.test_root)
+        self.card.add_device(Device("fpga", [InputParameter("version", value="2512")]))
+        self.card.add_device(Device("backlight1", [
+            OutputParameter("on", value="0", validator_func=lambda v: v in ("0", "1"), output_func=self.output),
+        ]))
+        self.output.reset_mock()
+        self.server = self.card.enable_server()
+        self.client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.client.settimeout(0.05)
+        self.client.connect(self.server.path)
+        self._buffer = b""
+
+    def tearDown(self):
+        self.client.close()
+        self.card.shutdown()
+        shutil.rmtree(self.test_root)
+
+    def _receive(self):
+        """サーバを処理しながら1行分の応答を受け取る"""
+        for _ in range(100):
+            if b"\n" in self._buffer:
+                break
+            self.server.process()
+            try:
+                self._buffer += self.client.recv(65536)
+            except socket.timeout:
+                pass
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return json.loads(line)
+
+    def _request(self, **request):
+        self.client.sendall(json.dumps(request).encode() + b"\n")
+        return self._receive()
+
+    def test_get_and_mget(self):
+        self.assertEqual(self._request(op="get", name="fpga/version", id=7), {"ok": True, "value": "2512", "id": 7})
+        response = self._request(op="mget", names=["fpga/version", "backlight1/on", "none/x"])
+        self.assertEqual(response["values"], {"fpga/version": "2512", "backlight1/on": "0"})
+        self.assertEqual(response["missing"], ["none/x"])
+        self.assertEqual(self._request(op="mget", pattern="fpga/*")["values"], {"fpga/version": "2512"})
+        self.assertFalse(self._request(op="get", name="none/x")["ok"])
+
+    def test_set_calls_output_and_mirrors_file(self):
+        self.assertEqual(self._request(op="set", name="backlight1/on", value=1), {"ok": True, "value": "1"})
+        self.output.assert_called_once_with(self.card.ctrl, "1")
+        with open(os.path.join(self.test_root, "backlight1", "on")) as f:
+            self.assertEqual(f.read(), "1")
+        # 自身の書き込みはポーリングで再度出力されない
+        self.card.update_status()
+        self.output.assert_called_once()
+
+        self.assertFalse(self._request(op="set", name="backlight1/on", value=5)["ok"])
+        self.assertFalse(self._request(op="set", name="fpga/version", value=1)["ok"])
+
+    def test_watch_streams_changes(self):
+        self.assertEqual(self._request(op="watch", pattern="backlight1/*"), {"ok": True})
+        self.assertTrue(self._request(op="set", name="backlight1/on", value="1")["ok"])
+        event = self._receive()
+        self.assertEqual((event["event"], event["name"], event["old"], event["new"]), ("change", "backlight1/on", "0", "1"))
+
+    def test_watch_events_from_other_threads(self):
+        """他のスレッドで届いたイベントはセレクタに触れず、process（カードのスレッド）で送信されるか"""
+        self.assertEqual(self._request(op="watch", pattern="backlight1/*"), {"ok": True})
+        main_thread = threading.current_thread()
+        modify = self.server.selector.modify
+
+        def modify_on_card_thread(*args):
+            self.assertIs(threading.current_thread(), main_thread)
+            return modify(*args)
+        self.server.selector.modify = modify_on_card_thread
+        thread = threading.Thread(target=lambda: self.card.bus.publish("backlight1/on", "0", "1"))
+        thread.start()
+        thread.join()
+        self.assertTrue(self.server.selector.select(0))
+        event = self._receive()
+        self.assertEqual((event["name"], event["old"], event["new"]), ("backlight1/on", "0", "1"))
+
+    def test_bad_request_keeps_connection(self):
+        self.client.sendall(b"not json\n")
+        self.assertFalse(self._receive()["ok"])
+        self.assertFalse(self._request(op="nope")["ok"])
+        self.assertTrue(self._request(op="get", name="fpga/version")["ok"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import functools
+import json
+import os
+import select
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import bench_interface
+from InterfaceParam import InterfaceCard
+from InterfaceSim import SimulatedCtrl, PipeEventCtrl, SimHandlerMap, generate_config
+from mlb_interface import build_devices
+
+class TestSimulatedCtrl(unittest.TestCase):
+    def test_change_rate(self):
+        """change_rate=0 では値が変わらず、1 では毎回変わるか"""
+        ctrl = SimulatedCtrl(change_rate=0.0)
+        self.assertEqual([ctrl.read("k") for _ in range(3)], ["0", "0", "0"])
+        ctrl = SimulatedCtrl(change_rate=1.0)
+        self.assertEqual([ctrl.read("k") for _ in range(3)], ["1", "2", "3"])
+        self.assertEqual(ctrl.read_calls, 3)
+
+    def test_read_many_is_one_call(self):
+        ctrl = SimulatedCtrl()
+        self.assertEqual(ctrl.read_many(["a", "b"]), {"a": "0", "b": "0"})
+        self.assertEqual(ctrl.read_calls, 1)
+
+    def test_pipe_events(self):
+        """signal でパイプが読み込み可能になり、read_events で通知されたグループを返すか"""
+        ctrl = PipeEventCtrl()
+        try:
+            self.assertEqual(list(ctrl.read_events()), [])
+            ctrl.set_value("ethport1/linkgood", 1, group="link")
+            ctrl.signal("link")
+            ctrl.signal("backlight")
+            readable, _, _ = select.select([ctrl.event_fileno()], [], [], 0)
+            self.assertTrue(readable)
+            self.assertEqual(list(ctrl.read_events()), ["backlight", "link"])
+            readable, _, _ = select.select([ctrl.event_fileno()], [], [], 0)
+            self.assertFalse(readable)
+            self.assertEqual(ctrl.read("ethport1/linkgood"), "1")
+        finally:
+            ctrl.close_events()
+
+    def test_handler_map(self):
+        ctrl = SimulatedCtrl(change_rate=1.0)
+        handlers = SimHandlerMap({"named": len})
+        self.assertEqual(handlers.get("sim_in:dev/in0")(ctrl), "1")
+        handlers.get("sim_out:dev/out0")(ctrl, "5")
+        self.assertEqual(ctrl.writes["dev/out0"][0], "5")
+        self.assertIs(handlers.get("named"), len)
+        self.assertIsNone(handlers.get("missing"))
+        self.assertIsNone(handlers.get(None))
+
+class TestGeneratedConfig(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_generate_config_shape(self):
+        """config.json と同じ形式で生成されるか"""
+        config = generate_config(3, self.test_root, inputs_per_device=2, outputs_per_device=1, period_ms=50)
+        self.assertEqual(config["card_directory"], self.test_root)
+        self.assertEqual(len(config["devices"]), 3)
+        params = config["devices"]["dev0000"]
+        self.assertEqual([p["type"] for p in params], ["in", "in", "out"])
+        self.assertEqual(params[0]["period_ms"], 50)
+        self.assertEqual(params[0]["key"], "dev0000/in0")
+
+    def test_card_from_generated_config(self):
+        """生成した設定で InterfaceCard が動作するか"""
+        config = generate_config(2, self.test_root)
+        card = InterfaceCard(functools.partial(SimulatedCtrl, change_rate=1.0), self.test_root)
+        for device in build_devices(config, SimHandlerMap()):
+            card.add_device(device)
+        card.update_status()
+        with open(os.path.join(self.test_root, "dev0001", "in1")) as f:
+            self.assertNotEqual(f.read(), "-")
+        card.shutdown()
+
+    def test_benchmark_writes_json(self):
+        """ベンチマークの結果が JSON で保存されるか"""
+        out = os.path.join(self.test_root, "bench.json")
+        rc = bench_interface.main(["--devices", "2", "--cycles", "2", "--latency-samples", "0", "--out", out])
+        self.assertEqual(rc, 0)
+        with open(out) as f:
+            report = json.load(f)
+        self.assertEqual(report["results"][0]["devices"], 2)
+        self.assertIn("p99", report["results"][0]["cycle_ms"])
+        self.assertIn("open", report["results"][0]["syscalls_per_cycle"])
+
+    def test_audit_hook_installed_once(self):
+        """ベンチマークを繰り返し実行しても監査フックは1回だけ登録されるか"""
+        with patch.object(bench_interface, "_audit_hook_installed", False), patch("sys.addaudithook") as addaudithook:
+            bench_interface._install_audit_hook()
+            bench_interface._install_audit_hook()
+        addaudithook.assert_called_once_with(bench_interface._audit_hook)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from InterfaceStats import LatencyHistogram, CardStats, ParameterStats, counted_validator
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentile_precision(self):
+        """分位値がバケットの精度（約3%）以内に収まるか"""
+        h = LatencyHistogram()
+        for us in range(1, 10001):
+            h.record(us / 1_000_000)
+        self.assertEqual(h.count, 10000)
+        self.assertAlmostEqual(h.percentile(0.5), 0.005, delta=0.005 * 0.04)
+        self.assertAlmostEqual(h.percentile(0.99), 0.0099, delta=0.0099 * 0.04)
+        self.assertEqual(h.percentile(1.0), h.max)
+
+    def test_empty(self):
+        h = LatencyHistogram()
+        self.assertIsNone(h.percentile(0.5))
+        self.assertEqual(h.cumulative((0.001,)), [0])
+
+    def test_cumulative(self):
+        """OpenMetrics の累積バケットが上限以下の件数になるか"""
+        h = LatencyHistogram()
+        for seconds in (0.00005, 0.0002, 0.002, 2.0):
+            h.record(seconds)
+        self.assertEqual(h.cumulative((0.0001, 0.001, 0.01, 1.0)), [1, 2, 3, 3])
+
+
+class TestCardStats(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.stats = CardStats(interval_s=10.0, clock=self.clock)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_validation_failures_counted(self):
+        stats = ParameterStats()
+        validator = counted_validator(lambda v: v == "1", stats)
+        self.assertTrue(validator("1"))
+        self.assertFalse(validator("x"))
+        self.assertEqual(stats.validation_failures, 1)
+        self.assertEqual(stats.phases["validate"].count, 2)
+
+    def test_concurrent_records(self):
+        """並列アクセスのスレッドから同時に記録しても件数が欠けず、出力と競合しないか"""
+        stats = self.stats.parameter("fpga/rsw")
+        validator = counted_validator(lambda v: v == "1", stats)
+        errors = []
+
+        def work():
+            for i in range(5000):
+                validator("x" if i % 2 else "1")
+                self.stats.record_device("fpga", 0.0001)
+                stats.count_update()
+
+        def export():
+            try:
+                for _ in range(50):
+                    self.stats.to_dict()
+                    self.stats.to_openmetrics()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=work) for _ in range(4)] + [threading.Thread(target=export)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(stats.phases["validate"].count, 20000)
+        self.assertEqual(stats.validation_failures, 10000)
+        self.assertEqual(stats.updates, 20000)
+        self.assertEqual(self.stats.devices["fpga"].count, 20000)
+
+    def test_export_interval(self):
+        """interval_s 経過後にのみ JSON と OpenMetrics が出力されるか"""
+        self.stats.record("open", 0.001)
+        self.stats.parameter("fpga/rsw").updates += 2
+        self.assertFalse(self.stats.maybe_export(self.test_root))
+        self.assertFalse(os.path.exists(os.path.join(self.test_root, ".stats.json")))
+
+        self.clock.now = 10.0
+        self.assertTrue(self.stats.maybe_export(self.test_root))
+        with open(os.path.join(self.test_root, ".stats.json")) as f:
+            data = json.load(f)
+        self.assertEqual(data["phases"]["open"]["count"], 1)
+        self.assertEqual(data["updates"], 2)
+
+        with open(os.path.join(self.test_root, ".stats.prom")) as f:
+            text = f.read()
+        self.assertIn('interface_phase_seconds_count{phase="open"} 1', text)
+        self.assertIn('interface_parameter_updates_total{param="fpga/rsw"} 2', text)
+        self.assertTrue(text.endswith("# EOF\n"))
+
+if __name__ == '__main__':
+    unittest.main()
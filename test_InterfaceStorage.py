@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import MagicMock, patch
+from InterfaceParam import InterfaceCard, Device, InputParameter, OutputParameter
+from InterfaceImage import StatusImageReader
+from InterfaceStorage import FileStorage, MemoryStorage, MmapStorage, create_storage, FILE_STORAGE
+
+class TestStorageBackends(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.card_dir = os.path.join(self.test_root, "card")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def _backends(self):
+        mmap_storage = MmapStorage(os.path.join(self.test_root, "values.img"), capacity=8, root=self.card_dir)
+        self.addCleanup(mmap_storage.close)
+        return [FileStorage(), MemoryStorage(), mmap_storage]
+
+    def test_common_behaviour(self):
+        """全ての保存先で読み書き・変更検知・ディレクトリの一覧が同じ結果になるか"""
+        for storage in self._backends():
+            with self.subTest(storage=type(storage).__name__):
+                key = os.path.join(self.card_dir, "ethport1", "linkgood")
+                storage.makedirs(os.path.dirname(key))
+                self.assertFalse(storage.exists(key))
+                self.assertIsNone(storage.read(key))
+                self.assertIsNone(storage.version(key))
+
+                storage.write(key, "0")
+                version = storage.version(key)
+                self.assertEqual(storage.read(key), "0")
+                self.assertEqual(storage.version(key), version)
+                storage.write(key, "10")
+                self.assertNotEqual(storage.version(key), version)
+
+                storage.mkdir(os.path.join(self.card_dir, "fpga"))
+                self.assertEqual(storage.list_names(self.card_dir, dirs_only=True), {"ethport1", "fpga"})
+                self.assertEqual(storage.list_names(os.path.dirname(key)), {"linkgood"})
+                self.assertEqual(storage.list_names(os.path.join(self.card_dir, "missing")), frozenset())
+
+                other = os.path.join(self.card_dir, "fpga", "rsw")
+                self.assertEqual(storage.write_many({key: "1", other: "12"}, fsync="batch"), {})
+                self.assertEqual(storage.read_many([key, other, other + "x"]), {key: "1", other: "12"})
+                shutil.rmtree(self.card_dir, ignore_errors=True)
+
+    def test_mmap_is_a_status_image(self):
+        """mmap の保存先は StatusImageReader で読み出せるか"""
+        storage = MmapStorage(os.path.join(self.test_root, "values.img"), capacity=2, root=self.card_dir)
+        storage.write_many({os.path.join(self.card_dir, "fpga", "rsw"): "12"})
+        reader = StatusImageReader(storage.path)
+        self.assertEqual(reader.get_all(), {"fpga/rsw": "12"})
+        reader.close()
+        storage.write(os.path.join(self.card_dir, "fpga", "id"), "1")
+        with self.assertRaises(ValueError):
+            storage.write(os.path.join(self.card_dir, "fpga", "full"), "1")
+        storage.close()
+
+    def test_create_storage(self):
+        self.assertIs(create_storage(None), FILE_STORAGE)
+        self.assertIsInstance(create_storage("memory"), MemoryStorage)
+        with self.assertRaises(ValueError):
+            create_storage("tape")
+
+class TestInterfaceCardStorage(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.card_dir = os.path.join(self.test_root, "card")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_memory_storage_does_not_touch_disk(self):
+        """メモリの保存先では os をモックせずにカードが動作し、ディスクに書き込まないか"""
+        storage = MemoryStorage()
+        output = MagicMock()
+        values = iter(["1", "1", "0"])
+        params = [
+            InputParameter("linkgood", value="-", input_func=lambda c: next(values)),
+            OutputParameter("on", value="0", output_func=output),
+        ]
+        card = InterfaceCard(MagicMock(), self.card_dir, watch=True, storage=storage)
+        with patch("builtins.open", side_effect=AssertionError("open")):
+            card.add_devices([Device("ethport1", params)])
+            card.update_status()
+            storage.write(os.path.join(self.card_dir, "ethport1", "on"), "1")
+            card.update_status()
+        self.assertFalse(os.path.exists(self.card_dir))
+        self.assertIsNone(card.watcher)
+        self.assertEqual(storage.values[os.path.join(self.card_dir, "ethport1", "linkgood")], "0")
+        self.assertEqual(output.call_args_list[-1].args[1], "1")
+        card.shutdown()
+
+    def test_outputs_read_once_per_cycle(self):
+        """ファイル以外の保存先では出力パラメータの値を周期毎に read_many 1回で読み出すか"""
+        storage = MemoryStorage()
+        output = MagicMock()
+        card = InterfaceCard(MagicMock(), self.card_dir, storage=storage)
+        card.add_devices([Device(f"backlight{i}", [OutputParameter("on", value="0", output_func=output)]) for i in range(3)])
+        output.reset_mock()
+        storage.write(os.path.join(self.card_dir, "backlight1", "on"), "1")
+        with patch.object(storage, "read_many", wraps=storage.read_many) as read_many, \
+                patch.object(storage, "read", side_effect=AssertionError("read")), \
+                patch.object(storage, "version", side_effect=AssertionError("version")):
+            card.update_status()
+            card.update_status()
+        self.assertEqual(read_many.call_count, 2)
+        self.assertEqual(len(read_many.call_args.args[0]), 3)
+        output.assert_called_once_with(card.ctrl, "1")
+        card.shutdown()
+
+    def test_card_files_need_paths(self):
+        """ファイル以外の保存先ではソケット・統計ファイル等のパスの指定が必須か"""
+        card = InterfaceCard(MagicMock(), self.card_dir, storage=MemoryStorage())
+        with self.assertRaises(ValueError):
+            card.enable_server()
+        with self.assertRaises(ValueError):
+            card.enable_stats()
+        with self.assertRaises(ValueError):
+            card.enable_status_image()
+        card.enable_stats(directory=self.test_root)
+        card.shutdown()
+        self.assertTrue(os.path.exists(os.path.join(self.test_root, ".stats.json")))
+
+    def test_shutdown_closes_storage(self):
+        storage = MmapStorage(os.path.join(self.test_root, "values.img"), root=self.card_dir)
+        card = InterfaceCard(MagicMock(), self.card_dir, storage=storage)
+        card.add_devices([Device("fpga", [InputParameter("rsw", value="1")])])
+        card.shutdown()
+        self.assertIsNone(storage._mm)
+
+if __name__ == '__main__':
+    unittest.main()
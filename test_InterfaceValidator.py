@@ -0,0 +1,58 @@
+import unittest
+
+from InterfaceValidator import compile_validator, resolve_validator
+
+class TestCompileValidator(unittest.TestCase):
+    def test_enum(self):
+        """数値・文字列のどちらでも選択肢と比較できるか"""
+        validator = compile_validator({"enum": [0, 1]})
+        self.assertTrue(validator("1"))
+        self.assertTrue(validator(0))
+        self.assertFalse(validator("2"))
+        self.assertFalse(validator(None))
+
+    def test_hex(self):
+        validator = compile_validator({"hex": {"max_digits": 6, "max": 16777215}})
+        self.assertTrue(validator("543211"))
+        self.assertTrue(validator("0xFFFFFF"))
+        self.assertFalse(validator("1000000"))   # 7桁
+        self.assertFalse(validator("0xG0"))
+        self.assertFalse(validator("------"))
+        self.assertFalse(validator(None))
+
+    def test_int_range_base16(self):
+        """validate_percent 相当（16進で100以下）"""
+        validator = compile_validator({"int_range": [0, 100], "base": 16})
+        self.assertTrue(validator("0020"))
+        self.assertTrue(validator("0x64"))
+        self.assertFalse(validator("65"))
+        self.assertFalse(validator("-"))
+
+    def test_int_range_base10(self):
+        validator = compile_validator({"int_range": [-10, 10]})
+        self.assertTrue(validator("-10"))
+        self.assertFalse(validator("11"))
+        self.assertFalse(validator("0x1"))
+
+    def test_regex(self):
+        validator = compile_validator({"regex": "^[0-9]{4}$"})
+        self.assertTrue(validator("2512"))
+        self.assertFalse(validator("251"))
+
+    def test_unknown_spec(self):
+        """未対応の指定は読み込み時にエラーとなるか"""
+        with self.assertRaises(ValueError):
+            compile_validator({"unknown": 1})
+        with self.assertRaises(ValueError):
+            compile_validator(["enum"])
+
+    def test_resolve_validator(self):
+        """関数名と宣言的な指定の両方が解決できるか"""
+        named = lambda v: True
+        self.assertIs(resolve_validator("named", {"named": named}), named)
+        self.assertIsNone(resolve_validator("missing", {}))
+        self.assertIsNone(resolve_validator(None, {}))
+        self.assertTrue(resolve_validator({"enum": ["a"]}, {})("a"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from InterfaceWatch import InotifyWatcher, create_watcher
+
+class TestInotifyWatcher(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.watcher = create_watcher()
+        if self.watcher is None:
+            self.skipTest("inotify が利用できない環境")
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.test_root)
+
+    def test_close_write_event(self):
+        """書き込み完了したファイルがイベントとして通知されるか"""
+        self.watcher.add_watch(self.test_root)
+        with open(os.path.join(self.test_root, "on"), "w") as f:
+            f.write("1")
+
+        self.assertTrue(self.watcher.wait(1.0))
+        self.assertIn((self.test_root, "on"), self.watcher.read_events())
+
+    def test_moved_to_event(self):
+        """rename による置き換えも通知されるか"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            src = os.path.join(tmp_dir, "on.tmp")
+            with open(src, "w") as f:
+                f.write("0")
+            self.watcher.add_watch(self.test_root)
+            shutil.move(src, os.path.join(self.test_root, "on"))
+
+            self.assertTrue(self.watcher.wait(1.0))
+            self.assertIn((self.test_root, "on"), self.watcher.read_events())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_no_event_does_not_block(self):
+        """イベントが無い場合は待たずに空リストを返すか"""
+        self.watcher.add_watch(self.test_root)
+        self.assertFalse(self.watcher.wait(0))
+        self.assertEqual(self.watcher.read_events(), [])
+
+    def test_add_watch_missing_directory(self):
+        """存在しないディレクトリの登録は OSError になるか"""
+        with self.assertRaises(OSError):
+            self.watcher.add_watch(os.path.join(self.test_root, "missing"))
+
+if __name__ == '__main__':
+    unittest.main()
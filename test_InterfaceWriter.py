@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest.mock import MagicMock
+from InterfaceParam import InterfaceCard, Device, InputParameter, OutputParameter
+from InterfaceWriter import FileWriter
+
+class TestFileWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_root, "linkgood")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def _read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_coalesced_per_file(self):
+        """待ち時間中の同じファイルへの要求は最後の値で1回だけ書き込まれるか"""
+        writer = FileWriter(delay_s=0.2)
+        for value in ("0", "1", "0", "1"):
+            writer.submit(self.path, value)
+        writer.submit(os.path.join(self.test_root, "other"), "x")
+        self.assertTrue(writer.flush(5.0))
+        self.assertEqual(self._read(self.path), "1")
+        self.assertEqual((writer.submitted, writer.coalesced, writer.written), (5, 3, 2))
+        # 一時ファイルは残らない
+        self.assertEqual(sorted(os.listdir(self.test_root)), ["linkgood", "other"])
+        writer.close()
+
+    def test_fsync_modes(self):
+        for fsync in ("off", "batch", "always"):
+            with self.subTest(fsync=fsync):
+                writer = FileWriter(fsync)
+                writer.submit(self.path, fsync)
+                writer.close()
+                self.assertEqual(self._read(self.path), fsync)
+        with self.assertRaises(ValueError):
+            FileWriter("sometimes")
+
+    def test_error_is_counted(self):
+        writer = FileWriter()
+        with self.assertLogs("InterfaceWriter", "ERROR"):
+            writer.submit(os.path.join(self.test_root, "missing", "file"), "1")
+            writer.flush(5.0)
+        self.assertEqual(writer.errors, 1)
+        writer.close()
+        with self.assertRaises(RuntimeError):
+            writer.submit(self.path, "1")
+
+class TestInterfaceCardWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_input_files_written_behind(self):
+        values = iter(["1", "0", "1"])
+        card = InterfaceCard(MagicMock(), self.test_root)
+        card.add_devices([Device("ethport1", [
+            InputParameter("linkgood", value="-", input_func=lambda c: next(values)),
+            OutputParameter("on", value="0"),
+        ])])
+        writer = card.enable_write_behind(fsync="batch")
+        card.update_status()
+        card.update_status()
+        self.assertTrue(writer.flush(5.0))
+        with open(os.path.join(self.test_root, "ethport1", "linkgood")) as f:
+            self.assertEqual(f.read(), "1")
+        self.assertEqual(writer.submitted, 2)
+        self.assertEqual(writer.written + writer.coalesced, 2)
+        # OutputParameter のファイルは同期で書き込む
+        card.set_value("ethport1/on", 1)
+        with open(os.path.join(self.test_root, "ethport1", "on")) as f:
+            self.assertEqual(f.read(), "1")
+        self.assertEqual(writer.submitted, 2)
+        card.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
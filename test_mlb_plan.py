@@ -0,0 +1,164 @@
+import unittest
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+import mlb_plan
+from mlb_plan import compile_config, load_plan, PlanHandlers, LazyHandler
+
+HANDLERS = {"rsw_handler": lambda c: "1", "choice_bool": lambda v: True}
+
+def _config(**param):
+    p = {"type": "in", "file": "rsw", "val": "-", "in": "rsw_handler"}
+    p.update(param)
+    return {"card_directory": "/tmp/mlb", "devices": {"fpga": [p]}}
+
+class TestCompileConfig(unittest.TestCase):
+    def test_valid_config(self):
+        config = _config(v={"enum": [0, 1]}, period_ms=50, key="rsw")
+        self.assertEqual(compile_config(config, HANDLERS), config)
+
+    def test_repository_config(self):
+        """リポジトリの config.json が検証を通るか"""
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")) as f:
+            compile_config(json.load(f))
+
+    def test_errors_include_location(self):
+        cases = [
+            (_config(type="inout"), r"devices\.fpga\[0\]\.type"),
+            (_config(v={"unknown": 1}), r"devices\.fpga\[0\]\.v"),
+            (_config(period_ms=0), r"devices\.fpga\[0\]\.period_ms"),
+            (_config(type="const", period_ms=50), r"devices\.fpga\[0\]\.period_ms"),
+            (_config(**{"in": "no_such_module_xyz:func"}), "no_such_module_xyz"),
+            (dict(_config(), events={"link": "ethport*/linkgood"}), r"events\.link"),
+            (dict(_config(), storage="tape"), r"storage"),
+            (dict(_config(), storage="memory", stats=True), r"stats\.directory"),
+            (dict(_config(), storage="memory", server=True), r"server"),
+            (_config(key="ether_status:x"), r"devices\.fpga\[0\]\.key"),
+            (_config(key=1), r"devices\.fpga\[0\]\.key"),
+            (dict(_config(), history={"parsers": {"backlight*/duty": {"base": 7}}}), r"history\.parsers"),
+        ]
+        for config, message in cases:
+            with self.subTest(message=message):
+                with self.assertRaisesRegex(ValueError, message):
+                    compile_config(config, HANDLERS)
+
+    def test_max_period_must_cover_period(self):
+        config = {"card_directory": "/tmp/x", "devices": {"d": [{"type": "in", "file": "f", "period_ms": 500, "max_period_ms": 100}]}}
+        with self.assertRaisesRegex(ValueError, r"devices\.d\[0\]\.max_period_ms"):
+            compile_config(config, {})
+
+    def test_unknown_name_is_warning(self):
+        """func_map に無い名前は警告のみで、従来どおりハンドラ無しとして扱われるか"""
+        with self.assertLogs("mlb_plan", "WARNING") as logs:
+            compile_config(_config(**{"in": "missing_handler"}), HANDLERS)
+        self.assertIn("devices.fpga[0].in", logs.output[0])
+
+    def test_unresolved_name_removed_from_plan(self):
+        """解決できないハンドラ名はプランから除かれるか（起動時に改めて解決しない）"""
+        with self.assertLogs("mlb_plan", "WARNING"):
+            plan = compile_config(_config(**{"in": "missing_handler"}), HANDLERS)
+        self.assertNotIn("in", plan["devices"]["fpga"][0])
+
+    def test_module_reference_not_imported(self):
+        """"module:function" の参照は検証時に import されないか"""
+        sys.modules.pop("colorsys", None)
+        compile_config(_config(**{"in": "colorsys:rgb_to_hsv"}), HANDLERS)
+        self.assertNotIn("colorsys", sys.modules)
+
+    def test_submodule_reference_does_not_import_package(self):
+        """"package.module:function" の検証で親パッケージも import されないか"""
+        for name in ("wsgiref", "wsgiref.simple_server"):
+            sys.modules.pop(name, None)
+        compile_config(_config(**{"in": "wsgiref.simple_server:make_server"}), HANDLERS)
+        self.assertNotIn("wsgiref", sys.modules)
+        with self.assertRaisesRegex(ValueError, "wsgiref.no_such_module"):
+            compile_config(_config(**{"in": "wsgiref.no_such_module:main"}), HANDLERS)
+
+
+class TestPlanHandlers(unittest.TestCase):
+    def test_lazy_import(self):
+        """"module:function" は最初の呼び出しで import されるか"""
+        sys.modules.pop("colorsys", None)
+        handlers = PlanHandlers(HANDLERS)
+        self.assertIs(handlers.get("rsw_handler"), HANDLERS["rsw_handler"])
+        func = handlers.get("colorsys:rgb_to_hsv")
+        self.assertIsInstance(func, LazyHandler)
+        self.assertNotIn("colorsys", sys.modules)
+        self.assertEqual(func(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn("colorsys", sys.modules)
+        self.assertIsNone(handlers.get("missing"))
+
+
+class TestLoadPlan(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.test_root, "config.json")
+        with open(self.config_file, "w") as f:
+            json.dump(_config(), f)
+        mlb_plan._plan_cache.clear()
+
+    def tearDown(self):
+        mlb_plan._plan_cache.clear()
+        shutil.rmtree(self.test_root)
+
+    def test_validation_skipped_when_cached(self):
+        """同じ内容の設定は2回目以降（プロセスを跨いでも）検証されないか"""
+        plan = load_plan(self.config_file, HANDLERS)
+        self.assertTrue(os.path.exists(self.config_file + ".plan"))
+        self.assertIs(load_plan(self.config_file, HANDLERS), plan)
+
+        mlb_plan._plan_cache.clear()
+        with patch("mlb_plan.compile_config") as compile_mock:
+            self.assertEqual(load_plan(self.config_file, HANDLERS), plan)
+        compile_mock.assert_not_called()
+
+    def test_resolved_plan_is_cached(self):
+        """記録したプランには解決済みの参照が残り、次回はそれが使われるか"""
+        with open(self.config_file, "w") as f:
+            json.dump(_config(**{"in": "missing_handler"}), f)
+        with self.assertLogs("mlb_plan", "WARNING"):
+            load_plan(self.config_file, HANDLERS)
+        mlb_plan._plan_cache.clear()
+        with patch("mlb_plan.logger") as logger_mock:
+            plan = load_plan(self.config_file, HANDLERS)
+        logger_mock.warning.assert_not_called()
+        self.assertNotIn("in", plan["devices"]["fpga"][0])
+
+    def test_handler_module_change_invalidates_plan(self):
+        """参照するハンドラのモジュールが更新・削除された場合はプランを使わずに検証し直すか"""
+        module_path = os.path.join(self.test_root, "plan_handler_mod.py")
+        with open(module_path, "w") as f:
+            f.write("def read(c):\n    return '1'\n")
+        sys.path.insert(0, self.test_root)
+        self.addCleanup(sys.path.remove, self.test_root)
+        importlib.invalidate_caches()
+        with open(self.config_file, "w") as f:
+            json.dump(_config(**{"in": "plan_handler_mod:read"}), f)
+        load_plan(self.config_file, HANDLERS)
+
+        stat = os.stat(module_path)
+        os.utime(module_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        mlb_plan._plan_cache.clear()
+        with patch("mlb_plan.compile_config", wraps=compile_config) as compile_mock:
+            load_plan(self.config_file, HANDLERS)
+        compile_mock.assert_called_once()
+
+        os.remove(module_path)
+        importlib.invalidate_caches()
+        with self.assertRaisesRegex(ValueError, "plan_handler_mod"):
+            load_plan(self.config_file, HANDLERS)
+
+    def test_changed_config_is_revalidated(self):
+        load_plan(self.config_file, HANDLERS)
+        with open(self.config_file, "w") as f:
+            json.dump(_config(type="bad"), f)
+        with self.assertRaises(ValueError):
+            load_plan(self.config_file, HANDLERS)
+
+if __name__ == '__main__':
+    unittest.main()
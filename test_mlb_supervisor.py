@@ -0,0 +1,113 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from InterfaceSim import SimulatedCtrl, SimHandlerMap, generate_config
+from mlb_interface import build_card, load_object
+from mlb_supervisor import CardSupervisor, compile_cards, shard_cards, run_cards
+
+def _card_config(root, name, num_devices=1):
+    config = generate_config(num_devices, os.path.join(root, name), period_ms=20)
+    config.update({"name": name, "ctrl": "InterfaceSim:SimulatedCtrl", "handlers": "InterfaceSim:SimHandlerMap", "watch": False})
+    return config
+
+class TestShardCards(unittest.TestCase):
+    def test_balanced_by_parameters(self):
+        """パラメータ数の多いカードから負荷の小さいプロセスに割り当てられるか"""
+        cards = [{"name": n, "devices": {"d": [{}] * size}} for n, size in (("a", 1), ("b", 5), ("c", 3), ("d", 2))]
+        shards = shard_cards(cards, 2)
+        self.assertEqual([[c["name"] for c in shard] for shard in shards], [["b", "a"], ["c", "d"]])
+
+    def test_processes_limited_by_cards(self):
+        self.assertEqual(len(shard_cards([{"name": "a"}], 8)), 1)
+
+    def test_load_object(self):
+        self.assertIs(load_object("InterfaceSim:SimulatedCtrl"), SimulatedCtrl)
+        with self.assertRaises(ValueError):
+            load_object("InterfaceSim")
+
+    def test_compile_cards(self):
+        """各カードの設定が検証され、誤りはカード名付きで報告されるか"""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        cards = [_card_config(root, name) for name in ("card0", "card1")]
+        config = compile_cards({"cards": cards})
+        self.assertEqual([card["name"] for card in config["cards"]], ["card0", "card1"])
+        self.assertEqual(config["cards"][0]["ctrl"], "InterfaceSim:SimulatedCtrl")
+
+        cards[1]["devices"]["dev0000"][0]["period_ms"] = -1
+        with self.assertRaisesRegex(ValueError, r"cards\[1\] \(card1\)"):
+            compile_cards({"cards": cards})
+        with self.assertRaises(ValueError):
+            compile_cards({"cards": [{"card_directory": root, "devices": {}}]})
+
+
+class TestRunCards(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def test_multiple_cards_in_one_process(self):
+        """1プロセス内で複数カードがポーリングされ、ヘルス情報が報告されるか"""
+        cards = {
+            name: build_card(_card_config(self.test_root, name), SimulatedCtrl, SimHandlerMap(), watch=False)
+            for name in ("card0", "card1")
+        }
+        stop = threading.Event()
+        reports = []
+
+        def report(health):
+            reports.append(health)
+            if len(reports) >= 3:
+                stop.set()
+        run_cards(cards, stop, report, heartbeat_s=0.05)
+        self.assertEqual(set(reports[-1]), {"card0", "card1"})
+        self.assertGreater(reports[-1]["card0"]["polled"], 0)
+        self.assertGreater(reports[-1]["card1"]["polled"], 0)
+        for card in cards.values():
+            card.shutdown()
+
+
+class TestCardSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.test_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_root)
+
+    def _wait_until(self, supervisor, condition, timeout=20.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            supervisor.poll(0.1)
+            if condition():
+                return True
+        return False
+
+    def test_restart_crashed_worker(self):
+        """ワーカーが異常終了した場合に再起動され、ヘルス情報が集約されるか"""
+        config = {"cards": [_card_config(self.test_root, "card0"), _card_config(self.test_root, "card1")]}
+        health_file = os.path.join(self.test_root, "health.json")
+        supervisor = CardSupervisor(config, processes=2, heartbeat_s=0.1, restart_backoff_s=0.1, health_file=health_file)
+        supervisor.start()
+        try:
+            self.assertTrue(self._wait_until(supervisor, lambda: supervisor.health()["healthy"]))
+            self.assertEqual(set(supervisor.health()["cards"]), {"card0", "card1"})
+            self.assertTrue(os.path.exists(health_file))
+
+            old_pid = supervisor.workers[0].process.pid
+            supervisor.workers[0].process.kill()
+            self.assertTrue(self._wait_until(
+                supervisor,
+                lambda: supervisor.workers[0].restarts == 1 and supervisor.health()["healthy"],
+            ))
+            self.assertNotEqual(supervisor.workers[0].process.pid, old_pid)
+        finally:
+            supervisor.stop()
+
+if __name__ == '__main__':
+    unittest.main()